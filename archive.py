@@ -0,0 +1,195 @@
+# archive.py
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+import attendance_index
+import report_cache
+import sheets_client
+import worksheet_cache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARCHIVE_DIR = "archive"
+COMPRESSION = "zstd"
+MANIFEST_FILE = "_manifest.json"
+COLUMNS = ['DIA', 'EVENTO', 'HORA', 'NICK']
+
+def is_available() -> bool:
+    """O arquivo histórico depende do pyarrow (opcional)."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def archive_cutoff(today: date) -> date:
+    """
+    Primeiro dia que ainda fica na aba. Meses fechados saem, exceto o da semana atual:
+    no início do mês a semana dos relatórios ainda pode começar no mês anterior.
+    """
+    return month_start(attendance_index.week_start(today))
+
+# --- PARTIÇÕES ---
+def _worksheet_dir(worksheet_name: str) -> str:
+    return os.path.join(ARCHIVE_DIR, re.sub(r"[^\w-]+", "_", worksheet_name))
+
+def _partition_path(worksheet_name: str, month: date) -> str:
+    return os.path.join(_worksheet_dir(worksheet_name), f"mes={month.year:04d}-{month.month:02d}", "dados.parquet")
+
+def archived_until(worksheet_name: str) -> date | None:
+    """Tudo antes desta data já está no arquivo (as linhas mais novas ficam na aba)."""
+    try:
+        with open(os.path.join(_worksheet_dir(worksheet_name), MANIFEST_FILE), encoding="utf-8") as f:
+            return date.fromisoformat(json.load(f)["ate"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+def _save_manifest(worksheet_name: str, cutoff: date):
+    path = os.path.join(_worksheet_dir(worksheet_name), MANIFEST_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"ate": cutoff.isoformat()}, f)
+    os.replace(path + ".tmp", path)
+
+def _write_partition(worksheet_name: str, month: date, frame: pd.DataFrame):
+    """Acrescenta linhas à partição do mês (sem duplicar, para que reexecuções sejam seguras)."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _partition_path(worksheet_name, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        existing = pq.read_table(path).to_pandas().astype({"EVENTO": str, "NICK": str})
+        frame = frame.astype({"EVENTO": str, "NICK": str})
+        # Linhas idênticas legítimas são preservadas: compara a n-ésima ocorrência de cada linha
+        keyed = [part.assign(_ocorrencia=part.groupby(COLUMNS).cumcount()) for part in (existing, frame)]
+        frame = pd.concat(keyed, ignore_index=True).drop_duplicates(ignore_index=True).drop(columns="_ocorrencia")
+    frame = frame.sort_values(["DIA", "HORA"], kind="stable").astype({"EVENTO": "category", "NICK": "category"})
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path + ".tmp", compression=COMPRESSION)
+    os.replace(path + ".tmp", path)
+
+def _row_ranges(sheet_rows: list) -> list:
+    """Agrupa números de linha em intervalos contíguos [(início, fim)], para apagar com poucas chamadas."""
+    ranges = []
+    for row in sorted(sheet_rows):
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+# --- ARQUIVAMENTO ---
+async def archive_worksheet(worksheet_name: str, today: date) -> int:
+    """
+    Move as linhas de meses fechados da aba para o Parquet particionado por mês e as apaga da planilha.
+    Retorna quantas linhas foram arquivadas.
+    """
+    import pandas as pd
+    cutoff = archive_cutoff(today)
+    values = await sheets_client.get_range(worksheet_name, "A1:E")
+    old_rows = {}
+    for index, row in enumerate(values[1:], start=2):
+        padded = (list(row) + [""] * 5)[:5]
+        try:
+            day = datetime.strptime(padded[1], '%d/%m/%Y').date()
+        except ValueError:
+            continue  # Linhas sem data válida ficam na aba para correção manual
+        if day < cutoff:
+            old_rows[index] = (day, padded)
+
+    if old_rows:
+        frame = pd.DataFrame(
+            [[day, *padded[2:5]] for day, padded in old_rows.values()],
+            columns=COLUMNS
+        )
+        frame['DIA'] = pd.to_datetime(frame['DIA'])
+        months = frame['DIA'].dt.to_period("M")
+        for period, month_frame in frame.groupby(months):
+            await asyncio.to_thread(_write_partition, worksheet_name, period.to_timestamp().date(), month_frame)
+    if not old_rows:
+        _save_manifest(worksheet_name, cutoff)
+        return 0
+
+    # Confere se ninguém mexeu na aba desde a leitura antes de apagar
+    first, last = min(old_rows), max(old_rows)
+    current = await sheets_client.get_range(worksheet_name, f"A{first}:E{last}")
+    expected = [(list(row) + [""] * 5)[:5] for row in values[first - 1:last]]
+    if [(list(row) + [""] * 5)[:5] for row in current] != expected:
+        logging.warning(f"Aba '{worksheet_name}' foi alterada durante o arquivamento. Linhas mantidas; nova tentativa na próxima execução.")
+        return 0
+
+    # Só a tabela de presenças (B:E) encolhe; as seções de resumo à direita ficam no lugar
+    await sheets_client.delete_cells(worksheet_name, _row_ranges(old_rows), "B", "E")
+    # A partir daqui as consultas históricas usam o arquivo para tudo antes do corte
+    _save_manifest(worksheet_name, cutoff)
+    # A aba encolheu: o cache precisa de uma recarga completa
+    worksheet_cache.invalidate(worksheet_name)
+    report_cache.results.invalidate(worksheet_name)
+    logging.info(f"{len(old_rows)} linha(s) anteriores a {cutoff.strftime('%d/%m/%Y')} arquivada(s) da aba '{worksheet_name}'.")
+    return len(old_rows)
+
+async def archive_closed_months(worksheet_names: list, today: date) -> int:
+    """Arquiva todas as divisões, uma de cada vez (cada uma lê a aba inteira)."""
+    total = 0
+    for worksheet_name in worksheet_names:
+        try:
+            total += await archive_worksheet(worksheet_name, today)
+        except Exception as e:
+            logging.error(f"Falha ao arquivar a aba '{worksheet_name}': {e}")
+    return total
+
+# --- CONSULTA HISTÓRICA ---
+def read_months(worksheet_name: str, first_month: date, last_month: date, columns: list = None) -> pd.DataFrame:
+    """
+    Lê do arquivo apenas as partições dos meses pedidos (inclusive) e apenas as colunas pedidas.
+    """
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    columns = columns or COLUMNS
+    frames = []
+    month = month_start(first_month)
+    while month <= last_month:
+        path = _partition_path(worksheet_name, month)
+        if os.path.exists(path):
+            frames.append(pq.read_table(path, columns=columns).to_pandas())
+        month = add_months(month, 1)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+async def history_frame(worksheet_name: str, first_month: date, last_month: date, load_live) -> pd.DataFrame:
+    """
+    EVENTO e NICK de todos os registros entre os meses pedidos (inclusive): os meses já arquivados vêm
+    do Parquet e o restante do armazenamento ao vivo (`load_live(since)` → DataFrame com DIA).
+    """
+    import pandas as pd
+    end = add_months(last_month, 1)
+    until = archived_until(worksheet_name) if is_available() else None
+    frames = []
+    if until and first_month < until:
+        frames.append(await asyncio.to_thread(read_months, worksheet_name, first_month, min(last_month, add_months(until, -1)), ['EVENTO', 'NICK']))
+    live_start = max(first_month, until) if until else first_month
+    if live_start < end:
+        live = await load_live(live_start)
+        if not live.empty:
+            frames.append(live.loc[live['DIA'] < pd.Timestamp(end), ['EVENTO', 'NICK']])
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=['EVENTO', 'NICK'])
+    # Categóricos com categorias diferentes viram texto no concat; o motor de relatórios recategoriza
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,117 @@
+# attendance_index.py
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+import worksheet_cache
+from validators import CATEGORIES, CATEGORY_EVENTOS, CATEGORY_PRACA_PICO, CATEGORY_TORRE, CATEGORY_WB, event_categories
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Contadores por aba: (categoria, período) → {nick normalizado: quantidade de presenças}.
+# Período semanal: ("S", domingo que inicia a semana); mensal: ("M", ano, mês).
+_counts = {}
+# Por aba: nick normalizado → nick como aparece no registro mais recente (exibido nos rankings)
+_display_nicks = {}
+
+def normalize_nick(nick: str) -> str:
+    return nick.casefold()
+
+def week_start(day: date) -> date:
+    """Semana dos relatórios começa no domingo."""
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+def week_key(day: date) -> tuple:
+    return ("S", week_start(day))
+
+def month_key(day: date) -> tuple:
+    return ("M", day.year, day.month)
+
+def _add_rows(worksheet_name: str, df: pd.DataFrame):
+    """Soma as presenças de um bloco de linhas aos contadores da aba (agrupamento vetorizado)."""
+    _accumulate(_counts.setdefault(worksheet_name, {}), _display_nicks.setdefault(worksheet_name, {}), df)
+
+def _accumulate(counts: dict, display: dict, df: pd.DataFrame):
+    import pandas as pd
+    if df.empty:
+        return
+
+    raw_nicks = df['NICK'].fillna("").astype(str)
+    nicks = raw_nicks.str.casefold()
+    days = df['DIA'].dt.normalize()
+    weeks = (days - pd.to_timedelta((days.dt.weekday + 1) % 7, unit='D')).dt.date
+    months = list(zip(days.dt.year, days.dt.month))
+    categories = df['EVENTO'].fillna("").map(event_categories)
+    latest = pd.DataFrame({"key": nicks.values, "nick": raw_nicks.values}).drop_duplicates("key", keep="last")
+    display.update(zip(latest["key"], latest["nick"]))
+
+    frame = pd.DataFrame({"nick": nicks.values, "week": weeks.values, "month": months, "categories": categories.values})
+    frame = frame.explode("categories")
+    for (nick, category, week), total in frame.groupby(["nick", "categories", "week"]).size().items():
+        counts.setdefault((category, ("S", week)), Counter())[nick] += int(total)
+    for (nick, category, (year, month)), total in frame.groupby(["nick", "categories", "month"]).size().items():
+        counts.setdefault((category, ("M", year, month)), Counter())[nick] += int(total)
+
+def _on_frame_rows(worksheet_name: str, df: pd.DataFrame, reset: bool):
+    if reset:
+        _counts.pop(worksheet_name, None)
+        _display_nicks.pop(worksheet_name, None)
+        logging.info(f"Reconstruindo índice de presenças da aba '{worksheet_name}' ({len(df)} linhas).")
+    _add_rows(worksheet_name, df)
+
+def get_count(worksheet_name: str, nick: str, category: str, period: tuple) -> int:
+    return _counts.get(worksheet_name, {}).get((category, period), {}).get(normalize_nick(nick), 0)
+
+def has_player(worksheet_name: str, nick: str) -> bool:
+    return normalize_nick(nick) in _display_nicks.get(worksheet_name, ())
+
+def top_players(worksheet_name: str, period: tuple, limit: int) -> dict:
+    """
+    {categoria: [(nick, presenças), ...]} com os `limit` maiores do período, direto dos contadores
+    (sem DataFrame). Mesma ordem dos rankings do report_engine: presenças (desc.) e depois nick.
+    """
+    return _rank(_counts.get(worksheet_name, {}), _display_nicks.get(worksheet_name, {}), period, limit)
+
+def rows_top_players(rows: list, period: tuple, limit: int) -> dict:
+    """
+    Mesmo resultado do top_players, calculado a partir de linhas lidas da planilha (A:E, sem
+    cabeçalho) com contadores temporários: nem o DataFrame nem os contadores ficam em memória.
+    """
+    import pandas as pd
+    df = worksheet_cache.rows_to_dataframe(rows)
+    if not df.empty:
+        first_day = period[1] if period[0] == "S" else date(period[1], period[2], 1)
+        df = df[df['DIA'] >= pd.Timestamp(first_day)]
+    counts, display = {}, {}
+    _accumulate(counts, display, df)
+    return _rank(counts, display, period, limit)
+
+def _rank(counts: dict, display: dict, period: tuple, limit: int) -> dict:
+    rankings = {}
+    for category in CATEGORIES:
+        totals = [(display.get(nick, nick), total) for nick, total in counts.get((category, period), {}).items() if nick]
+        totals.sort(key=lambda item: (-item[1], item[0]))
+        rankings[category] = totals[:limit]
+    return rankings
+
+def player_summary(worksheet_name: str, nick: str, today: datetime) -> dict | None:
+    """
+    Retorna as contagens semanais e mensais do jogador usadas pelo /presenca,
+    ou None se o jogador não tiver nenhum registro na aba.
+    """
+    if not has_player(worksheet_name, nick):
+        return None
+
+    week = week_key(today.date())
+    month = month_key(today.date())
+    return {
+        "wb_semanal": get_count(worksheet_name, nick, CATEGORY_WB, week),
+        "pico_praca_semanal": get_count(worksheet_name, nick, CATEGORY_PRACA_PICO, week),
+        "wb_mensal": get_count(worksheet_name, nick, CATEGORY_WB, month),
+        "torre_mensal": get_count(worksheet_name, nick, CATEGORY_TORRE, month),
+        "eventos_mensal": get_count(worksheet_name, nick, CATEGORY_EVENTOS, month),
+    }
+
+worksheet_cache.add_frame_listener(_on_frame_rows)
@@ -0,0 +1,142 @@
+# batch_writer.py
+import asyncio
+import logging
+import random
+import re
+import gspread
+import sheets_client
+
+BATCH_SIZE = 25          # Quantidade de linhas que dispara a gravação imediata
+FLUSH_DELAY = 2.0        # Tempo máximo (segundos) que uma linha espera no buffer
+MAX_RETRIES = 5
+BASE_BACKOFF = 1.0       # Segundos; dobra a cada nova tentativa
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+MAX_BACKLOG = 1000       # Linhas (em buffer + sendo gravadas) acima das quais novas escritas devem esperar
+
+# Buffer por aba: lista de (linha, future que é resolvido quando o lote for gravado)
+_buffers = {}
+_timers = {}
+_locks = {}
+_flush_tasks = set()
+_rows_in_flight = 0
+_commit_listeners = []
+
+def add_commit_listener(callback):
+    """
+    Registra uma função chamada após cada lote gravado com sucesso.
+    Assinatura: callback(worksheet_name, rows, start_row, start_column), onde start_row/start_column
+    indicam a célula da planilha onde o lote começou (None se não for possível determinar).
+    """
+    _commit_listeners.append(callback)
+
+def pending_count() -> int:
+    """Quantidade de linhas aguardando gravação em todos os buffers."""
+    return sum(len(buffer) for buffer in _buffers.values())
+
+def backlog_count() -> int:
+    """Linhas em buffer mais as que estão sendo gravadas (incluindo novas tentativas)."""
+    return pending_count() + _rows_in_flight
+
+def available_capacity() -> int:
+    """Quantas linhas ainda cabem antes de o Sheets ser considerado congestionado."""
+    return max(MAX_BACKLOG - backlog_count(), 0)
+
+def enqueue(worksheet_name: str, row: list) -> asyncio.Future:
+    """Coloca uma linha no buffer da aba e retorna um future com o resultado (True/False) da gravação."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    buffer = _buffers.setdefault(worksheet_name, [])
+    buffer.append((row, future))
+
+    if len(buffer) >= BATCH_SIZE:
+        _start_flush(worksheet_name)
+    elif worksheet_name not in _timers:
+        _timers[worksheet_name] = loop.call_later(FLUSH_DELAY, _start_flush, worksheet_name)
+    return future
+
+async def append(worksheet_name: str, row: list) -> bool:
+    """Enfileira uma linha e aguarda até o lote que a contém ser gravado na planilha."""
+    return await enqueue(worksheet_name, row)
+
+def _start_flush(worksheet_name: str):
+    timer = _timers.pop(worksheet_name, None)
+    if timer:
+        timer.cancel()
+
+    batch = _buffers.pop(worksheet_name, None)
+    if not batch:
+        return
+
+    task = asyncio.create_task(_flush(worksheet_name, batch))
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+
+async def _flush(worksheet_name: str, batch: list):
+    global _rows_in_flight
+    rows = [row for row, _ in batch]
+    start_row = start_column = None
+    _rows_in_flight += len(rows)
+
+    # Um lote por vez em cada aba, preservando a ordem de chegada das presenças
+    lock = _locks.setdefault(worksheet_name, asyncio.Lock())
+    async with lock:
+        try:
+            response = await _append_with_retry(worksheet_name, rows)
+            start_column, start_row = _parse_start_cell(response)
+            success = True
+            logging.info(f"Lote de {len(rows)} presença(s) gravado na aba '{worksheet_name}'.")
+        except gspread.exceptions.SpreadsheetNotFound:
+            logging.critical(f"PLANILHA NÃO ENCONTRADA: '{sheets_client.SPREADSHEET_NAME}'")
+            success = False
+        except gspread.exceptions.WorksheetNotFound:
+            logging.critical(f"ABA NÃO ENCONTRADA: '{worksheet_name}'")
+            success = False
+        except FileNotFoundError:
+            logging.critical(f"Arquivo de credenciais não encontrado: {sheets_client.SERVICE_ACCOUNT_FILE}")
+            success = False
+        except Exception as e:
+            logging.error(f"Falha ao gravar lote de {len(rows)} presença(s) na aba '{worksheet_name}': {e}")
+            success = False
+        finally:
+            _rows_in_flight -= len(rows)
+
+    for _, future in batch:
+        if not future.done():
+            future.set_result(success)
+
+    if success:
+        for callback in _commit_listeners:
+            try:
+                callback(worksheet_name, rows, start_row, start_column)
+            except Exception as e:
+                logging.error(f"Erro em listener de gravação da aba '{worksheet_name}': {e}")
+
+async def _append_with_retry(worksheet_name: str, rows: list) -> dict:
+    """Chama append_rows com backoff exponencial (e jitter) para erros 429/5xx."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await sheets_client.append_rows(worksheet_name, rows)
+        except gspread.exceptions.APIError as e:
+            status = sheets_client.status_code(e)
+            if status not in RETRYABLE_STATUS or attempt == MAX_RETRIES:
+                raise
+            delay = BASE_BACKOFF * (2 ** attempt) + random.uniform(0, BASE_BACKOFF)
+            logging.warning(f"API do Sheets respondeu {status} na aba '{worksheet_name}'. Nova tentativa em {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+def _parse_start_cell(response: dict) -> tuple:
+    """Extrai a primeira célula do intervalo atualizado (ex.: "'ABA'!B120:E121" → ("B", 120))."""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None, None
+    match = re.search(r"!([A-Z]+)(\d+)", updated_range)
+    return (match.group(1), int(match.group(2))) if match else (None, None)
+
+async def drain():
+    """Grava tudo o que ainda está nos buffers e aguarda os lotes em andamento (usado no desligamento)."""
+    for worksheet_name in list(_buffers):
+        _start_flush(worksheet_name)
+    if _flush_tasks:
+        logging.info(f"Aguardando {len(_flush_tasks)} lote(s) pendente(s) antes de encerrar...")
+        await asyncio.gather(*list(_flush_tasks), return_exceptions=True)
@@ -0,0 +1,144 @@
+# benchmarks/fake_discord.py
+"""
+Objetos mínimos que imitam discord.Message e afins, com apenas os atributos lidos pelo bot.
+Também gera rajadas realistas de posts (ex.: todas as divisões no WB das 22:00).
+"""
+import datetime
+import itertools
+import random
+import validators
+
+_ids = itertools.count(10**17)
+
+class FakeUser:
+    def __init__(self, user_id: int, display_name: str, bot: bool = False):
+        self.id = user_id
+        self.display_name = display_name
+        self.name = display_name
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+        self.dms = []
+
+    async def send(self, content: str = None, **kwargs):
+        self.dms.append(content)
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str):
+        self.id = guild_id
+        self.name = name
+        self.text_channels = []
+
+    def get_channel(self, channel_id: int):
+        return next((channel for channel in self.text_channels if channel.id == channel_id), None)
+
+class FakeCategory:
+    def __init__(self, guild: FakeGuild, name: str):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+
+    @property
+    def text_channels(self) -> list:
+        return [channel for channel in self.guild.text_channels if channel.category is self]
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str, guild: FakeGuild = None, category: FakeCategory = None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.category = category
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+        self.messages = []      # Histórico devolvido por history()
+
+    @property
+    def last_message_id(self) -> int | None:
+        return max((message.id for message in self.messages), default=None)
+
+    async def history(self, limit: int = 100, after=None, before: datetime.datetime = None, oldest_first: bool = None):
+        """Como TextChannel.history: `after` é um objeto com id e `before` uma data."""
+        selected = sorted(
+            (message for message in self.messages
+             if (after is None or message.id > after.id) and (before is None or message.created_at < before)),
+            key=lambda message: message.id, reverse=not oldest_first
+        )
+        for message in selected[:limit]:
+            yield message
+
+    async def send(self, content: str = None, embeds: list = None, **kwargs):
+        self.sent += 1
+
+class FakeAttachment:
+    def __init__(self, content_type: str | None = "image/png"):
+        self.id = next(_ids)
+        self.content_type = content_type
+        self.filename = "print.png"
+        self.size = 250_000
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, author: FakeUser, created_at: datetime.datetime,
+                 mentions: list = (), attachments: list = ()):
+        self.id = next(_ids)
+        self.channel = channel
+        self.author = author
+        self.created_at = created_at
+        self.mentions = list(mentions)
+        self.attachments = list(attachments)
+        self.reactions = []
+
+    async def add_reaction(self, emoji: str):
+        self.reactions.append(emoji)
+
+def build_guild(config: dict, channel_name: str = "wb") -> FakeGuild:
+    """Um servidor falso com uma categoria por divisão, cada uma com o canal pedido."""
+    guild = FakeGuild(next(_ids), "Servidor de teste")
+    for category_name in config:
+        category = FakeCategory(guild, category_name)
+        guild.text_channels.append(FakeChannel(next(_ids), channel_name, guild, category))
+    return guild
+
+def wb_burst(channels: list, players_per_channel: int, start: datetime.datetime, spread_seconds: float = 300,
+             duplicate_rate: float = 0.05, missing_image_rate: float = 0.02, seed: int = None) -> list:
+    """
+    Gera os posts de uma janela de WB: cada jogador é marcado uma vez por divisão, com uma fração
+    de reenvios (duplicados) e de posts sem imagem. Retorna as mensagens em ordem de criação.
+    """
+    rng = random.Random(seed)
+    messages = []
+    for channel in channels:
+        poster = FakeUser(next(_ids), f"Lider {channel.id % 1000}")
+        for index in range(players_per_channel):
+            player = FakeUser(next(_ids), f"Jogador{index:04d}_{channel.id % 1000}")
+            created_at = start + datetime.timedelta(seconds=rng.uniform(0, spread_seconds))
+            attachments = [] if rng.random() < missing_image_rate else [FakeAttachment()]
+            messages.append(FakeMessage(channel, poster, created_at, [player], attachments))
+            if rng.random() < duplicate_rate:
+                resend_at = created_at + datetime.timedelta(seconds=rng.uniform(0.1, 5))
+                messages.append(FakeMessage(channel, poster, resend_at, [player], [FakeAttachment()]))
+    messages.sort(key=lambda message: message.created_at)
+    return messages
+
+def wb_window_start(day: datetime.date) -> datetime.datetime:
+    """Início (em UTC) da janela do WB 22:00 no horário de Brasília."""
+    local = datetime.datetime.combine(day, datetime.time(21, 56), tzinfo=validators.TARGET_TZ)
+    return local.astimezone(datetime.timezone.utc)
+
+# --- INTERAÇÕES (comandos de barra) ---
+class _FakeResponse:
+    async def defer(self, **kwargs):
+        pass
+
+    async def send_message(self, *args, **kwargs):
+        pass
+
+class _FakeFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content: str = None, embed=None, **kwargs):
+        self.sent.append(embed.title if embed is not None else content)
+
+class FakeInteraction:
+    def __init__(self):
+        self.response = _FakeResponse()
+        self.followup = _FakeFollowup()
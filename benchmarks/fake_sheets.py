@@ -0,0 +1,213 @@
+# benchmarks/fake_sheets.py
+"""
+Substituto em memória da API do gspread (Spreadsheet/Worksheet) usado pelos benchmarks.
+Simula latência de rede, cota de requisições por minuto e falhas transitórias, sem acesso à internet.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+import gspread
+import requests
+
+_CELL_RE = re.compile(r"^([A-Z]+)?(\d+)?$")
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - ord("A") + 1)
+    return index - 1
+
+def _column_letters(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+def _parse_a1(a1_range: str) -> tuple:
+    """Converte "A2:E", "E2:E" ou "A1:E1" em (col_ini, col_fim, linha_ini, linha_fim|None), base 0."""
+    a1_range = a1_range.split("!")[-1]
+    start, _, end = a1_range.partition(":")
+    start_col, start_row = _CELL_RE.match(start).groups()
+    end_col, end_row = _CELL_RE.match(end or start).groups()
+    return (
+        _column_index(start_col or "A"),
+        _column_index(end_col) if end_col else None,
+        int(start_row) - 1 if start_row else 0,
+        int(end_row) - 1 if end_row else None,
+    )
+
+def _api_error(code: int, message: str) -> gspread.exceptions.APIError:
+    """Monta um APIError igual ao levantado pelo gspread para uma resposta HTTP de erro."""
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": message, "status": "FAKE"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+class FaultProfile:
+    """Latência, cota e injeção de falhas compartilhadas por todas as abas de uma planilha falsa."""
+
+    def __init__(self, latency: float = 0.15, jitter: float = 0.05, quota_per_minute: int = 300,
+                 failure_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.quota_per_minute = quota_per_minute
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self.calls = {}
+        self.rejected = {"cota": 0, "falha": 0}
+
+    def before_call(self, operation: str):
+        """Chamado (na thread do executor) antes de cada requisição: aplica cota, falhas e latência."""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            if self.quota_per_minute and len(self._window) >= self.quota_per_minute:
+                self.rejected["cota"] += 1
+                raise _api_error(429, "Quota exceeded (fake)")
+            self._window.append(now)
+            fail = self._random.random() < self.failure_rate
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.rejected["falha"] += 1
+            raise _api_error(503, "Backend unavailable (fake)")
+
+    def report(self) -> dict:
+        return {"chamadas": dict(self.calls), "rejeitadas": dict(self.rejected)}
+
+class FakeWorksheet:
+    """Aba em memória com o subconjunto da API do gspread usado pelo bot."""
+
+    def __init__(self, title: str, rows: list, profile: FaultProfile, spreadsheet=None, sheet_id: int = 0):
+        self.title = title
+        self.id = sheet_id
+        self.spreadsheet = spreadsheet
+        self._rows = rows
+        self._profile = profile
+        self._lock = threading.Lock()
+
+    def _slice(self, a1_range: str) -> list:
+        start_col, end_col, start_row, end_row = _parse_a1(a1_range)
+        stop_row = len(self._rows) if end_row is None else min(end_row + 1, len(self._rows))
+        stop_col = None if end_col is None else end_col + 1
+        values = []
+        for row in self._rows[start_row:stop_row]:
+            cells = row[start_col:stop_col]
+            # Como a API real, omite células vazias no fim da linha
+            while cells and cells[-1] == "":
+                cells = cells[:-1]
+            values.append(list(cells))
+        # ... e linhas vazias no fim do intervalo
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, a1_range: str) -> list:
+        self._profile.before_call("get")
+        with self._lock:
+            return self._slice(a1_range)
+
+    def batch_get(self, a1_ranges: list) -> list:
+        self._profile.before_call("batch_get")
+        with self._lock:
+            return [self._slice(a1_range) for a1_range in a1_ranges]
+
+    def append_rows(self, values: list, value_input_option: str = None) -> dict:
+        """Como na planilha real, a tabela começa na coluna B (a coluna A fica vazia)."""
+        self._profile.before_call("append_rows")
+        with self._lock:
+            first_row = len(self._rows) + 1
+            self._rows.extend([""] + list(row) for row in values)
+            last_row = len(self._rows)
+        last_column = _column_letters(max((len(row) for row in values), default=1))
+        return {"updates": {
+            "updatedRange": f"'{self.title}'!B{first_row}:{last_column}{last_row}",
+            "updatedRows": len(values),
+        }}
+
+    def _delete_range(self, grid_range: dict):
+        """deleteRange com shiftDimension ROWS: só as colunas do intervalo sobem; as outras ficam."""
+        start_row, end_row = grid_range["startRowIndex"], grid_range["endRowIndex"]
+        start_col, end_col = grid_range["startColumnIndex"], grid_range["endColumnIndex"]
+        with self._lock:
+            width = end_col - start_col
+            for row in self._rows:
+                row.extend([""] * (end_col - len(row)))
+            kept = [row[start_col:end_col] for row in self._rows[:start_row] + self._rows[end_row:]]
+            kept += [[""] * width] * (len(self._rows) - len(kept))
+            for row, cells in zip(self._rows, kept):
+                row[start_col:end_col] = cells
+            # Linhas que ficaram totalmente vazias no fim deixam de contar como dados
+            while self._rows and not any(self._rows[-1]):
+                self._rows.pop()
+
+    def batch_update(self, data: list, value_input_option: str = None) -> dict:
+        """Escritas nas seções de resumo (H:Z) não afetam as colunas A:E lidas pelo bot: só são contadas."""
+        self._profile.before_call("batch_update")
+        return {"totalUpdatedRanges": len(data)}
+
+    def row_count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+class FakeSpreadsheet:
+    """Planilha em memória; as abas são criadas com `add_worksheet`."""
+
+    def __init__(self, profile: FaultProfile = None):
+        self.profile = profile or FaultProfile()
+        self._worksheets = {}
+
+    def add_worksheet(self, title: str, rows: list = None) -> FakeWorksheet:
+        worksheet = FakeWorksheet(
+            title, rows if rows is not None else [["", "DIA", "EVENTO", "HORA", "NICK"]], self.profile,
+            spreadsheet=self, sheet_id=len(self._worksheets)
+        )
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self.profile.before_call("metadata")
+        worksheet = self._worksheets.get(title)
+        if worksheet is None:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return worksheet
+
+    def batch_update(self, body: dict) -> dict:
+        """spreadsheets.batchUpdate: apenas deleteRange é suportado."""
+        self.profile.before_call("spreadsheet_batch_update")
+        by_id = {worksheet.id: worksheet for worksheet in self._worksheets.values()}
+        for request in body.get("requests", []):
+            grid_range = request["deleteRange"]["range"]
+            by_id[grid_range["sheetId"]]._delete_range(grid_range)
+        return {"replies": [{} for _ in body.get("requests", [])]}
+
+    def rows_written(self, title: str) -> int:
+        """Linhas de dados da aba, sem passar pela latência/cota (uso do próprio benchmark)."""
+        return self._worksheets[title].row_count() - 1
+
+    def values_batch_get(self, ranges: list) -> dict:
+        self.profile.before_call("values_batch_get")
+        value_ranges = []
+        for a1_range in ranges:
+            title = a1_range.rsplit("!", 1)[0].strip("'").replace("''", "'")
+            worksheet = self._worksheets.get(title)
+            values = worksheet._slice(a1_range) if worksheet else []
+            value_ranges.append({"range": a1_range, "values": values})
+        return {"valueRanges": value_ranges}
+
+def install(spreadsheet: FakeSpreadsheet):
+    """Faz o sheets_client usar a planilha falsa no lugar da autenticação real."""
+    import sheets_client
+    with sheets_client._lock:
+        sheets_client._spreadsheet = spreadsheet
+        sheets_client._worksheets.clear()
@@ -0,0 +1,313 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark offline do bot: nenhuma conexão com o Discord ou com o Google é feita.
+
+  python benchmarks/run_benchmarks.py --players 60 --rows 10000,100000,1000000
+
+Cenários:
+  * rajada: todas as divisões postando na janela do WB 22:00, passando pelo mesmo listener do bot
+    (mensagens/s, p50/p99 de ponta a ponta e tempo até a planilha falsa receber tudo);
+  * recuperacao: posts feitos com o bot "fora do ar", lidos do histórico dos canais na inicialização;
+  * relatorios: /presenca e /presencas sobre abas sintéticas de vários tamanhos: primeira carga da aba,
+    execuções frias (resultado recalculado, report_cache vazio) e quentes (resultado em cache).
+
+Os resultados vão para um arquivo JSON, para comparar execuções ao longo do tempo.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_discord
+import fake_sheets
+
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+        "n": len(samples),
+    }
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+# --- CENÁRIO: RAJADA DE POSTS ---
+async def bench_burst(main, spreadsheet, args) -> dict:
+    import batch_writer
+    import journal
+    import log_manager
+    from config import CONFIG
+
+    guild = fake_discord.build_guild(CONFIG, "wb")
+    main.map_guild(guild)
+    log_manager.log_channel = fake_discord.FakeChannel(0, "logs")
+    main.pipelines.start()
+
+    day = datetime.datetime.now(datetime.timezone.utc).date()
+    messages = fake_discord.wb_burst(
+        guild.text_channels, args.players, fake_discord.wb_window_start(day),
+        spread_seconds=args.spread, duplicate_rate=args.duplicate_rate, missing_image_rate=args.missing_image_rate,
+        seed=args.seed
+    )
+
+    latencies = []
+    async def deliver(message):
+        # Igual ao gateway: cada mensagem vira uma task independente do listener
+        started = time.perf_counter()
+        await main.message_listener(message)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for message in messages:
+        tasks.append(asyncio.create_task(deliver(message)))
+        if args.rate:
+            await asyncio.sleep(1 / args.rate)
+        else:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    processed_in = time.perf_counter() - started
+
+    await batch_writer.drain()
+    # O commit marca o journal a partir de callbacks, gravados em segundo plano
+    await asyncio.sleep(0)
+    await journal.flush()
+    synced_in = time.perf_counter() - started
+
+    outcomes = {}
+    for message in messages:
+        entry = main.processed_messages.get(message.id)
+        outcome = entry[0] if entry else "desconhecido"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    written = sum(spreadsheet.rows_written(entry["worksheet_name"]) for entry in main.channel_config_map.guild_channels(guild.id))
+    return {
+        "mensagens": len(messages),
+        "divisoes": len(guild.text_channels),
+        "mensagens_por_segundo": round(len(messages) / processed_in, 1) if processed_in else None,
+        "latencia_ponta_a_ponta": _percentiles(latencies),
+        "segundos_processamento": round(processed_in, 3),
+        "segundos_ate_planilha": round(synced_in, 3),
+        "linhas_gravadas": written,
+        "journal_pendente": journal.pending_count(),
+        "resultados": outcomes,
+        "pipeline": main.pipelines.stats(),
+    }
+
+# --- CENÁRIO: RECUPERAÇÃO DO HISTÓRICO ---
+async def bench_catch_up(main, spreadsheet, args) -> dict:
+    import batch_writer
+    from config import CONFIG
+
+    guild = fake_discord.build_guild(CONFIG, "wb")
+    main.map_guild(guild)
+    main.pipelines.start()
+    written_before = {entry["worksheet_name"]: spreadsheet.rows_written(entry["worksheet_name"]) for entry in main.channel_config_map.guild_channels(guild.id)}
+
+    day = datetime.datetime.now(datetime.timezone.utc).date()
+    messages = fake_discord.wb_burst(
+        guild.text_channels, args.players, fake_discord.wb_window_start(day),
+        spread_seconds=args.spread, duplicate_rate=args.duplicate_rate, missing_image_rate=args.missing_image_rate,
+        seed=args.seed + 1
+    )
+    for message in messages:
+        message.channel.messages.append(message)
+    # Checkpoint anterior a todas as mensagens: tudo foi postado com o bot desconectado
+    for channel in guild.text_channels:
+        main.channel_checkpoints.advance(channel.id, 1)
+
+    until = max(message.created_at for message in messages) + datetime.timedelta(seconds=1)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        main.catch_up_channel(channel, main.channel_config_map[channel.id], until) for channel in guild.text_channels
+    ))
+    processed_in = time.perf_counter() - started
+    await batch_writer.drain()
+    await asyncio.sleep(0)
+    synced_in = time.perf_counter() - started
+
+    outcomes = {}
+    for counter, _ in results:
+        for outcome, count in counter.items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count
+    written = sum(spreadsheet.rows_written(name) - before for name, before in written_before.items())
+    return {
+        "mensagens": len(messages),
+        "canais": len(guild.text_channels),
+        "mensagens_por_segundo": round(len(messages) / processed_in, 1) if processed_in else None,
+        "segundos_processamento": round(processed_in, 3),
+        "segundos_ate_planilha": round(synced_in, 3),
+        "linhas_gravadas": written,
+        "resultados": outcomes,
+    }
+
+# --- CENÁRIO: RELATÓRIOS ---
+def synthetic_rows(count: int, today: datetime.date, rng: random.Random) -> list:
+    """Linhas A:E no formato da planilha, espalhadas pelos últimos 90 dias."""
+    from config import CONFIG
+    category_config = next(iter(CONFIG.values()))
+    events = [event["name"] for channel_events in category_config["channels"].values() for event in channel_events]
+    nicks = [f"Jogador{index:05d}" for index in range(max(50, count // 200))]
+    days = [(today - datetime.timedelta(days=offset)).strftime("%d/%m/%Y") for offset in range(90)]
+    rows = [["", "DIA", "EVENTO", "HORA", "NICK"]]
+    for _ in range(count):
+        rows.append(["", rng.choice(days), rng.choice(events), f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:00", rng.choice(nicks)])
+    return rows
+
+async def _time_command(command, cog, *args) -> float:
+    interaction = fake_discord.FakeInteraction()
+    started = time.perf_counter()
+    await command.callback(cog, interaction, *args)
+    return time.perf_counter() - started
+
+async def _time_cold(command, cog, worksheet_name: str, *args) -> float:
+    """Executa o comando sem o resultado em cache (os dados da aba continuam carregados)."""
+    import report_cache
+    report_cache.results.discard(worksheet_name)
+    return await _time_command(command, cog, worksheet_name, *args)
+
+async def bench_reports(main, spreadsheet, args) -> list:
+    from cogs.reports_cog import ReportsCog
+
+    cog = ReportsCog(main.bot)
+    rng = random.Random(args.seed)
+    results = []
+    for count in args.rows:
+        worksheet_name = f"BENCH {count}"
+        built = time.perf_counter()
+        spreadsheet.add_worksheet(worksheet_name, synthetic_rows(count, datetime.date.today(), rng))
+        build_seconds = time.perf_counter() - built
+        player = "Jogador00000"
+
+        first_load = await _time_command(ReportsCog.presenca, cog, worksheet_name, player)
+        result = {
+            "linhas": count,
+            "segundos_geracao_sintetica": round(build_seconds, 3),
+            "primeira_carga_ms": round(first_load * 1000, 3),
+        }
+        for name, command, command_args in (
+            ("presenca", ReportsCog.presenca, (player,)),
+            ("presencas", ReportsCog.presencas, ()),
+        ):
+            cold = [await _time_cold(command, cog, worksheet_name, *command_args) for _ in range(args.repeat)]
+            # A primeira execução fria deixa o resultado em cache para as quentes
+            warm = [await _time_command(command, cog, worksheet_name, *command_args) for _ in range(args.repeat)]
+            result[name] = {"fria": _percentiles(cold), "quente": _percentiles(warm)}
+        results.append(result)
+        logging.warning(
+            f"Relatórios com {count} linhas: primeira carga {first_load * 1000:.0f}ms, "
+            f"/presenca fria p50 {result['presenca']['fria']['p50_ms']}ms / quente p50 {result['presenca']['quente']['p50_ms']}ms, "
+            f"/presencas fria p50 {result['presencas']['fria']['p50_ms']}ms / quente p50 {result['presencas']['quente']['p50_ms']}ms"
+        )
+    return results
+
+# --- EXECUÇÃO ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do bot de presença.")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "benchmarks", "results.json"),
+                        help="Arquivo JSON de saída (resultados são acrescentados à lista existente)")
+    parser.add_argument("--players", type=int, default=60, help="Jogadores marcados por divisão na rajada")
+    parser.add_argument("--spread", type=float, default=300, help="Segundos (no relógio das mensagens) cobertos pela rajada")
+    parser.add_argument("--rate", type=float, default=0, help="Mensagens/s entregues ao bot (0 = todas de uma vez)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--missing-image-rate", type=float, default=0.02)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="Tamanhos das abas sintéticas, separados por vírgula")
+    parser.add_argument("--repeat", type=int, default=20, help="Execuções frias e quentes de cada relatório")
+    parser.add_argument("--latency", type=float, default=0.15, help="Latência simulada por chamada ao Sheets (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--quota", type=int, default=300, help="Requisições por minuto antes de responder 429 (0 = sem limite)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fração de chamadas que falham com 503")
+    parser.add_argument("--storage", choices=["sheets", "sqlite"], default="sheets", help="Armazenamento usado pelo bot")
+    parser.add_argument("--seed", type=int, default=77)
+    parser.add_argument("--skip-burst", action="store_true")
+    parser.add_argument("--skip-catch-up", action="store_true")
+    parser.add_argument("--skip-reports", action="store_true")
+    args = parser.parse_args(argv)
+    args.rows = [int(value) for value in args.rows.split(",") if value.strip()]
+    return args
+
+async def run(args) -> dict:
+    # O bot grava journal e cache de presenças no diretório atual: isola tudo em uma pasta temporária
+    workdir = tempfile.mkdtemp(prefix="bench-77bot-")
+    os.chdir(workdir)
+    os.environ["STORAGE_BACKEND"] = args.storage
+    # Os anexos falsos não têm conteúdo para o hash perceptual
+    os.environ.setdefault("IMAGE_REUSE_CHECK", "0")
+    import main
+    main.setup()
+    import batch_writer
+    import journal
+    import sheets_client
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from config import CONFIG
+    spreadsheet = fake_sheets.FakeSpreadsheet(fake_sheets.FaultProfile(
+        latency=args.latency, jitter=args.jitter, quota_per_minute=args.quota,
+        failure_rate=args.failure_rate, seed=args.seed
+    ))
+    for category_config in CONFIG.values():
+        spreadsheet.add_worksheet(category_config["worksheet_name"])
+    fake_sheets.install(spreadsheet)
+    await main.backend.start([category_config["worksheet_name"] for category_config in CONFIG.values()])
+
+    result = {
+        "gerado_em": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "revisao": _git_revision(),
+        "python": sys.version.split()[0],
+        "parametros": {key: value for key, value in vars(args).items() if key != "output"},
+        "diretorio_temporario": workdir,
+    }
+    try:
+        if not args.skip_burst:
+            result["rajada"] = await bench_burst(main, spreadsheet, args)
+        if not args.skip_catch_up:
+            result["recuperacao"] = await bench_catch_up(main, spreadsheet, args)
+        if not args.skip_reports:
+            result["relatorios"] = await bench_reports(main, spreadsheet, args)
+    finally:
+        await main.pipelines.stop()
+        await main.backend.close()
+        await batch_writer.drain()
+        await journal.flush()
+        journal.close()
+        main.posted_today_cache.close()
+        main.channel_checkpoints.close()
+        sheets_client.shutdown()
+    result["sheets"] = spreadsheet.profile.report()
+    return result
+
+def write_result(path: str, result: dict):
+    """Acrescenta a execução ao arquivo de resultados (uma lista JSON), preservando as anteriores."""
+    runs = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            runs = json.load(f)
+    runs.append(result)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(runs, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.output = os.path.abspath(args.output)
+    result = asyncio.run(run(args))
+    write_result(args.output, result)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -1,34 +1,188 @@
 # cache_manager.py
+import asyncio
 import json
 import logging
+import os
+import sqlite3
+import threading
+from datetime import date
 
-CACHE_FILE = "presence_cache.json"
+CACHE_DB = "presence_cache.db"
+LEGACY_CACHE_FILE = "presence_cache.json"
 
-def load_cache() -> set:
+class PresenceCache:
     """
-    Carrega o cache de um arquivo JSON no início.
-    Se o arquivo não existir, retorna um cache vazio.
+    Conjunto das presenças já registradas, com chaves (data do evento, ID do jogador, evento, ID do canal).
+    Cada chave nova é gravada em SQLite antes de entrar no conjunto em memória, então nada se perde
+    se o processo cair; a limpeza diária apenas remove as partições (datas) antigas.
+    As gravações rodam em uma thread, fora do loop de eventos, e as chaves que chegam juntas vão
+    em um único commit.
     """
+
+    def __init__(self, path: str = CACHE_DB):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS presence_keys (
+                event_date TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                event_name TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                PRIMARY KEY (event_date, user_id, event_name, channel_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+        self._keys = {
+            (date.fromisoformat(event_date), user_id, event_name, channel_id)
+            for event_date, user_id, event_name, channel_id in self._conn.execute("SELECT * FROM presence_keys")
+        }
+        self._add_queue = []
+        self._add_task = None
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def add(self, key: tuple) -> bool:
+        """
+        Persiste a chave e só então a adiciona ao cache. Retorna False (e a chave fica fora do cache)
+        se a gravação falhar.
+        """
+        if key in self._keys:
+            return True
+        future = asyncio.get_running_loop().create_future()
+        self._add_queue.append((key, future))
+        if self._add_task is None or self._add_task.done():
+            self._add_task = asyncio.create_task(self._commit_adds())
+        return await future
+
+    async def _commit_adds(self):
+        while self._add_queue:
+            batch = self._add_queue[:]
+            self._add_queue.clear()
+            keys = [key for key, _ in batch]
+            try:
+                await asyncio.to_thread(self._insert, keys)
+            except sqlite3.Error as e:
+                logging.error(f"Falha ao salvar {len(keys)} chave(s) de presença no cache: {e}")
+                committed = False
+            else:
+                self._keys.update(keys)
+                committed = True
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(committed)
+
+    def _insert(self, keys: list):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO presence_keys VALUES (?, ?, ?, ?)",
+                [(event_date.isoformat(), user_id, event_name, channel_id) for event_date, user_id, event_name, channel_id in keys]
+            )
+            self._conn.commit()
+
+    async def evict_before(self, cutoff: date) -> int:
+        """Remove as partições de datas anteriores a `cutoff` e compacta o arquivo. Retorna quantas chaves saíram."""
+        old_keys = {key for key in self._keys if key[0] < cutoff}
+        self._keys -= old_keys
+        try:
+            await asyncio.to_thread(self._delete_before, cutoff)
+        except sqlite3.Error as e:
+            logging.error(f"Falha ao remover partições antigas do cache: {e}")
+        return len(old_keys)
+
+    def _delete_before(self, cutoff: date):
+        with self._lock:
+            self._conn.execute("DELETE FROM presence_keys WHERE event_date < ?", (cutoff.isoformat(),))
+            self._conn.commit()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def flush(self):
+        """Aguarda o commit agrupado em andamento (usado no desligamento, antes de close)."""
+        if self._add_task:
+            await asyncio.gather(self._add_task, return_exceptions=True)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _migrate_legacy_file(cache: PresenceCache, today: date):
+    """Importa o antigo presence_cache.json (chaves sem data) como presenças de hoje."""
     try:
-        with open(CACHE_FILE, 'r') as f:
-            # JSON não salva tuplas, então convertemos as listas de volta para tuplas
+        with open(LEGACY_CACHE_FILE, 'r') as f:
             list_of_lists = json.load(f)
-            return {tuple(item) for item in list_of_lists}
-    except FileNotFoundError:
-        logging.info("Arquivo de cache não encontrado. Iniciando com um cache vazio.")
-        return set()
-    except json.JSONDecodeError:
-        logging.warning("Arquivo de cache corrompido. Iniciando com um cache vazio.")
-        return set()
-
-def save_cache(cache_to_save: set):
+        # Ainda antes do loop de eventos: grava direto, em um único commit
+        keys = [(today, user_id, event_name, channel_id) for user_id, event_name, channel_id in list_of_lists]
+        cache._insert(keys)
+        cache._keys.update(keys)
+        logging.info(f"{len(list_of_lists)} chave(s) importada(s) do arquivo de cache antigo.")
+    except (json.JSONDecodeError, ValueError, TypeError):
+        logging.warning("Arquivo de cache antigo corrompido. Ignorando.")
+    except sqlite3.Error as e:
+        logging.error(f"Falha ao importar o arquivo de cache antigo: {e}")
+    os.replace(LEGACY_CACHE_FILE, LEGACY_CACHE_FILE + ".migrated")
+
+def load_cache(today: date) -> PresenceCache:
     """
-    Salva o cache atual em um arquivo JSON.
-    Converte as tuplas em listas para serem compatíveis com JSON.
+    Carrega o cache persistido no início.
+    Se o arquivo não existir, começa com um cache vazio.
     """
-    try:
-        with open(CACHE_FILE, 'w') as f:
-            list_of_lists = [list(item) for item in cache_to_save]
-            json.dump(list_of_lists, f)
-    except Exception as e:
-        logging.error(f"Falha ao salvar o cache no arquivo: {e}")
\ No newline at end of file
+    cache = PresenceCache()
+    if os.path.exists(LEGACY_CACHE_FILE):
+        _migrate_legacy_file(cache, today)
+    logging.info(f"Cache de presença carregado com {len(cache)} chave(s).")
+    return cache
+
+class ChannelCheckpoints:
+    """
+    Último ID de mensagem já processado em cada canal monitorado, usado para recuperar os posts
+    feitos enquanto o bot estava fora do ar. As atualizações ficam em memória e são gravadas
+    em lote por `flush` (perder as últimas só faz a recuperação rever mensagens já registradas).
+    """
+
+    def __init__(self, path: str = CACHE_DB):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_checkpoints (
+                channel_id INTEGER PRIMARY KEY,
+                message_id INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._checkpoints = dict(self._conn.execute("SELECT channel_id, message_id FROM channel_checkpoints"))
+        self._dirty = set()
+
+    def get(self, channel_id: int) -> int | None:
+        return self._checkpoints.get(channel_id)
+
+    def advance(self, channel_id: int, message_id: int):
+        """Avança o checkpoint do canal (nunca volta para uma mensagem anterior)."""
+        if message_id and message_id > self._checkpoints.get(channel_id, 0):
+            self._checkpoints[channel_id] = message_id
+            self._dirty.add(channel_id)
+
+    def flush(self) -> int:
+        """Grava os checkpoints alterados. Retorna quantos canais foram gravados."""
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO channel_checkpoints VALUES (?, ?)",
+                [(channel_id, self._checkpoints[channel_id]) for channel_id in dirty]
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            self._dirty |= dirty
+            logging.error(f"Falha ao salvar os checkpoints dos canais: {e}")
+            return 0
+        return len(dirty)
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,141 @@
+# channel_map.py
+import logging
+import validators
+
+class ChannelMap:
+    """
+    Mapa canal monitorado → configuração (aba, eventos e horário compilado), mantido por servidor.
+    O CONFIG é indexado por nome (categoria → canal) uma única vez; cada servidor é mapeado em uma
+    passada pelos seus canais de texto e depois atualizado canal a canal pelos eventos do gateway.
+    """
+
+    def __init__(self, config: dict):
+        self._by_name = self._index(config)
+        self._channels = {}     # id do canal → configuração (com guild_id)
+        self._keys = {}         # id do canal → (categoria, canal) no CONFIG
+        self._guilds = {}       # id do servidor → ids dos canais monitorados
+
+    @staticmethod
+    def _index(config: dict) -> dict:
+        return {
+            category_name: {
+                channel_name: {
+                    "worksheet_name": category_config["worksheet_name"],
+                    "events": events,
+                    "schedule": validators.get_schedule(events),
+                }
+                for channel_name, events in category_config["channels"].items()
+            }
+            for category_name, category_config in config.items()
+        }
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._channels
+
+    def __getitem__(self, channel_id: int) -> dict:
+        return self._channels[channel_id]
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def get(self, channel_id: int) -> dict | None:
+        return self._channels.get(channel_id)
+
+    def channel_ids(self) -> list:
+        return list(self._channels)
+
+    def has_guild(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def guild_channels(self, guild_id: int) -> list:
+        return [self._channels[channel_id] for channel_id in self._guilds.get(guild_id, ())]
+
+    def _resolve(self, channel) -> dict | None:
+        """Configuração do canal pelo par (categoria, nome), ou None se ele não for monitorado."""
+        category = getattr(channel, "category", None)
+        if category is None:
+            return None
+        config_entry = self._by_name.get(category.name, {}).get(channel.name)
+        if config_entry is None:
+            return None
+        return {**config_entry, "guild_id": channel.guild.id}
+
+    def _add(self, channel, config_entry: dict):
+        self._channels[channel.id] = config_entry
+        self._keys[channel.id] = (channel.category.name, channel.name)
+        self._guilds.setdefault(channel.guild.id, set()).add(channel.id)
+
+    def _pop(self, channel_id: int) -> dict | None:
+        self._keys.pop(channel_id, None)
+        return self._channels.pop(channel_id, None)
+
+    def apply_config(self, config: dict):
+        """
+        Troca os horários de todos os canais mapeados de uma só vez. Mensagens já em processamento
+        continuam com a entrada antiga, que não é alterada; as seguintes já veem a nova.
+        """
+        by_name = self._index(config)
+        channels = {}
+        for channel_id, (category_name, channel_name) in self._keys.items():
+            config_entry = by_name.get(category_name, {}).get(channel_name)
+            if config_entry:
+                channels[channel_id] = {**config_entry, "guild_id": self._channels[channel_id]["guild_id"]}
+        for guild_channels in self._guilds.values():
+            guild_channels.intersection_update(channels)
+        self._keys = {channel_id: self._keys[channel_id] for channel_id in channels}
+        self._by_name, self._channels = by_name, channels
+
+    def build_guild(self, guild) -> int:
+        """Mapeia (ou remapeia) todos os canais de um servidor. Retorna quantos são monitorados."""
+        self.remove_guild(guild.id)
+        self._guilds[guild.id] = set()
+        found = set()
+        for channel in guild.text_channels:
+            config_entry = self._resolve(channel)
+            if config_entry:
+                self._add(channel, config_entry)
+                found.add((channel.category.name, channel.name))
+                logging.info(f"OK: [{guild.name}] Monitorando canal '{channel.name}' -> Aba '{config_entry['worksheet_name']}'")
+
+        categories = {channel.category.name for channel in guild.text_channels if channel.category}
+        for category_name, channels in self._by_name.items():
+            if category_name not in categories:
+                logging.error(f"AVISO: [{guild.name}] Categoria '{category_name}' não encontrada.")
+                continue
+            for channel_name in channels:
+                if (category_name, channel_name) not in found:
+                    logging.error(f"AVISO: [{guild.name}] Canal '{channel_name}' não foi encontrado na categoria '{category_name}'.")
+        return len(self._guilds[guild.id])
+
+    def remove_guild(self, guild_id: int):
+        for channel_id in self._guilds.pop(guild_id, ()):
+            self._pop(channel_id)
+
+    def update_channel(self, channel):
+        """Canal criado, renomeado ou movido de categoria: passa a ser (ou deixa de ser) monitorado."""
+        config_entry = self._resolve(channel)
+        was_monitored = channel.id in self._channels
+        if config_entry:
+            self._add(channel, config_entry)
+            if not was_monitored:
+                logging.info(f"OK: [{channel.guild.name}] Monitorando canal '{channel.name}' -> Aba '{config_entry['worksheet_name']}'")
+        elif was_monitored:
+            self.remove_channel(channel)
+
+    def update_category(self, category):
+        """Categoria criada ou renomeada: reavalia apenas os canais dela."""
+        for channel in category.text_channels:
+            self.update_channel(channel)
+
+    def remove_channel(self, channel):
+        if self._pop(channel.id) is not None:
+            self._guilds.get(channel.guild.id, set()).discard(channel.id)
+            logging.warning(f"AVISO: [{channel.guild.name}] Canal '{channel.name}' deixou de ser monitorado.")
+
+    def remove_category(self, category):
+        """Categoria apagada: os canais dela ficam sem categoria e deixam de ser monitorados."""
+        for channel_id in list(self._guilds.get(category.guild.id, ())):
+            channel = category.guild.get_channel(channel_id)
+            if channel is None or channel.category is None or channel.category.id == category.id:
+                self._pop(channel_id)
+                self._guilds[category.guild.id].discard(channel_id)
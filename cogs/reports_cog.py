@@ -2,78 +2,96 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import gspread
-import pandas as pd
+import asyncio
 from datetime import datetime, timedelta
 import logging
-import sheets_client 
+import time
+import archive
+import metrics
+from nick_index import NickIndex
+import report_cache
+import report_engine
+import storage
+from validators import CATEGORIES
 from config import CONFIG # Importa a configuração central
 
 # --- CONFIGURAÇÕES ---
-SERVICE_ACCOUNT_FILE = 'credentials/bot-integration-464319-78fb375d86ee.json'
-SPREADSHEET_NAME = 'CONTROLE PRESENÇA SA'
 WORKSHEET_NAMES = [cat_config["worksheet_name"] for cat_config in CONFIG.values()]
-
-# --- FUNÇÃO AUXILIAR ---
-def get_data_as_dataframe(worksheet_name: str) -> pd.DataFrame:
-    """Busca dados de uma aba específica de forma robusta e retorna como um DataFrame pandas."""
-    try:
-        gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
-        sh = gc.open(SPREADSHEET_NAME)
-        worksheet = sh.worksheet(worksheet_name)
-        
-        all_values = worksheet.get_all_values()
-        
-        if len(all_values) < 2:
-            return pd.DataFrame()
-        
-        headers = ['DIA', 'EVENTO', 'HORA', 'NICK']
-        # A planilha armazena os dados em B:E — portanto pegamos colunas 1..4 (índices 1 a 4)
-        raw_data = all_values[1:]
-        data = [row[1:5] for row in raw_data]  # pega B, C, D, E
-        
-        df = pd.DataFrame(data, columns=headers)
-        
-        df['DIA'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y', errors='coerce')
-        df.dropna(subset=['DIA'], inplace=True)
-        return df
-    except Exception as e:
-        logging.error(f"Erro ao buscar dados da aba '{worksheet_name}': {e}")
-        return pd.DataFrame()
+NO_DATA = object()  # Resultado em cache para divisões sem nenhum registro
+UNAVAILABLE = "Os dados da divisão '{servidor}' estão temporariamente indisponíveis. Tente novamente em instantes."
+RANKING_CONCURRENCY = 3  # Divisões lidas ao mesmo tempo pelo /ranking_geral
 
 # --- COG DE RELATÓRIOS ---
 class ReportsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # O cache começa vazio e será populado no on_ready
+        # O cache começa vazio e é aquecido em segundo plano a partir do on_ready
         self.player_cache = {}
+        self.ready_servers = set()
+        self._warmup_task = None
+        # Nicks registrados enquanto um aquecimento está em andamento (somados ao novo índice)
+        self._added_during_warmup = {}
+        metrics.gauge(
+            "bot_player_cache_nicks", "Nicks no índice de autocomplete por divisão",
+            lambda: {name: len(index) for name, index in self.player_cache.items()}
+        )
 
     @commands.Cog.listener()
     async def on_ready(self):
-        """Este evento é chamado quando o Cog está pronto."""
-        await self.populate_initial_cache()
+        """Este evento é chamado quando o Cog está pronto (e novamente a cada reconexão)."""
+        if self.ready_servers.issuperset(WORKSHEET_NAMES):
+            logging.info("Cache de jogadores já aquecido; reconexão não exige nova carga.")
+            return
+        self.start_warmup()
+
+    def start_warmup(self):
+        """Dispara o aquecimento do cache em segundo plano, se ainda não houver um em andamento."""
+        if self._warmup_task and not self._warmup_task.done():
+            return
+        self._added_during_warmup = {name: [] for name in WORKSHEET_NAMES}
+        self._warmup_task = asyncio.create_task(self.populate_initial_cache())
 
     async def populate_initial_cache(self):
-        """Popula o cache de jogadores uma vez na inicialização do bot."""
+        """
+        Popula o cache de jogadores com os nicks de todas as divisões (na planilha, apenas a coluna
+        NICK em uma única requisição). Cada divisão fica pronta assim que seus dados chegam;
+        até lá o índice anterior (se houver) continua em uso.
+        """
         logging.info("A popular o cache inicial de jogadores para o autocomplete...")
-        for server_name in WORKSHEET_NAMES:
-            df = get_data_as_dataframe(server_name)
-            if not df.empty:
-                self.player_cache[server_name] = df['NICK'].dropna().unique().tolist()
-        logging.info("Cache inicial de jogadores populado com sucesso.")
+        try:
+            columns = await storage.get_backend().list_nicks(WORKSHEET_NAMES)
+            for server_name, nicks in columns.items():
+                await self._install_index(server_name, nicks)
+        except Exception as e:
+            logging.error(f"Erro ao carregar os nicks para o autocomplete: {e}")
+        finally:
+            self._added_during_warmup = {}
+        logging.info(f"Cache inicial de jogadores populado: {len(self.ready_servers)}/{len(WORKSHEET_NAMES)} divisões prontas.")
+
+    async def _install_index(self, server_name: str, nicks: list):
+        index = await asyncio.to_thread(NickIndex, nicks)
+        for nick in self._added_during_warmup.get(server_name, []):
+            index.add(nick)
+        self.player_cache[server_name] = index
+        self.ready_servers.add(server_name)
 
-    def clear_player_cache(self):
-        """Limpa o cache de jogadores (chamado pela tarefa diária)."""
-        logging.info("A limpar o cache de jogadores do autocomplete.")
-        self.player_cache.clear()
+    def refresh_player_cache(self):
+        """
+        Renova o cache de jogadores (chamado pela tarefa diária).
+        O índice atual continua atendendo o autocomplete até o novo ficar pronto.
+        """
+        logging.info("A renovar o cache de jogadores do autocomplete.")
+        self.start_warmup()
 
     def add_player_to_cache(self, server_name: str, player_name: str):
         """Adiciona um novo jogador ao cache em memória dinamicamente."""
         if server_name not in self.player_cache:
-            self.player_cache[server_name] = []
+            self.player_cache[server_name] = NickIndex()
 
-        if player_name not in self.player_cache[server_name]:
-            self.player_cache[server_name].append(player_name)
+        if server_name in self._added_during_warmup:
+            self._added_during_warmup[server_name].append(player_name)
+
+        if self.player_cache[server_name].add(player_name):
             logging.info(f"Jogador '{player_name}' adicionado dinamicamente ao cache de autocomplete para '{server_name}'.")
 
     async def player_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
@@ -81,12 +99,10 @@ class ReportsCog(commands.Cog):
         if not server_choice or server_choice not in self.player_cache:
             return []
             
-        all_nicks = self.player_cache[server_choice]
-        
         return [
             app_commands.Choice(name=nick, value=nick)
-            for nick in all_nicks if nick and current.lower() in nick.lower()
-        ][:25]
+            for nick in self.player_cache[server_choice].search(current)
+        ]
 
     @app_commands.command(name="presenca", description="Verifica a presença detalhada de um jogador.")
     @app_commands.describe(servidor="Escolha a divisão/servidor.", jogador="Comece a digitar o nick do jogador.")
@@ -95,46 +111,50 @@ class ReportsCog(commands.Cog):
     @app_commands.default_permissions(administrator=True) 
     async def presenca(self, interaction: discord.Interaction, servidor: str, jogador: str):
         await interaction.response.defer(ephemeral=True)
+        started = time.perf_counter()
         
-        df = get_data_as_dataframe(servidor)
-        if df.empty:
-            await interaction.followup.send(f"Não há dados de presença para a divisão '{servidor}'.", ephemeral=True)
-            return
-
         today = datetime.now()
         start_of_week = (today - timedelta(days=(today.weekday() + 1) % 7)).replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_week = start_of_week + timedelta(days=6)
-        start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        player_df = df[df['NICK'].str.lower() == jogador.lower()]
-        if player_df.empty:
+        backend = storage.get_backend()
+        async def compute():
+            if not await backend.has_data(servidor):
+                return NO_DATA
+            return await backend.player_summary(servidor, jogador, today)
+
+        # Mesma divisão, jogador, semana e mês: reaproveita o resultado até a próxima gravação na divisão
+        key = ("presenca", servidor, jogador.casefold(), (start_of_week.date(), today.year, today.month))
+        try:
+            summary = await report_cache.results.get_or_compute(key, compute)
+        except Exception as e:
+            # Planilha ou importação fora do ar não significa divisão vazia
+            logging.error(f"Erro ao buscar dados da divisão '{servidor}': {e}")
+            await interaction.followup.send(UNAVAILABLE.format(servidor=servidor), ephemeral=True)
+            return
+        if summary is NO_DATA:
+            await interaction.followup.send(f"Não há dados de presença para a divisão '{servidor}'.", ephemeral=True)
+            return
+        if summary is None:
             await interaction.followup.send(f"Nenhum registro encontrado para o jogador '{jogador}' na divisão '{servidor}'.", ephemeral=True)
             return
 
-        weekly_player_df = player_df[player_df['DIA'] >= start_of_week]
-        wb_semanal = weekly_player_df[weekly_player_df['EVENTO'].str.contains("WB", na=False)].shape[0]
-        pico_praca_semanal = weekly_player_df[weekly_player_df['EVENTO'].str.contains("Pico|Praça", na=False)].shape[0]
-        torre_mensal = weekly_player_df[weekly_player_df['EVENTO'].str.contains("Torre", na=False)].shape[0]
-
-        monthly_player_df = player_df[player_df['DIA'] >= start_of_month]
-        wb_mensal = monthly_player_df[monthly_player_df['EVENTO'].str.contains("WB", na=False)].shape[0]
-        eventos_mensal = monthly_player_df[~monthly_player_df['EVENTO'].str.contains("WB|Pico|Praça|Torre", na=False)].shape[0]
-
         meses = {1: "Janeiro", 2: "Fevereiro", 3: "Março", 4: "Abril", 5: "Maio", 6: "Junho", 7: "Julho", 8: "Agosto", 9: "Setembro", 10: "Outubro", 11: "Novembro", 12: "Dezembro"}
         nome_mes = meses[today.month]
 
         embed = discord.Embed(title=f"📊 Relatório de Presença - {jogador}", description=f"Dados da divisão: **{servidor}**", color=discord.Color.blue())
-        embed.add_field(name="WB (Semanal)", value=f"`{wb_semanal}/35`", inline=True)
-        embed.add_field(name="Praça/Pico (Semanal)", value=f"`{pico_praca_semanal}/56`", inline=True)
+        embed.add_field(name="WB (Semanal)", value=f"`{summary['wb_semanal']}/35`", inline=True)
+        embed.add_field(name="Praça/Pico (Semanal)", value=f"`{summary['pico_praca_semanal']}/56`", inline=True)
         embed.add_field(name="\u200b", value="\u200b", inline=True)
-        embed.add_field(name="WB (Mensal)", value=f"`{wb_mensal}` presenças", inline=True)
-        embed.add_field(name="Torre (Mensal)", value=f"`{torre_mensal}` presenças", inline=True)
-        embed.add_field(name="Eventos (Mensal)", value=f"`{eventos_mensal}` presenças", inline=True)
+        embed.add_field(name="WB (Mensal)", value=f"`{summary['wb_mensal']}` presenças", inline=True)
+        embed.add_field(name="Torre (Mensal)", value=f"`{summary['torre_mensal']}` presenças", inline=True)
+        embed.add_field(name="Eventos (Mensal)", value=f"`{summary['eventos_mensal']}` presenças", inline=True)
 
         
         semana_str = f"{start_of_week.strftime('%d/%m')} a {end_of_week.strftime('%d/%m')}"
         embed.set_footer(text=f"Semana: {semana_str} | Mês: {nome_mes} de {today.year}")
         
+        metrics.REPORT_LATENCY.observe(time.perf_counter() - started, comando="presenca")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
     @app_commands.command(name="presencas", description="Mostra os rankings de presença para uma divisão.")
@@ -143,21 +163,30 @@ class ReportsCog(commands.Cog):
     @app_commands.default_permissions(administrator=True) # <-- MUDANÇA APLICADA AQUI
     async def presencas(self, interaction: discord.Interaction, servidor: str):
         await interaction.response.defer(ephemeral=True)
+        started = time.perf_counter()
         
-        df = get_data_as_dataframe(servidor)
-        if df.empty:
-            await interaction.followup.send(f"Não há dados de presença para a divisão '{servidor}'.", ephemeral=True)
-            return
-
         today = datetime.now()
         start_of_week = (today - timedelta(days=(today.weekday() + 1) % 7)).replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_week = start_of_week + timedelta(days=6)
-        weekly_df = df[df['DIA'] >= start_of_week]
 
-        top_10_wb = weekly_df[weekly_df['EVENTO'].str.contains("WB", na=False)]['NICK'].value_counts().nlargest(10)
-        top_10_pico_praca = weekly_df[weekly_df['EVENTO'].str.contains("Pico|Praça", na=False)]['NICK'].value_counts().nlargest(10)
-        top_10_eventos = weekly_df[~weekly_df['EVENTO'].str.contains("WB|Pico|Praça|Torre", na=False)]['NICK'].value_counts().nlargest(10)
-        top_10_torre = weekly_df[weekly_df['EVENTO'].str.contains("Torre", na=False)]['NICK'].value_counts().nlargest(10)
+        backend = storage.get_backend()
+        async def compute():
+            if not await backend.has_data(servidor):
+                return NO_DATA
+            # Só as linhas da semana (no SQLite, uma consulta pelo índice (aba, dia)) e um único
+            # agrupamento (categoria, nick) para todos os rankings
+            return report_engine.top_rankings(await backend.get_frame(servidor, start_of_week.date()))
+
+        try:
+            rankings = await report_cache.results.get_or_compute(("presencas", servidor, None, start_of_week.date()), compute)
+        except Exception as e:
+            # Planilha ou importação fora do ar não significa divisão vazia
+            logging.error(f"Erro ao buscar dados da divisão '{servidor}': {e}")
+            await interaction.followup.send(UNAVAILABLE.format(servidor=servidor), ephemeral=True)
+            return
+        if rankings is NO_DATA:
+            await interaction.followup.send(f"Não há dados de presença para a divisão '{servidor}'.", ephemeral=True)
+            return
 
         semana_str = f"{start_of_week.strftime('%d/%m')} a {end_of_week.strftime('%d/%m')}"
         embed = discord.Embed(
@@ -165,19 +194,116 @@ class ReportsCog(commands.Cog):
             description=f"**Período Semanal:** {semana_str}",
             color=discord.Color.gold()
         )
+        for category in CATEGORIES:
+            text = "\n".join(f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(rankings[category], 1))
+            embed.add_field(name=f"{category} (Top 10)", value=text or "Nenhum registro.", inline=True)
         
-        wb_text = "\n".join([f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(top_10_wb.items(), 1)]) or "Nenhum registro."
-        pico_praca_text = "\n".join([f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(top_10_pico_praca.items(), 1)]) or "Nenhum registro."
-        eventos_text = "\n".join([f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(top_10_eventos.items(), 1)]) or "Nenhum registro."
-        torre_text = "\n".join([f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(top_10_torre.items(), 1)]) or "Nenhum registro."
+        metrics.REPORT_LATENCY.observe(time.perf_counter() - started, comando="presencas")
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="ranking_geral", description="Mostra os rankings de presença somando todas as divisões.")
+    @app_commands.describe(periodo="Semana atual ou mês atual.")
+    @app_commands.choices(periodo=[
+        app_commands.Choice(name="Semana", value="semana"),
+        app_commands.Choice(name="Mês", value="mes"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    async def ranking_geral(self, interaction: discord.Interaction, periodo: str = "semana"):
+        await interaction.response.defer(ephemeral=True)
+        started = time.perf_counter()
 
-        embed.add_field(name="WB (Top 10)", value=wb_text, inline=True)
-        embed.add_field(name="Praça/Pico (Top 10)", value=pico_praca_text, inline=True)
-        embed.add_field(name="WB (Top 10)", value=wb_text, inline=True)
-        embed.add_field(name="Torre (Top 10)", value=torre_text, inline=True)
-        embed.add_field(name="Eventos (Top 10)", value=eventos_text, inline=True) # Mudei a ordem para agrupar melhor
-        
+        today = datetime.now()
+        if periodo == "mes":
+            since = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            period_text = f"**Período Mensal:** {since.strftime('%m/%Y')}"
+        else:
+            since = (today - timedelta(days=(today.weekday() + 1) % 7)).replace(hour=0, minute=0, second=0, microsecond=0)
+            period_text = f"**Período Semanal:** {since.strftime('%d/%m')} a {(since + timedelta(days=6)).strftime('%d/%m')}"
+
+        async def compute():
+            # Cada divisão entrega só o top 10 por categoria, já agregado pelo armazenamento
+            # (contadores do índice de presenças ou uma consulta agrupada no SQLite), sem DataFrames
+            backend = storage.get_backend()
+            # Poucas divisões por vez: limita as leituras simultâneas (e as linhas em memória)
+            semaphore = asyncio.Semaphore(RANKING_CONCURRENCY)
+
+            async def fetch(server_name: str):
+                async with semaphore:
+                    return server_name, await backend.period_rankings(server_name, periodo, today.date())
+
+            return report_engine.merge_rankings(dict(await asyncio.gather(*(fetch(name) for name in WORKSHEET_NAMES))))
+
+        try:
+            rankings = await report_cache.results.get_or_compute(("ranking_geral", None, None, (periodo, since.date())), compute)
+        except Exception as e:
+            logging.error(f"Erro ao calcular o ranking geral: {e}")
+            await interaction.followup.send("Não foi possível calcular o ranking geral agora. Tente novamente em instantes.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="🌎 Ranking Geral de Presença", description=period_text, color=discord.Color.gold())
+        for category in CATEGORIES:
+            text = "\n".join(
+                f"{i}. **{name}** · {server_name.removeprefix('SOUTH AMERICA ')} (`{count}`)"
+                for i, (name, server_name, count) in enumerate(rankings[category], 1)
+            )
+            embed.add_field(name=f"{category} (Top 10)", value=text or "Nenhum registro.", inline=True)
+
+        metrics.REPORT_LATENCY.observe(time.perf_counter() - started, comando="ranking_geral")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="historico", description="Consulta presenças de meses anteriores, incluindo o arquivo histórico.")
+    @app_commands.describe(
+        servidor="Escolha a divisão/servidor.",
+        inicio="Mês inicial (MM/AAAA).",
+        fim="Mês final (MM/AAAA). Padrão: o mês inicial.",
+        jogador="Opcional: nick do jogador (sem ele, mostra os rankings)."
+    )
+    @app_commands.choices(servidor=[app_commands.Choice(name=name, value=name) for name in WORKSHEET_NAMES])
+    @app_commands.autocomplete(jogador=player_autocomplete)
+    @app_commands.default_permissions(administrator=True)
+    async def historico(self, interaction: discord.Interaction, servidor: str, inicio: str, fim: str = None, jogador: str = None):
+        await interaction.response.defer(ephemeral=True)
+        started = time.perf_counter()
+
+        try:
+            first_month = datetime.strptime(inicio.strip(), "%m/%Y").date()
+            last_month = datetime.strptime((fim or inicio).strip(), "%m/%Y").date()
+        except ValueError:
+            await interaction.followup.send("Use o formato MM/AAAA para os meses (ex.: 09/2025).", ephemeral=True)
+            return
+        if last_month < first_month:
+            await interaction.followup.send("O mês final deve ser igual ou posterior ao mês inicial.", ephemeral=True)
+            return
+
+        backend = storage.get_backend()
+        async def compute():
+            # Só as partições dos meses pedidos e só as colunas EVENTO/NICK são lidas do arquivo
+            df = await archive.history_frame(servidor, first_month, last_month, lambda since: backend.get_frame(servidor, since))
+            if jogador:
+                df = df[df['NICK'].astype(str).str.casefold() == jogador.casefold()]
+                return report_engine.category_totals(df)
+            return report_engine.top_rankings(df)
+
+        key = ("historico", servidor, jogador.casefold() if jogador else None, (first_month, last_month))
+        try:
+            result = await report_cache.results.get_or_compute(key, compute)
+        except Exception as e:
+            logging.error(f"Erro na consulta histórica da divisão '{servidor}': {e}")
+            await interaction.followup.send("Não foi possível consultar o histórico agora. Tente novamente em instantes.", ephemeral=True)
+            return
+
+        period_text = first_month.strftime('%m/%Y') if first_month == last_month else f"{first_month.strftime('%m/%Y')} a {last_month.strftime('%m/%Y')}"
+        if jogador:
+            embed = discord.Embed(title=f"🗂️ Histórico de Presença - {jogador}", description=f"Divisão **{servidor}** · **Período:** {period_text}", color=discord.Color.blue())
+            for category in CATEGORIES:
+                embed.add_field(name=category, value=f"`{result[category]}` presenças", inline=True)
+        else:
+            embed = discord.Embed(title=f"🗂️ Histórico de Rankings - {servidor}", description=f"**Período:** {period_text}", color=discord.Color.gold())
+            for category in CATEGORIES:
+                text = "\n".join(f"{i}. **{name}** (`{count}`)" for i, (name, count) in enumerate(result[category], 1))
+                embed.add_field(name=f"{category} (Top 10)", value=text or "Nenhum registro.", inline=True)
+
+        metrics.REPORT_LATENCY.observe(time.perf_counter() - started, comando="historico")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,81 @@
+# cogs/stats_cog.py
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+import image_hash
+import metrics
+
+MAX_FIELD_LENGTH = 1024  # Limite do Discord por campo de embed
+
+def _truncate(lines: list) -> str:
+    text = "\n".join(lines) or "Sem dados."
+    return text if len(text) <= MAX_FIELD_LENGTH else text[:MAX_FIELD_LENGTH - 1] + "…"
+
+def _series_label(key: tuple) -> str:
+    return ", ".join(value for _, value in key) or "total"
+
+def _format_value(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+# --- COG DE MÉTRICAS ---
+class StatsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="stats", description="Mostra métricas de desempenho do bot.")
+    @app_commands.default_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        embed = discord.Embed(title="📈 Métricas do Bot", color=discord.Color.teal())
+
+        latency_lines = []
+        for metric in metrics.all_metrics():
+            if not isinstance(metric, metrics.Histogram):
+                continue
+            for key in metric.series:
+                p = metric.percentiles(key)
+                if p:
+                    latency_lines.append(
+                        f"**{metric.name.removeprefix('bot_')}** ({_series_label(key)}): "
+                        f"p50 `{p['p50'] * 1000:.1f}ms` · p99 `{p['p99'] * 1000:.1f}ms` · n=`{p['count']}`"
+                    )
+        embed.add_field(name="Latências", value=_truncate(latency_lines), inline=False)
+
+        # Posts agregados por resultado (o detalhe por divisão/evento fica no exportador)
+        by_outcome = {}
+        for key, value in metrics.PRESENCE_POSTS.values.items():
+            outcome = dict(key).get("resultado", "?")
+            by_outcome[outcome] = by_outcome.get(outcome, 0) + value
+        embed.add_field(
+            name="Posts",
+            value=_truncate([f"{outcome}: `{int(total)}`" for outcome, total in sorted(by_outcome.items())]),
+            inline=False
+        )
+
+        gauge_lines = []
+        for metric in metrics.all_metrics():
+            if isinstance(metric, metrics.Gauge):
+                values = metric.collect()
+                details = " · ".join(f"{_series_label(key)}=`{_format_value(value)}`" for key, value in values.items())
+                gauge_lines.append(f"**{metric.name.removeprefix('bot_')}**: {details or '-'}")
+        embed.add_field(name="Caches e filas", value=_truncate(gauge_lines), inline=False)
+
+        errors = int(metrics.SHEETS_ERRORS.total())
+        embed.set_footer(text=f"Falhas na API do Sheets: {errors}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="verificacao_prints", description="Liga ou desliga a verificação de prints reaproveitados.")
+    @app_commands.describe(ativa="Verificar (ou não) os próximos prints aceitos. Útil para aliviar o bot em horários de pico.")
+    @app_commands.default_permissions(administrator=True)
+    async def verificacao_prints(self, interaction: discord.Interaction, ativa: bool):
+        checker = image_hash.get_checker()
+        if checker is None:
+            await interaction.response.send_message("A verificação de prints não está disponível: o pacote 'Pillow' não está instalado.", ephemeral=True)
+            return
+        checker.set_enabled(ativa)
+        state = "ligada" if ativa else "desligada"
+        logging.info(f"Verificação de prints reaproveitados {state} por {interaction.user}.")
+        await interaction.response.send_message(f"Verificação de prints reaproveitados {state}.", ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCog(bot))
@@ -3,6 +3,10 @@ from datetime import time
 # Dias da semana: 0=Seg, 1=Ter, 2=Qua, 3=Qui, 4=Sex, 5=Sáb, 6=Dom
 ALL_DAYS = [0, 1, 2, 3, 4, 5, 6]
 
+# Horários padrão (fonte única no repositório). Para mudá-los sem reiniciar o bot, gere o arquivo
+# de horários com `python schedule_loader.py` (cria o schedule.json a partir daqui) e edite-o: se
+# existir, o SCHEDULE_FILE tem prioridade sobre estes valores e é recarregado automaticamente.
+
 # ---------------------------
 # Slots de World Boss (WB) + Praça/Pico
 # ---------------------------
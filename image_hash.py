@@ -0,0 +1,199 @@
+# image_hash.py
+import asyncio
+import io
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+MAX_DOWNLOAD_BYTES = 8 * 1024 * 1024    # Prints maiores não são baixados nem comparados
+HASH_WORKERS = 2
+MAX_PENDING = 50                        # Acima disso (pico de posts), novas verificações são puladas
+MAX_HASHES_PER_DAY = 5000
+MATCH_DISTANCE = 6                      # Bits diferentes (de 64) tolerados para considerar o mesmo print
+
+_executor = None
+
+def is_available() -> bool:
+    """O hash perceptual depende do Pillow (opcional)."""
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def compute_dhash(data: bytes) -> int:
+    """
+    dHash de 64 bits: a imagem vira 9×8 em tons de cinza e cada bit diz se um pixel é mais claro
+    que o vizinho à direita. Recompressão, redimensionamento e pequenos recortes mudam poucos bits.
+    Roda nos processos do pool (função de módulo, para poder ser enviada a eles).
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Para JPEG, decodifica já reduzido (bem mais rápido em prints grandes)
+        image.draft("L", (64, 64))
+        pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left, right = pixels[row * 9 + column], pixels[row * 9 + column + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def start():
+    """
+    Cria o pool e já inicia os HASH_WORKERS processos, para o primeiro print não esperar por eles.
+    Os processos são criados com "spawn" (interpretador novo, sem herdar por fork o estado do bot);
+    eles importam o main.py sem executar a inicialização, que fica sob `if __name__ == "__main__"`.
+    """
+    global _executor
+    if _executor is not None:
+        return
+    _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    for _ in range(HASH_WORKERS):
+        _executor.submit(is_available)
+
+def _get_executor() -> ProcessPoolExecutor:
+    if _executor is None:
+        start()
+    return _executor
+
+async def attachment_hash(attachment) -> int | None:
+    """Baixa o anexo (respeitando MAX_DOWNLOAD_BYTES) e calcula o hash fora do loop de eventos."""
+    if attachment.size and attachment.size > MAX_DOWNLOAD_BYTES:
+        return None
+    data = await attachment.read()
+    if len(data) > MAX_DOWNLOAD_BYTES:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), compute_dhash, data)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+class HashIndex:
+    """
+    Hashes dos prints já aceitos, particionados pela data do evento (a mesma do cache de presenças)
+    e limitados a MAX_HASHES_PER_DAY por dia (os mais antigos saem primeiro).
+    """
+
+    def __init__(self, max_per_day: int = MAX_HASHES_PER_DAY):
+        self.max_per_day = max_per_day
+        self._days = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._days.values())
+
+    def find(self, day: date, value: int, max_distance: int = MATCH_DISTANCE) -> tuple | None:
+        """Retorna (distância, info) do print mais parecido do dia, se estiver dentro de `max_distance`."""
+        best = None
+        for other, info in self._days.get(day, ()):
+            distance = (value ^ other).bit_count()
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, info)
+        return best
+
+    def add(self, day: date, value: int, info: dict):
+        entries = self._days.get(day)
+        if entries is None:
+            entries = self._days[day] = deque(maxlen=self.max_per_day)
+        entries.append((value, info))
+
+    def evict_before(self, cutoff: date) -> int:
+        """Remove os dias anteriores a `cutoff`. Retorna quantos hashes saíram."""
+        removed = 0
+        for day in [day for day in self._days if day < cutoff]:
+            removed += len(self._days.pop(day))
+        return removed
+
+class ReuseChecker:
+    """
+    Etapa opcional executada após o registro: compara o print com os já aceitos no mesmo dia.
+    Pode ser desligada e religada com o bot rodando (ex.: em horários de pico) por `set_enabled`.
+    """
+
+    def __init__(self, index: HashIndex = None, max_pending: int = MAX_PENDING, enabled: bool = True):
+        self.index = index or HashIndex()
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self.pending = 0
+        self.checked = 0
+        self.skipped = 0
+        self.failed = 0
+        self.matches = 0
+        self._tasks = set()
+
+    def set_enabled(self, enabled: bool):
+        """Liga ou desliga a verificação dos próximos prints (as já agendadas terminam normalmente)."""
+        self.enabled = enabled
+        if enabled:
+            start()
+
+    def submit(self, day: date, attachment, info: dict, on_match):
+        """
+        Agenda a verificação em segundo plano (o registro da presença não espera por ela).
+        `on_match(info, distância, info_do_original)` é chamado se o print parecer reaproveitado.
+        """
+        if not self.enabled:
+            return
+        if self.pending >= self.max_pending:
+            self.skipped += 1
+            return
+        self.pending += 1
+        task = asyncio.create_task(self._check(day, attachment, info, on_match))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _check(self, day: date, attachment, info: dict, on_match):
+        try:
+            value = await attachment_hash(attachment)
+        except Exception as e:
+            self.failed += 1
+            logging.warning(f"Não foi possível calcular o hash do print de '{info.get('nick')}': {e}")
+            return
+        finally:
+            self.pending -= 1
+        if value is None:
+            self.skipped += 1
+            return
+        self.checked += 1
+        match = self.index.find(day, value)
+        self.index.add(day, value, info)
+        if match:
+            self.matches += 1
+            on_match(info, *match)
+
+    def stats(self) -> dict:
+        return {
+            "ativo": int(self.enabled),
+            "verificados": self.checked,
+            "pulados": self.skipped,
+            "falhas": self.failed,
+            "reaproveitados": self.matches,
+            "pendentes": self.pending,
+            "hashes": len(self.index),
+        }
+
+# --- VERIFICADOR ATIVO ---
+_checker = None
+
+def configure(enabled: bool) -> ReuseChecker | None:
+    """
+    Cria o verificador (ligado ou não, conforme `enabled`) se o Pillow estiver instalado; senão
+    retorna None. Ligado, o pool de processos já é iniciado.
+    """
+    global _checker
+    if not is_available():
+        _checker = None
+        return None
+    _checker = ReuseChecker(enabled=enabled)
+    if enabled:
+        start()
+    return _checker
+
+def get_checker() -> ReuseChecker | None:
+    return _checker
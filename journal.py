@@ -0,0 +1,188 @@
+# journal.py
+import asyncio
+import logging
+import sqlite3
+import threading
+import batch_writer
+
+JOURNAL_FILE = "presence_journal.db"
+REPLAY_BATCH_LIMIT = 500
+COMPACT_AFTER_DAYS = 7     # Entradas já sincronizadas ficam este tempo no journal antes de serem apagadas
+
+_conn = None
+_lock = threading.Lock()
+# Entradas não sincronizadas, mantido junto com os commits: a métrica não consulta o SQLite no loop
+_pending_count = 0
+# IDs já entregues ao batch_writer e ainda sem confirmação gravada (evita reenvio pelo replayer)
+_in_flight = set()
+# Gravações agrupadas: as presenças que chegam juntas vão em um único commit, fora do loop de eventos
+_append_queue = []
+_append_task = None
+_synced_queue = []
+_synced_task = None
+
+def _get_connection() -> sqlite3.Connection:
+    """Abre o journal (SQLite em modo WAL) na primeira chamada e cria a tabela se necessário."""
+    global _conn, _pending_count
+    if _conn is None:
+        conn = sqlite3.connect(JOURNAL_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS presences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                worksheet TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                evento TEXT NOT NULL,
+                hora TEXT NOT NULL,
+                nick TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                synced INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_presences_pending ON presences(id) WHERE synced = 0")
+        conn.commit()
+        _pending_count = conn.execute("SELECT COUNT(*) FROM presences WHERE synced = 0").fetchone()[0]
+        _conn = conn
+    return _conn
+
+async def append(worksheet_name: str, row: list) -> int:
+    """
+    Grava a presença no journal antes de qualquer acesso ao Sheets. Retorna o ID da entrada.
+    As presenças enfileiradas enquanto um commit está em andamento vão juntas no próximo.
+    """
+    global _append_task
+    future = asyncio.get_running_loop().create_future()
+    _append_queue.append((worksheet_name, row, future))
+    if _append_task is None or _append_task.done():
+        _append_task = asyncio.create_task(_commit_appends())
+    return await future
+
+async def _commit_appends():
+    while _append_queue:
+        batch = _append_queue[:]
+        _append_queue.clear()
+        try:
+            entry_ids = await asyncio.to_thread(_insert, [(worksheet_name, row) for worksheet_name, row, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, _, future), entry_id in zip(batch, entry_ids):
+            if not future.done():
+                future.set_result(entry_id)
+
+def _insert(entries: list) -> list:
+    global _pending_count
+    with _lock:
+        conn = _get_connection()
+        entry_ids = [
+            conn.execute(
+                "INSERT INTO presences (worksheet, dia, evento, hora, nick) VALUES (?, ?, ?, ?, ?)",
+                (worksheet_name, *row)
+            ).lastrowid
+            for worksheet_name, row in entries
+        ]
+        conn.commit()
+        _pending_count += len(entry_ids)
+        return entry_ids
+
+def mark_synced(entry_ids: list):
+    """Marca as entradas como já presentes na planilha."""
+    global _pending_count
+    if not entry_ids:
+        return
+    with _lock:
+        conn = _get_connection()
+        marked = conn.executemany(
+            "UPDATE presences SET synced = 1 WHERE id = ? AND synced = 0", [(entry_id,) for entry_id in entry_ids]
+        ).rowcount
+        conn.commit()
+        _pending_count -= marked
+
+async def pending(limit: int = REPLAY_BATCH_LIMIT) -> list:
+    """Retorna até `limit` entradas ainda não sincronizadas, como (id, aba, linha). A leitura roda em uma thread."""
+    return await asyncio.to_thread(_select_pending, limit)
+
+def _select_pending(limit: int) -> list:
+    with _lock:
+        rows = _get_connection().execute(
+            "SELECT id, worksheet, dia, evento, hora, nick FROM presences WHERE synced = 0 ORDER BY id LIMIT ?",
+            (limit,)
+        ).fetchall()
+    return [(entry_id, worksheet, [dia, evento, hora, nick]) for entry_id, worksheet, dia, evento, hora, nick in rows]
+
+def pending_count() -> int:
+    """Entradas ainda não sincronizadas (contador em memória; 0 antes do journal ser aberto)."""
+    return _pending_count
+
+def compact(days: int = COMPACT_AFTER_DAYS) -> int:
+    """Apaga as entradas sincronizadas há mais de `days` dias. Retorna quantas foram removidas."""
+    with _lock:
+        conn = _get_connection()
+        removed = conn.execute(
+            "DELETE FROM presences WHERE synced = 1 AND created_at < datetime('now', ?)", (f"-{days} days",)
+        ).rowcount
+        conn.commit()
+    return removed
+
+# --- SINCRONIZAÇÃO COM O SHEETS ---
+def sync(entry_id: int, worksheet_name: str, row: list) -> bool:
+    """
+    Envia a entrada ao batch_writer em segundo plano; ela é marcada como sincronizada após o commit do lote.
+    Se o Sheets estiver congestionado, a entrada fica no journal para o replayer e retorna False.
+    """
+    if batch_writer.available_capacity() <= 0:
+        return False
+    _in_flight.add(entry_id)
+    future = batch_writer.enqueue(worksheet_name, row)
+    future.add_done_callback(lambda f: _on_batch_done(entry_id, f))
+    return True
+
+def _on_batch_done(entry_id: int, future):
+    if future.cancelled() or not future.result():
+        # Continua pendente; o replayer tentará novamente
+        _in_flight.discard(entry_id)
+        return
+    # Continua "em andamento" até a marcação ser gravada, para o replayer não reenviá-la
+    global _synced_task
+    _synced_queue.append(entry_id)
+    if _synced_task is None or _synced_task.done():
+        _synced_task = asyncio.create_task(_commit_synced())
+
+async def _commit_synced():
+    while _synced_queue:
+        entry_ids = _synced_queue[:]
+        _synced_queue.clear()
+        try:
+            await asyncio.to_thread(mark_synced, entry_ids)
+        except Exception as e:
+            logging.error(f"Falha ao marcar {len(entry_ids)} entrada(s) do journal como sincronizada(s): {e}")
+        finally:
+            _in_flight.difference_update(entry_ids)
+
+async def replay_pending() -> int:
+    """Reenvia ao Sheets as entradas pendentes que não estão em andamento. Retorna quantas foram reenviadas."""
+    capacity = min(batch_writer.available_capacity(), REPLAY_BATCH_LIMIT)
+    if capacity <= 0:
+        logging.warning(f"Journal: Sheets congestionado ({batch_writer.backlog_count()} linhas pendentes). Reenvio adiado.")
+        return 0
+    entries = [entry for entry in await pending(capacity + len(_in_flight)) if entry[0] not in _in_flight][:capacity]
+    for entry_id, worksheet_name, row in entries:
+        sync(entry_id, worksheet_name, row)
+    if entries:
+        logging.info(f"Journal: {len(entries)} presença(s) pendente(s) reenviada(s) para a planilha.")
+    return len(entries)
+
+async def flush():
+    """Aguarda os commits agrupados em andamento (usado no desligamento, antes de close)."""
+    await asyncio.gather(*(task for task in (_append_task, _synced_task) if task), return_exceptions=True)
+
+def close():
+    global _conn, _pending_count
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+            _pending_count = 0
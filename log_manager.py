@@ -1,12 +1,31 @@
 # log_manager.py
+import asyncio
 import discord
 import logging
+from collections import Counter, deque
+
+# Níveis de severidade (cada um pode ir para um canal diferente)
+LEVEL_INFO = "info"
+LEVEL_WARNING = "warning"
+LEVEL_ERROR = "error"
+
+MAX_PENDING = 500               # Entradas aguardando envio antes de começar a descartar
+MAX_EMBEDS_PER_MESSAGE = 10     # Limite do Discord por mensagem
+MAX_CHARS_PER_MESSAGE = 5500    # O Discord aceita até 6000 caracteres somando todos os embeds
+FLUSH_INTERVAL = 3.0            # Segundos acumulando entradas antes de cada envio
+DRAIN_TIMEOUT = 5.0             # Tempo máximo enviando os logs pendentes no desligamento
 
 log_channel = None
+_routes = {}
+_pending = deque()
+_dropped = Counter()
+_wakeup = None
+_worker_task = None
 
-def setup_log_channel(bot: discord.Client, channel_id: int):
+def setup_log_channel(bot: discord.Client, channel_id: int, routes: dict = None):
     """
     Encontra e armazena o objeto do canal de log para uso futuro.
+    `routes` opcionalmente mapeia um nível (LEVEL_WARNING, LEVEL_ERROR...) para o ID de outro canal.
     """
     global log_channel
     try:
@@ -19,23 +38,123 @@ def setup_log_channel(bot: discord.Client, channel_id: int):
     except Exception as e:
         logging.error(f"Não foi possível encontrar o canal de log com ID {channel_id}: {e}")
 
-async def log_to_channel(title: str, description: str, color: discord.Color):
+    for level, routed_id in (routes or {}).items():
+        channel = bot.get_channel(routed_id)
+        if isinstance(channel, discord.TextChannel):
+            _routes[level] = channel
+            logging.info(f"Logs de nível '{level}' serão enviados para o canal '{channel.name}'.")
+        else:
+            logging.error(f"O ID fornecido para os logs de nível '{level}' ({routed_id}) não corresponde a um canal de texto.")
+
+def log_to_channel(title: str, description: str, color: discord.Color, level: str = LEVEL_INFO):
     """
-    Envia uma mensagem de log formatada em um embed para o canal configurado.
+    Enfileira uma mensagem de log formatada em um embed para o canal configurado.
+    Não aguarda o envio: um worker em segundo plano agrupa até 10 embeds por mensagem.
     """
-    if not log_channel:
+    if not log_channel and level not in _routes:
         # Se o canal de log não foi configurado, apenas registra no console.
         logging.warning(f"Canal de log não configurado. Log não enviado para o Discord: {title} - {description}")
         return
 
+    if len(_pending) >= MAX_PENDING and not _make_room(level):
+        _dropped[title] += 1
+        return
+
+    _pending.append((level, discord.Embed(title=title, description=description, color=color)))
+    _ensure_worker()
+    _wakeup.set()
+
+def pending_count() -> int:
+    return len(_pending)
+
+def _make_room(level: str) -> bool:
+    """Sob sobrecarga, descarta a entrada informativa mais antiga para abrir espaço a uma mais grave."""
+    if level == LEVEL_INFO:
+        return False
+    for index, (queued_level, embed) in enumerate(_pending):
+        if queued_level == LEVEL_INFO:
+            del _pending[index]
+            _dropped[embed.title] += 1
+            return True
+    return False
+
+def _ensure_worker():
+    global _wakeup, _worker_task
+    if _worker_task is None or _worker_task.done():
+        _wakeup = asyncio.Event()
+        _worker_task = asyncio.create_task(_worker())
+
+def _channel_for(level: str):
+    return _routes.get(level, log_channel)
+
+def _summary_embed() -> discord.Embed | None:
+    """Resume as entradas descartadas desde o último envio (ex.: "+37 ⚠️ Post Ignorado: Sem Imagem")."""
+    if not _dropped:
+        return None
+    lines = [f"+{count} {title}" for title, count in _dropped.most_common()]
+    _dropped.clear()
+    return discord.Embed(
+        title="⏳ Logs descartados por sobrecarga",
+        description="\n".join(lines)[:4000],
+        color=discord.Color.dark_grey()
+    )
+
+async def _worker():
+    while True:
+        await _wakeup.wait()
+        _wakeup.clear()
+        # Acumula as entradas que chegarem durante o intervalo para enviá-las juntas
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await flush()
+
+async def flush():
+    """Envia agora tudo o que está pendente, agrupado por canal de destino."""
+    batches = {}
+    while _pending:
+        level, embed = _pending.popleft()
+        channel = _channel_for(level)
+        if channel:
+            batches.setdefault(channel, []).append(embed)
+
+    summary = _summary_embed()
+    summary_channel = _channel_for(LEVEL_WARNING)
+    if summary and summary_channel:
+        batches.setdefault(summary_channel, []).append(summary)
+
+    for channel, embeds in batches.items():
+        for chunk in _chunk_embeds(embeds):
+            await _send(channel, chunk)
+
+async def drain(timeout: float = DRAIN_TIMEOUT):
+    """
+    Envia os logs pendentes no desligamento, sem esperar o intervalo do worker, e encerra o worker.
+    Deve ser chamado antes de fechar o bot (o envio usa a sessão HTTP dele).
+    """
+    global _worker_task
+    try:
+        await asyncio.wait_for(flush(), timeout)
+    except asyncio.TimeoutError:
+        logging.warning(f"Tempo esgotado ao enviar os logs pendentes. {len(_pending)} entrada(s) não enviada(s).")
+    if _worker_task is not None:
+        _worker_task.cancel()
+        await asyncio.gather(_worker_task, return_exceptions=True)
+        _worker_task = None
+
+def _chunk_embeds(embeds: list):
+    chunk, size = [], 0
+    for embed in embeds:
+        if chunk and (len(chunk) == MAX_EMBEDS_PER_MESSAGE or size + len(embed) > MAX_CHARS_PER_MESSAGE):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(embed)
+        size += len(embed)
+    if chunk:
+        yield chunk
+
+async def _send(channel: discord.TextChannel, embeds: list):
     try:
-        embed = discord.Embed(
-            title=title,
-            description=description,
-            color=color
-        )
-        await log_channel.send(embed=embed)
+        await channel.send(embeds=embeds)
     except discord.Forbidden:
-        logging.error(f"O bot não tem permissão para enviar mensagens no canal de log '{log_channel.name}'.")
+        logging.error(f"O bot não tem permissão para enviar mensagens no canal de log '{channel.name}'.")
     except Exception as e:
-        logging.error(f"Falha ao enviar mensagem para o canal de log: {e}")
\ No newline at end of file
+        logging.error(f"Falha ao enviar mensagem para o canal de log: {e}")
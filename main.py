@@ -1,207 +1,584 @@
 # main.py
+import startup  # Primeiro import: marca o início da inicialização
 import discord
 from discord.ext import commands, tasks
 import os
+import asyncio
 import logging
+import time
+from collections import Counter
 from dotenv import load_dotenv
-from zoneinfo import ZoneInfo
 import datetime
 
 # --- IMPORTS ---
+import archive
+import batch_writer
 import cache_manager 
+import channel_map
+import image_hash
+import journal
 import log_manager
+import message_cache
+import metrics
+import notifier
+import presence_pipeline
+import report_cache
+import schedule_loader
+import storage
 from config import CONFIG
 import sheets_client
 import validators
 
 # --- CONFIGURAÇÃO INICIAL ---
 load_dotenv()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
 intents.guilds = True
 TOKEN = os.getenv('DISCORD_TOKEN')
 LOG_CHANNEL_ID = int(os.getenv('LOG_CHANNEL_ID')) if os.getenv('LOG_CHANNEL_ID') else None
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+# Canais opcionais para separar os logs por severidade (padrão: LOG_CHANNEL_ID)
+LOG_ROUTES = {
+    level: int(os.getenv(env_name))
+    for level, env_name in ((log_manager.LEVEL_WARNING, 'LOG_CHANNEL_ID_WARNING'), (log_manager.LEVEL_ERROR, 'LOG_CHANNEL_ID_ERROR'))
+    if os.getenv(env_name)
+}
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Arquivamento mensal das abas em Parquet (opcional; requer pyarrow). Apaga linhas da planilha!
+ARCHIVE_ENABLED = os.getenv('ARCHIVE_ENABLED', '').lower() in ('1', 'true', 'sim')
+# Detecção de prints reaproveitados (hash perceptual; requer Pillow). Estado inicial; com o Pillow
+# instalado, o comando /verificacao_prints liga e desliga a verificação com o bot rodando
+IMAGE_REUSE_CHECK = os.getenv('IMAGE_REUSE_CHECK', '').lower() in ('1', 'true', 'sim')
+# Recuperação de posts feitos com o bot fora do ar: canais lidos em paralelo e gravações
+# simultâneas da recuperação (o restante dos workers fica livre para o tráfego ao vivo)
+CATCH_UP_CHANNEL_CONCURRENCY = 3
+CATCH_UP_JOB_CONCURRENCY = 2
+CATCH_UP_MAX_MESSAGES = 5000
+# Horários dos eventos: arquivo JSON relido automaticamente quando muda (sem ele, vale o config.py)
+SCHEDULE_FILE = os.getenv('SCHEDULE_FILE', schedule_loader.SCHEDULE_FILE)
+# Armazenamento das presenças: "sheets" (padrão) ou "sqlite" (planilha vira espelho)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', storage.BACKEND_SHEETS)
+
+# Vários servidores: o discord.py distribui os servidores entre shards automaticamente
+bot = commands.AutoShardedBot(command_prefix="!", intents=intents)
 
 # --- CACHE E MAPAS GLOBAIS ---
-posted_today_cache = cache_manager.load_cache()
-channel_config_map = {}
+# Os que abrem arquivos, processos ou conexões são criados em setup()
+posted_today_cache = None
+processed_messages = message_cache.MessageOutcomeCache()
+channel_checkpoints = None
+reuse_checker = None
+channel_config_map = None
+backend = None
+# Canais cujo histórico já foi recuperado; só neles o listener avança o checkpoint
+caught_up_channels = set()
+catch_up_task = None
+pipelines = presence_pipeline.GuildPipelines()
+catch_up_reads = asyncio.Semaphore(CATCH_UP_CHANNEL_CONCURRENCY)
+catch_up_writes = asyncio.Semaphore(CATCH_UP_JOB_CONCURRENCY)
+
+def setup():
+    """
+    Inicialização com efeitos colaterais: caches em SQLite, pool de hashes, armazenamento e horários.
+    Chamada só pelo processo principal; os processos do pool de hashes importam este módulo sem
+    executá-la.
+    """
+    global posted_today_cache, channel_checkpoints, reuse_checker, channel_config_map, backend
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    posted_today_cache = cache_manager.load_cache(datetime.datetime.now(validators.TARGET_TZ).date())
+    channel_checkpoints = cache_manager.ChannelCheckpoints()
+    # Com IMAGE_REUSE_CHECK ativo, os processos do pool de hashes já são criados aqui
+    reuse_checker = image_hash.configure(IMAGE_REUSE_CHECK)
+    if IMAGE_REUSE_CHECK and reuse_checker is None:
+        logging.error("IMAGE_REUSE_CHECK está ativo, mas o pacote 'Pillow' não está instalado. Verificação de prints desativada.")
+    backend = storage.configure(STORAGE_BACKEND)
+
+    # --- MÉTRICAS (tamanhos de cache e filas, lidos na hora da coleta) ---
+    metrics.gauge("bot_presence_cache_keys", "Chaves no cache de presenças", lambda: len(posted_today_cache))
+    metrics.gauge("bot_message_cache", "Cache de resultados por mensagem (hits, misses, edições ignoradas)", processed_messages.stats)
+    metrics.gauge("bot_pipeline", "Fila e jobs dos pipelines de presenças (soma dos servidores e maior fila individual)", pipelines.stats)
+    metrics.gauge("bot_sheets_backlog_rows", "Linhas aguardando gravação no Sheets", batch_writer.backlog_count)
+    metrics.gauge("bot_journal_pending", "Entradas do journal ainda não sincronizadas", journal.pending_count)
+    metrics.gauge("bot_log_queue", "Logs aguardando envio ao Discord", log_manager.pending_count)
+    metrics.gauge("bot_dm_queue", "DMs aguardando envio", notifier.pending_count)
+    if reuse_checker:
+        metrics.gauge("bot_screenshot_reuse", "Verificação de prints reaproveitados", reuse_checker.stats)
+
+    # Carrega e compila os horários de todos os canais uma única vez (e avisa sobre slots sobrepostos)
+    channel_config_map = channel_map.ChannelMap(schedule_loader.load_initial(SCHEDULE_FILE, CONFIG))
+    startup.timer.mark("módulos")
 
 # --- TAREFAS AGENDADAS ---
-cache_reset_time = datetime.time(0, 25, tzinfo=ZoneInfo(validators.TIMEZONE_STR))
+cache_reset_time = datetime.time(0, 25, tzinfo=validators.TARGET_TZ)
 @tasks.loop(time=cache_reset_time)
 async def clear_daily_cache():
-    logging.info("Horário de reset atingido (00:25). Limpando o cache de presença diária.")
-    posted_today_cache.clear()
-    cache_manager.save_cache(posted_today_cache)
-    # Limpa também o cache de jogadores do Cog de relatórios
+    # Mantém a partição de ontem: o slot "WB 00:00 + Praça" (23:55 - 00:35) ainda está aberto às 00:25
+    yesterday = datetime.datetime.now(validators.TARGET_TZ).date() - datetime.timedelta(days=1)
+    removed = await posted_today_cache.evict_before(yesterday)
+    if reuse_checker:
+        reuse_checker.index.evict_before(yesterday)
+    logging.info(f"Horário de reset atingido (00:25). {removed} chave(s) antiga(s) removida(s) do cache de presença.")
+    compacted = await asyncio.to_thread(journal.compact)
+    if compacted:
+        logging.info(f"Journal: {compacted} entrada(s) sincronizada(s) há mais de {journal.COMPACT_AFTER_DAYS} dias removida(s).")
+    # Renova também o cache de jogadores do Cog de relatórios (sem esvaziá-lo)
     reports_cog = bot.get_cog('ReportsCog')
     if reports_cog:
-        reports_cog.clear_player_cache()
+        reports_cog.refresh_player_cache()
 
 
-@tasks.loop(minutes=5)
-async def save_cache_periodically():
-    logging.info("Salvando cache de presença no arquivo...")
-    cache_manager.save_cache(posted_today_cache)
+archive_time = datetime.time(4, 10, tzinfo=validators.TARGET_TZ)
+@tasks.loop(time=archive_time)
+async def archive_closed_months():
+    # Move os meses fechados das abas para o arquivo Parquet, mantendo a planilha pequena
+    today = datetime.datetime.now(validators.TARGET_TZ).date()
+    worksheet_names = [category_config["worksheet_name"] for category_config in CONFIG.values()]
+    archived = await archive.archive_closed_months(worksheet_names, today)
+    if archived:
+        logging.info(f"Arquivamento concluído: {archived} linha(s) movida(s) para '{archive.ARCHIVE_DIR}'.")
 
-# --- FUNÇÃO CENTRAL DE PROCESSAMENTO ---
-async def process_presence_message(message: discord.Message):
-    if message.channel.id not in channel_config_map:
+@tasks.loop(seconds=5)
+async def reload_schedule():
+    # Troca os horários sem reiniciar: posts já em processamento terminam com os horários antigos
+    loaded = await schedule_loader.reload_if_changed(SCHEDULE_FILE, CONFIG)
+    if loaded is None:
         return
+    # Compilado na thread; aqui, no loop, os índices e o mapa de canais são trocados juntos
+    new_config, schedules = loaded
+    validators.install_schedules(schedules)
+    channel_config_map.apply_config(new_config)
+    logging.info(f"Horários recarregados de '{SCHEDULE_FILE}' ({len(channel_config_map)} canal(is) monitorado(s)).")
 
-    channel_config = channel_config_map[message.channel.id]
-    
-    active_event = validators.find_active_event(message.created_at, channel_config["events"])
+@tasks.loop(seconds=30)
+async def replay_journal():
+    await journal.replay_pending()
+    channel_checkpoints.flush()
+
+# --- FUNÇÃO CENTRAL DE PROCESSAMENTO ---
+def count_outcome(outcome: str, channel_config: dict, active_event: dict) -> str:
+    """Contabiliza o resultado nas métricas por divisão e evento e o devolve."""
+    metrics.PRESENCE_POSTS.inc(divisao=channel_config["worksheet_name"], evento=active_event["name"], resultado=outcome)
+    return outcome
+
+def check_presence(message: discord.Message, channel_config: dict) -> tuple:
+    """
+    Regras de validação de um post (horário pelo created_at, imagem e menção), sem efeitos colaterais.
+    Retorna (resultado, evento ativo, chave do cache); resultado None significa que o post passou
+    e só falta a verificação de duplicata.
+    """
+    active_event, event_date = validators.find_active_slot(message.created_at, channel_config["schedule"])
     if not active_event:
+        return message_cache.OUTCOME_IGNORED, None, None
+    if not message.attachments or not validators.is_image_attachment(message.attachments[0]):
+        return message_cache.OUTCOME_NO_IMAGE, active_event, None
+    if not message.mentions:
+        return message_cache.OUTCOME_NO_MENTION, active_event, None
+    return None, active_event, (event_date, message.mentions[0].id, active_event['name'], message.channel.id)
+
+async def is_duplicate(pipeline: presence_pipeline.PresencePipeline, cache_key: tuple) -> bool:
+    """Presença já registrada, incluindo um post do mesmo jogador/evento ainda em processamento."""
+    while cache_key not in posted_today_cache and await pipeline.wait_in_flight(cache_key):
+        pass
+    return cache_key in posted_today_cache
+
+async def process_presence_message(message: discord.Message) -> str:
+    """Valida e registra a presença de uma mensagem. Retorna o resultado (ver message_cache.OUTCOME_*)."""
+    channel_config = channel_config_map.get(message.channel.id)
+    if channel_config is None:
+        return message_cache.OUTCOME_IGNORED
+    
+    outcome, active_event, cache_key = check_presence(message, channel_config)
+    if outcome == message_cache.OUTCOME_IGNORED:
         # Apenas para este caso, não enviamos DM para não poluir os usuários
         # que conversam normalmente fora do horário.
-        return
+        return outcome
 
     # Validação de anexo
-    if not message.attachments or not message.attachments[0].content_type.startswith('image/'):
+    if outcome == message_cache.OUTCOME_NO_IMAGE:
         error_msg = "Você precisa enviar uma mensagem com uma imagem (print) para registrar a presença."
-        try:
-            await message.author.send(f"Olá! Sua postagem no canal #{message.channel.name} não pôde ser registrada. Motivo: {error_msg}")
-        except discord.Forbidden:
-            pass # Ignora se o usuário tiver DMs fechadas
-        await log_manager.log_to_channel(
+        notifier.notify_rejection(message.author, message.channel.name, error_msg)
+        log_manager.log_to_channel(
             title="⚠️ Post Ignorado: Sem Imagem",
             description=f"**Autor:** {message.author.mention}\n**Canal:** {message.channel.mention}",
-            color=discord.Color.orange()
+            color=discord.Color.orange(),
+            level=log_manager.LEVEL_WARNING
         )
-        return
+        return count_outcome(message_cache.OUTCOME_NO_IMAGE, channel_config, active_event)
 
     # Validação de menção
-    if not message.mentions:
+    if outcome == message_cache.OUTCOME_NO_MENTION:
         error_msg = "Você precisa marcar o usuário (@nick) que está recebendo a presença na mensagem."
-        try:
-            await message.author.send(f"Olá! Sua postagem no canal #{message.channel.name} não pôde ser registrada. Motivo: {error_msg}")
-        except discord.Forbidden:
-            pass
-        await log_manager.log_to_channel(
+        notifier.notify_rejection(message.author, message.channel.name, error_msg)
+        log_manager.log_to_channel(
             title="⚠️ Post Ignorado: Sem Menção",
             description=f"**Autor:** {message.author.mention}\n**Canal:** {message.channel.mention}\n**Motivo:** A mensagem não continha uma menção `@user`.",
-            color=discord.Color.orange()
+            color=discord.Color.orange(),
+            level=log_manager.LEVEL_WARNING
         )
-        return
+        return count_outcome(message_cache.OUTCOME_NO_MENTION, channel_config, active_event)
     
     mentioned_user = message.mentions[0]
     nick_to_save = mentioned_user.display_name
     
-    # Validação de duplicata
-    cache_key = (mentioned_user.id, active_event['name'], message.channel.id)
-    if cache_key in posted_today_cache:
+    # Validação de duplicata (incluindo um post do mesmo jogador/evento ainda em processamento)
+    pipeline = pipelines.get(channel_config["guild_id"])
+    if await is_duplicate(pipeline, cache_key):
         error_msg = f"A presença para '{nick_to_save}' no evento '{active_event['name']}' já foi registrada hoje."
-        try:
-            await message.author.send(f"Olá! Sua postagem no canal #{message.channel.name} não pôde ser registrada. Motivo: {error_msg}")
-        except discord.Forbidden:
-            pass
-        await log_manager.log_to_channel(
+        notifier.notify_rejection(message.author, message.channel.name, error_msg)
+        log_manager.log_to_channel(
             title="❌ Post Ignorado: Duplicado",
             description=f"**Autor:** {message.author.mention}\n**Jogador Mencionado:** {mentioned_user.mention}\n**Evento:** {active_event['name']}\n**Canal:** {message.channel.mention}",
-            color=discord.Color.red()
+            color=discord.Color.red(),
+            level=log_manager.LEVEL_WARNING
         )
-        return
+        return count_outcome(message_cache.OUTCOME_DUPLICATE, channel_config, active_event)
 
-    # Se todas as validações passaram
+    # Se todas as validações passaram, a gravação vai para o pool de workers do servidor (uma por chave)
     logging.info(f"Processando presença para '{nick_to_save}' no evento '{active_event['name']}'")
-    
-    local_time = message.created_at.astimezone(ZoneInfo(validators.TIMEZONE_STR))
-    
-    success = sheets_client.record_presence(
-        worksheet_name=channel_config["worksheet_name"],
-        dia=local_time.strftime('%d/%m/%Y'),
-        evento=active_event['name'],
-        hora=local_time.strftime('%H:%M:%S'),
-        nick=nick_to_save
+    return await pipeline.submit(
+        cache_key,
+        lambda: record_presence(message, channel_config, active_event, nick_to_save, cache_key)
     )
+
+async def record_presence(message: discord.Message, channel_config: dict, active_event: dict, nick_to_save: str, cache_key: tuple) -> str:
+    """Etapa executada pelos workers do pipeline: grava a presença, reage e atualiza os caches."""
+    local_time = message.created_at.astimezone(validators.TARGET_TZ)
+    
+    row = [local_time.strftime('%d/%m/%Y'), active_event['name'], local_time.strftime('%H:%M:%S'), nick_to_save]
+
+    # O armazenamento decide onde a presença fica; a planilha é sempre sincronizada em segundo plano
+    success = await backend.record(channel_config["worksheet_name"], row)
     
     if success:
+        # A chave só entra no cache depois de gravada em disco (uma falha fica no log)
+        await posted_today_cache.add(cache_key)
+        # Relatórios em cache desta divisão deixam de valer
+        report_cache.results.invalidate(channel_config["worksheet_name"])
         await message.add_reaction("✅")
-        posted_today_cache.add(cache_key)
         
         # Atualiza o cache do autocomplete dinamicamente
         reports_cog = bot.get_cog('ReportsCog')
         if reports_cog:
             reports_cog.add_player_to_cache(channel_config["worksheet_name"], nick_to_save)
             
-        await log_manager.log_to_channel(
+        log_manager.log_to_channel(
             title="✅ Presença Registrada com Sucesso",
             description=f"**Jogador:** {nick_to_save}\n**Evento:** {active_event['name']}\n**Divisão:** {channel_config['worksheet_name']}\n**Registrado por:** {message.author.mention}",
             color=discord.Color.green()
         )
+        if reuse_checker:
+            # Em segundo plano: a presença já está registrada, a verificação só gera um alerta
+            reuse_checker.submit(cache_key[0], message.attachments[0], {
+                "nick": nick_to_save,
+                "evento": active_event['name'],
+                "autor": message.author.mention,
+                "canal": message.channel.mention,
+                "link": getattr(message, "jump_url", None),
+            }, report_screenshot_reuse)
+        return count_outcome(message_cache.OUTCOME_ACCEPTED, channel_config, active_event)
+
+    return count_outcome(message_cache.OUTCOME_FAILED, channel_config, active_event)
+
+def report_screenshot_reuse(info: dict, distance: int, original: dict):
+    """Alerta no canal de log: o print parece ser o mesmo de uma presença já aceita no dia."""
+    logging.warning(f"Print possivelmente reaproveitado: '{info['nick']}' ({info['evento']}) e '{original['nick']}' ({original['evento']}).")
+    links = " ".join(f"[{label}]({entry['link']})" for label, entry in (("post", info), ("original", original)) if entry.get("link"))
+    log_manager.log_to_channel(
+        title="🔁 Print Possivelmente Reaproveitado",
+        description=(
+            f"**Jogador:** {info['nick']}\n**Evento:** {info['evento']}\n**Registrado por:** {info['autor']}\n**Canal:** {info['canal']}\n"
+            f"**Parecido com:** {original['nick']} ({original['evento']}, registrado por {original['autor']} em {original['canal']})\n"
+            f"**Diferença:** {distance}/64 bits {links}"
+        ),
+        color=discord.Color.gold(),
+        level=log_manager.LEVEL_WARNING
+    )
+
+# --- RECUPERAÇÃO DE POSTS FEITOS COM O BOT FORA DO AR ---
+async def catch_up_message(message: discord.Message, channel_config: dict, checked: tuple) -> str:
+    """Registra um post aprovado do histórico (sem DMs: os posts podem ter horas)."""
+    _, active_event, cache_key = checked
+    async with catch_up_writes:
+        pipeline = pipelines.get(channel_config["guild_id"])
+        if await is_duplicate(pipeline, cache_key):
+            return count_outcome(message_cache.OUTCOME_DUPLICATE, channel_config, active_event)
+        nick_to_save = message.mentions[0].display_name
+        return await pipeline.submit(
+            cache_key,
+            lambda: record_presence(message, channel_config, active_event, nick_to_save, cache_key)
+        )
+
+async def catch_up_channel(channel: discord.TextChannel, channel_config: dict, until: datetime.datetime) -> tuple:
+    """
+    Processa as mensagens do canal entre o checkpoint e `until` (depois disso chegam pelo gateway),
+    no máximo CATCH_UP_MAX_MESSAGES por chamada. Retorna (resultados, concluído); com o limite
+    atingido, concluído é False e o checkpoint fica na última mensagem processada.
+    """
+    outcomes = Counter()
+    checkpoint = channel_checkpoints.get(channel.id)
+    if checkpoint is None:
+        # Primeira execução neste canal: não há como saber o que já foi processado
+        channel_checkpoints.advance(channel.id, channel.last_message_id)
+        return outcomes, True
+
+    last_id = checkpoint
+    read = 0
+    jobs = []
+    try:
+        async with catch_up_reads:
+            async for message in channel.history(limit=CATCH_UP_MAX_MESSAGES, after=discord.Object(id=checkpoint), before=until, oldest_first=True):
+                last_id = message.id
+                read += 1
+                if message.author.bot or processed_messages.is_processing(message.id) or processed_messages.get(message.id):
+                    continue
+                checked = check_presence(message, channel_config)
+                outcome = checked[0]
+                if outcome is None:
+                    # Em processamento até o job terminar: edições do post aguardam o resultado
+                    processed_messages.begin(message.id)
+                    jobs.append((message, asyncio.create_task(catch_up_message(message, channel_config, checked))))
+                    continue
+                if outcome != message_cache.OUTCOME_IGNORED:
+                    count_outcome(outcome, channel_config, checked[1])
+                processed_messages.record(message.id, outcome, message_cache.fingerprint(message))
+                outcomes[outcome] += 1
+    finally:
+        # Mesmo se a leitura do histórico falhar no meio, os posts já enviados aos workers são concluídos
+        for message, job in jobs:
+            try:
+                outcome = await job
+            except Exception as e:
+                logging.error(f"Erro ao recuperar o post {message.id} do canal '{channel.name}': {e}")
+                outcome = message_cache.OUTCOME_FAILED
+            processed_messages.finish(message.id, outcome, message_cache.fingerprint(message))
+            outcomes[outcome] += 1
+    channel_checkpoints.advance(channel.id, last_id)
+    return outcomes, read < CATCH_UP_MAX_MESSAGES
+
+async def catch_up_missed_posts():
+    """
+    Percorre o histórico dos canais monitorados desde o último checkpoint de cada um.
+    Canais mapeados durante a execução (servidor novo, canal criado) entram na rodada seguinte.
+    """
+    until = datetime.datetime.now(datetime.timezone.utc)
+    attempted = set()
+
+    async def run(channel):
+        try:
+            outcomes, done = await catch_up_channel(channel, channel_config_map[channel.id], until)
+        except (discord.Forbidden, discord.HTTPException) as e:
+            # Checkpoint mantido: a próxima conexão tenta de novo
+            logging.error(f"Falha ao ler o histórico do canal '{channel.name}' para recuperação: {e}")
+            return
+        if done:
+            caught_up_channels.add(channel.id)
+        else:
+            # Limite por leitura atingido: o canal volta na próxima rodada, a partir do checkpoint.
+            # Até lá o listener não avança o checkpoint, então nada do histórico é pulado
+            attempted.discard(channel.id)
+            channel_checkpoints.flush()
+        if outcomes:
+            summary = ", ".join(f"{outcome}: {count}" for outcome, count in sorted(outcomes.items()))
+            logging.info(f"Recuperação do canal '{channel.name}' ({channel.guild.name}){'' if done else ' (parcial)'}: {summary}.")
+
+    started = time.perf_counter()
+    while True:
+        channels = [bot.get_channel(channel_id) for channel_id in channel_config_map.channel_ids()]
+        channels = [channel for channel in channels if channel is not None and channel.id not in caught_up_channels | attempted]
+        if not channels:
+            break
+        attempted.update(channel.id for channel in channels)
+        await asyncio.gather(*(run(channel) for channel in channels))
+    channel_checkpoints.flush()
+    logging.info(f"Recuperação de posts concluída em {time.perf_counter() - started:.1f}s ({len(attempted)} canal(is)).")
+
+def start_catch_up():
+    """Inicia a recuperação dos canais que ainda não passaram por ela (se já não estiver rodando)."""
+    global catch_up_task
+    if catch_up_task is None or catch_up_task.done():
+        catch_up_task = asyncio.create_task(catch_up_missed_posts())
 
 # --- EVENTOS DO BOT ---
 @bot.event
 async def on_ready():
-    global channel_config_map
-    logging.info(f"Bot conectado como {bot.user.name}")
+    logging.info(f"Bot conectado como {bot.user.name} ({bot.shard_count or 1} shard(s))")
+    first_ready = startup.timer.ready_at is None
+    if first_ready:
+        startup.timer.mark("login")
     
     if LOG_CHANNEL_ID:
-        log_manager.setup_log_channel(bot, LOG_CHANNEL_ID)
+        log_manager.setup_log_channel(bot, LOG_CHANNEL_ID, LOG_ROUTES)
     else:
         logging.warning("Nenhum ID de canal de log foi fornecido no arquivo .env. O log no Discord está desativado.")
 
     if not bot.guilds:
         logging.critical("O bot não está em nenhum servidor!")
-        return
-        
-    guild = bot.guilds[0]
-    logging.info(f"Verificando configurações para o servidor: '{guild.name}'")
 
-    for category_name, category_config in CONFIG.items():
-        category = discord.utils.get(guild.categories, name=category_name)
-        if not category:
-            logging.error(f"AVISO: Categoria '{category_name}' não encontrada.")
-            continue
-        
-        for channel_name, events in category_config["channels"].items():
-            channel = discord.utils.get(category.text_channels, name=channel_name)
-            if channel:
-                channel_config_map[channel.id] = {
-                    "worksheet_name": category_config["worksheet_name"],
-                    "events": events
-                }
-                logging.info(f"OK: Monitorando canal '{channel.name}' -> Aba '{category_config['worksheet_name']}'")
-            else:
-                logging.error(f"AVISO: Canal '{channel_name}' não foi encontrado na categoria '{category_name}'.")
+    # Em reconexões o on_ready pode disparar de novo: só mapeia servidores ainda desconhecidos,
+    # o restante já foi mantido em dia pelos eventos de canal
+    for guild in bot.guilds:
+        if not channel_config_map.has_guild(guild.id):
+            map_guild(guild)
+    if first_ready:
+        startup.timer.mark("canais")
 
     if not clear_daily_cache.is_running():
         clear_daily_cache.start()
-    if not save_cache_periodically.is_running():
-        save_cache_periodically.start()
+    if not replay_journal.is_running():
+        replay_journal.start()
+    if not reload_schedule.is_running():
+        reload_schedule.start()
+    if ARCHIVE_ENABLED and not archive_closed_months.is_running():
+        if archive.is_available():
+            archive_closed_months.start()
+        else:
+            logging.error("ARCHIVE_ENABLED está ativo, mas o pacote 'pyarrow' não está instalado. Arquivamento desativado.")
+    # Com o SQLite, importa o histórico das abas antes de liberar os workers
+    await backend.start([category_config["worksheet_name"] for category_config in CONFIG.values()])
+    pipelines.start()
+    if first_ready:
+        startup.timer.mark("armazenamento")
+
+    # Posts feitos enquanto o bot estava desconectado (em segundo plano, junto com o tráfego ao vivo).
+    # Uma sessão nova pode ter perdido mensagens: todos os canais voltam a ser recuperados
+    caught_up_channels.clear()
+    start_catch_up()
 
+    # Só chama a API (global e com rate limit) quando as definições dos comandos mudaram
     try:
-        synced = await bot.tree.sync()
-        logging.info(f"Sincronizados {len(synced)} comandos de barra.")
+        await startup.sync_commands(bot.tree, bot.application_id)
     except Exception as e:
         logging.error(f"Falha ao sincronizar comandos: {e}")
+    if first_ready:
+        startup.timer.mark("comandos")
+        startup.timer.ready()
 
     logging.info('------ Iniciação completa, aguardando mensagens ------')
 
+# --- SERVIDORES E CANAIS (atualização incremental do mapa) ---
+def map_guild(guild: discord.Guild):
+    logging.info(f"Verificando configurações para o servidor: '{guild.name}'")
+    monitored = channel_config_map.build_guild(guild)
+    if not monitored:
+        logging.error(f"AVISO: Nenhum canal monitorado encontrado no servidor '{guild.name}'.")
+    elif catch_up_task is not None:
+        start_catch_up()
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    map_guild(guild)
+
+@bot.event
+async def on_guild_available(guild: discord.Guild):
+    # Servidor que estava indisponível na conexão (ou que voltou de uma queda do Discord)
+    if not channel_config_map.has_guild(guild.id):
+        map_guild(guild)
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    channel_config_map.remove_guild(guild.id)
+    await pipelines.remove(guild.id)
+    logging.info(f"Bot removido do servidor '{guild.name}'.")
+
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    if isinstance(channel, discord.CategoryChannel):
+        channel_config_map.update_category(channel)
+    elif isinstance(channel, discord.TextChannel):
+        channel_config_map.update_channel(channel)
+    if catch_up_task is not None:
+        start_catch_up()
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    # Só renomeações e mudanças de categoria alteram o mapa
+    if before.name == after.name and getattr(before, "category_id", None) == getattr(after, "category_id", None):
+        return
+    if isinstance(after, discord.CategoryChannel):
+        channel_config_map.update_category(after)
+    elif isinstance(after, discord.TextChannel):
+        channel_config_map.update_channel(after)
+    if catch_up_task is not None:
+        start_catch_up()
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    if isinstance(channel, discord.CategoryChannel):
+        channel_config_map.remove_category(channel)
+    elif isinstance(channel, discord.TextChannel):
+        channel_config_map.remove_channel(channel)
+
 @bot.listen('on_message')
 async def message_listener(message: discord.Message):
     if message.author.bot: return
-    await process_presence_message(message)
+    # Marcada antes do primeiro await: uma edição que chegar durante o processamento aguarda o resultado
+    if not processed_messages.begin(message.id):
+        return
+    outcome = None
+    try:
+        with metrics.PROCESS_LATENCY.time(origem="mensagem"):
+            outcome = await process_presence_message(message)
+    finally:
+        processed_messages.finish(message.id, outcome, message_cache.fingerprint(message))
+    if outcome != message_cache.OUTCOME_IGNORED:
+        startup.timer.message_processed()
+    if message.channel.id in caught_up_channels:
+        channel_checkpoints.advance(message.channel.id, message.id)
 
 @bot.listen('on_message_edit')
 async def edit_listener(before: discord.Message, after: discord.Message):
     if after.author.bot: return
-    await process_presence_message(after)
+    # Embeds e previews de link costumam chegar como edição logo após o post: espera o post terminar
+    # (posts da recuperação também) para decidir com o resultado dele
+    while await processed_messages.wait_processing(after.id):
+        pass
+    # Edições de texto, previews de link e embeds não alteram a validação: só reprocessa
+    # posts rejeitados cujos anexos ou menções mudaram
+    if not processed_messages.should_reprocess(after):
+        return
+    processed_messages.begin(after.id)
+    outcome = None
+    try:
+        with metrics.PROCESS_LATENCY.time(origem="edicao"):
+            outcome = await process_presence_message(after)
+    finally:
+        processed_messages.finish(after.id, outcome, message_cache.fingerprint(after))
 
 # --- INICIAR O BOT ---
 async def main():
     async with bot:
         await bot.load_extension('cogs.reports_cog')
-        await bot.start(TOKEN)
+        await bot.load_extension('cogs.stats_cog')
+        startup.timer.mark("cogs")
+        # Exportador opcional no formato do Prometheus
+        metrics_runner = await metrics.start_http_server(METRICS_PORT, METRICS_HOST) if METRICS_PORT else None
+        try:
+            await bot.start(TOKEN)
+        finally:
+            if metrics_runner:
+                await metrics_runner.cleanup()
+            # A recuperação é retomada do checkpoint na próxima inicialização
+            if catch_up_task:
+                catch_up_task.cancel()
+            # Garante que nenhuma presença em buffer seja perdida no desligamento
+            await pipelines.stop()
+            await backend.close()
+            await batch_writer.drain()
+            await journal.flush()
+            sheets_client.shutdown()
+            image_hash.shutdown()
+            journal.close()
+            await posted_today_cache.flush()
+            posted_today_cache.close()
+            channel_checkpoints.close()
+            # Ainda dentro do `async with bot`: os logs pendentes saem antes da sessão ser fechada
+            await log_manager.drain()
 
 if __name__ == "__main__":
+    setup()
     if not TOKEN:
         logging.critical("TOKEN do Discord não encontrado!")
     else:
-        import asyncio
         asyncio.run(main())
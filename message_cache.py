@@ -0,0 +1,115 @@
+# message_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+import discord
+
+# Resultados possíveis do processamento de uma mensagem
+OUTCOME_IGNORED = "ignorado"        # Canal não monitorado ou fora do horário de eventos
+OUTCOME_NO_IMAGE = "sem_imagem"
+OUTCOME_NO_MENTION = "sem_mencao"
+OUTCOME_DUPLICATE = "duplicado"
+OUTCOME_ACCEPTED = "registrado"
+OUTCOME_FAILED = "falhou"
+
+REJECTED_OUTCOMES = {OUTCOME_NO_IMAGE, OUTCOME_NO_MENTION, OUTCOME_DUPLICATE, OUTCOME_FAILED}
+
+def fingerprint(message: discord.Message) -> tuple:
+    """Partes da mensagem que influenciam a validação: anexos e menções."""
+    return (
+        tuple(attachment.id for attachment in message.attachments),
+        tuple(user.id for user in message.mentions),
+    )
+
+class MessageOutcomeCache:
+    """
+    Cache LRU com expiração que guarda, por ID de mensagem, o resultado do processamento e o
+    fingerprint da mensagem naquele momento. Usado para não reprocessar edições irrelevantes.
+    Mensagens ainda em processamento ficam marcadas (`begin`/`finish`): uma edição que chega nesse
+    meio-tempo aguarda o resultado em vez de processar a mesma mensagem em paralelo.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 6 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0    # Edições descartadas sem reprocessamento
+        self._entries = OrderedDict()
+        self._processing = {}   # ID da mensagem → evento sinalizado quando o processamento termina
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, message_id: int) -> tuple | None:
+        """Retorna (resultado, fingerprint) da mensagem, ou None se ela não estiver no cache."""
+        entry = self._entries.get(message_id)
+        if entry is None or time.monotonic() - entry[2] > self.ttl:
+            self._entries.pop(message_id, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(message_id)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def record(self, message_id: int, outcome: str, message_fingerprint: tuple):
+        """Guarda o resultado. Uma mensagem já registrada nunca volta a um resultado de rejeição."""
+        previous = self._entries.get(message_id)
+        if previous is not None and previous[0] == OUTCOME_ACCEPTED and outcome != OUTCOME_ACCEPTED:
+            outcome, message_fingerprint = previous[0], previous[1]
+        self._entries[message_id] = (outcome, message_fingerprint, time.monotonic())
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    # --- MENSAGENS EM PROCESSAMENTO ---
+    def is_processing(self, message_id: int) -> bool:
+        return message_id in self._processing
+
+    def begin(self, message_id: int) -> bool:
+        """Marca a mensagem como em processamento. Retorna False se ela já estiver."""
+        if message_id in self._processing:
+            return False
+        self._processing[message_id] = asyncio.Event()
+        return True
+
+    def finish(self, message_id: int, outcome: str | None, message_fingerprint: tuple = ()):
+        """Encerra o processamento, guardando o resultado (None: terminou com erro, nada é guardado)."""
+        if outcome is not None:
+            self.record(message_id, outcome, message_fingerprint)
+        event = self._processing.pop(message_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_processing(self, message_id: int) -> bool:
+        """Se a mensagem estiver em processamento, aguarda o fim. Retorna True se aguardou."""
+        event = self._processing.get(message_id)
+        if event is None:
+            return False
+        await event.wait()
+        return True
+
+    def should_reprocess(self, message: discord.Message) -> bool:
+        """
+        Decide se uma edição precisa passar pelo pipeline novamente.
+        Só reprocessa mensagens desconhecidas ou rejeitadas cujos anexos/menções mudaram.
+        """
+        entry = self.get(message.id)
+        if entry is None:
+            return True
+        outcome, previous_fingerprint = entry
+        if outcome in REJECTED_OUTCOMES and fingerprint(message) != previous_fingerprint:
+            return True
+        self.skipped += 1
+        return False
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "processing": len(self._processing),
+        }
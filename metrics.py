@@ -0,0 +1,179 @@
+# metrics.py
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1024  # Observações recentes guardadas por série para os percentis do /stats
+
+_registry = {}
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        f'{key}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class Counter:
+    """Contador monotônico, opcionalmente com labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> list:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self.values.items()]
+
+class Gauge:
+    """Valor instantâneo; pode ser definido diretamente ou lido de uma função na hora da coleta."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback=None):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.values = {}
+
+    def set(self, value: float, **labels):
+        self.values[_label_key(labels)] = value
+
+    def collect(self) -> dict:
+        if self.callback is None:
+            return dict(self.values)
+        try:
+            result = self.callback()
+        except Exception as e:
+            logging.error(f"Falha ao coletar a métrica '{self.name}': {e}")
+            return {}
+        # A função pode devolver um número ou um dicionário {valor_do_label: número}
+        if isinstance(result, dict):
+            return {(("chave", str(label)),): value for label, value in result.items()}
+        return {(): result}
+
+    def render(self) -> list:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self.collect().items()]
+
+class Histogram:
+    """Histograma de latências (segundos) com buckets cumulativos no formato do Prometheus."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "recent": deque(maxlen=RECENT_SAMPLES)}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+        series["recent"].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def percentiles(self, key: tuple = ()) -> dict:
+        """p50/p99 (em segundos) das observações recentes de uma série."""
+        series = self.series.get(key)
+        if not series or not series["recent"]:
+            return {}
+        samples = sorted(series["recent"])
+        pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)]
+        return {"p50": pick(0.50), "p99": pick(0.99), "count": series["count"]}
+
+    def render(self) -> list:
+        lines = []
+        for key, series in self.series.items():
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+def _register(metric):
+    existing = _registry.get(metric.name)
+    if existing is not None:
+        return existing
+    _registry[metric.name] = metric
+    return metric
+
+def counter(name: str, description: str) -> Counter:
+    return _register(Counter(name, description))
+
+def gauge(name: str, description: str, callback=None) -> Gauge:
+    metric = _register(Gauge(name, description, callback))
+    if callback is not None:
+        metric.callback = callback
+    return metric
+
+def histogram(name: str, description: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, description, buckets))
+
+def all_metrics() -> list:
+    return list(_registry.values())
+
+def render_prometheus() -> str:
+    """Exporta todas as métricas no formato texto do Prometheus."""
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- EXPORTADOR HTTP (opcional) ---
+async def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Sobe um endpoint /metrics local no mesmo event loop do bot. Retorna o runner (para encerrar)."""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Métricas disponíveis em http://{host}:{port}/metrics")
+    return runner
+
+# --- MÉTRICAS COMPARTILHADAS ---
+SHEETS_LATENCY = histogram("bot_sheets_request_seconds", "Latência das chamadas à API do Google Sheets")
+SHEETS_ERRORS = counter("bot_sheets_errors_total", "Chamadas à API do Google Sheets que falharam")
+FIND_EVENT_LATENCY = histogram(
+    "bot_find_active_event_seconds", "Tempo para localizar o evento ativo de uma mensagem",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005)
+)
+DATAFRAME_BUILD_LATENCY = histogram("bot_dataframe_build_seconds", "Tempo para converter linhas da planilha em DataFrame")
+REPORT_LATENCY = histogram("bot_report_seconds", "Tempo total de geração dos relatórios")
+PRESENCE_POSTS = counter("bot_presence_posts_total", "Posts processados por divisão, evento e resultado")
+PROCESS_LATENCY = histogram("bot_process_message_seconds", "Tempo de ponta a ponta do processamento de uma mensagem")
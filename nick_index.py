@@ -0,0 +1,80 @@
+# nick_index.py
+import bisect
+import unicodedata
+from attendance_index import normalize_nick
+
+MAX_CHOICES = 25  # Limite de opções do autocomplete do Discord
+
+def search_key(nick: str) -> str:
+    """
+    Chave usada só para casar o texto digitado: o nick normalizado (o mesmo dos relatórios) sem acentos.
+    Nicks que diferem apenas nos acentos ('José' e 'Jose') são jogadores diferentes e continuam
+    aparecendo separados; só ficam com a mesma chave de busca.
+    """
+    decomposed = unicodedata.normalize("NFKD", normalize_nick(nick))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+class NickIndex:
+    """
+    Índice de nicks de uma divisão para o autocomplete.
+    Mantém as chaves de busca ordenadas (busca por prefixo com bisect) e, para cada chave, os nicks
+    distintos (pela normalização dos relatórios) que a compartilham.
+    """
+
+    def __init__(self, nicks=()):
+        self._by_key = {}   # chave de busca → {nick normalizado: nick original}
+        for nick in nicks:
+            if nick:
+                self._by_key.setdefault(search_key(nick), {}).setdefault(normalize_nick(nick), nick)
+        self._sorted_keys = sorted(self._by_key)
+
+    def __len__(self) -> int:
+        return sum(len(nicks) for nicks in self._by_key.values())
+
+    def __contains__(self, nick: str) -> bool:
+        return normalize_nick(nick) in self._by_key.get(search_key(nick), ())
+
+    def add(self, nick: str) -> bool:
+        """Adiciona um nick ao índice. Retorna False se ele (ou uma variação de maiúsculas/minúsculas) já existir."""
+        if not nick:
+            return False
+        key = search_key(nick)
+        nicks = self._by_key.get(key)
+        if nicks is None:
+            nicks = self._by_key[key] = {}
+            bisect.insort(self._sorted_keys, key)
+        elif normalize_nick(nick) in nicks:
+            return False
+        nicks[normalize_nick(nick)] = nick
+        return True
+
+    def _nicks(self, keys) -> list[str]:
+        return [nick for key in keys for nick in sorted(self._by_key[key].values())]
+
+    def search(self, query: str, limit: int = MAX_CHOICES) -> list[str]:
+        """
+        Retorna até `limit` nicks: primeiro os que começam com o texto digitado (em ordem alfabética),
+        depois os que apenas o contêm, ordenados pela posição da ocorrência e pelo tamanho do nick.
+        """
+        key = search_key(query)
+        keys = self._sorted_keys
+        if not key:
+            return self._nicks(keys[:limit])[:limit]
+
+        results = []
+        index = bisect.bisect_left(keys, key)
+        while index < len(keys) and len(results) < limit and keys[index].startswith(key):
+            results.append(keys[index])
+            index += 1
+
+        if len(results) < limit:
+            # Todas as ocorrências no meio do nick são ordenadas antes do corte, para que as
+            # melhores (mais no início, nicks mais curtos) não fiquem de fora
+            matches = []
+            for candidate in keys:
+                position = candidate.find(key)
+                if position > 0:
+                    matches.append((position, len(candidate), candidate))
+            results.extend(candidate for _, _, candidate in sorted(matches)[:limit - len(results)])
+
+        return self._nicks(results)[:limit]
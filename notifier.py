@@ -0,0 +1,113 @@
+# notifier.py
+import asyncio
+import discord
+import logging
+import time
+
+COALESCE_WINDOW = 5.0        # Segundos aguardando outros motivos do mesmo usuário antes de enviar
+DEDUPE_WINDOW = 300.0        # Mesmo motivo para o mesmo usuário não é repetido dentro deste intervalo
+USER_MIN_INTERVAL = 60.0     # Intervalo mínimo entre duas DMs para o mesmo usuário
+GLOBAL_RATE = 2.0            # DMs por segundo no total
+CLOSED_DM_TTL = 24 * 3600    # Tempo que um usuário com DMs fechadas deixa de receber tentativas
+
+class _PendingDM:
+    def __init__(self, user: discord.abc.User, due: float):
+        self.user = user
+        self.due = due
+        self.reasons = {}  # (canal, motivo) → None, preservando a ordem de chegada
+
+_pending = {}
+_recent = {}
+_last_sent = {}
+_closed_dms = {}
+_next_slot = 0.0
+_wakeup = None
+_worker_task = None
+
+def notify_rejection(user: discord.abc.User, channel_name: str, reason: str):
+    """
+    Agenda uma DM avisando que a postagem não foi registrada, sem aguardar o envio.
+    Motivos repetidos são ignorados e motivos diferentes do mesmo usuário são enviados juntos.
+    """
+    now = time.monotonic()
+    closed_at = _closed_dms.get(user.id)
+    if closed_at is not None:
+        if now - closed_at < CLOSED_DM_TTL:
+            return
+        del _closed_dms[user.id]
+
+    key = (user.id, channel_name, reason)
+    if now - _recent.get(key, -DEDUPE_WINDOW) < DEDUPE_WINDOW:
+        return
+    _recent[key] = now
+
+    pending = _pending.get(user.id)
+    if pending is None:
+        due = max(now + COALESCE_WINDOW, _last_sent.get(user.id, -USER_MIN_INTERVAL) + USER_MIN_INTERVAL)
+        pending = _pending[user.id] = _PendingDM(user, due)
+    pending.reasons[(channel_name, reason)] = None
+    _ensure_worker()
+    _wakeup.set()
+
+def pending_count() -> int:
+    return len(_pending)
+
+def _ensure_worker():
+    global _wakeup, _worker_task
+    if _worker_task is None or _worker_task.done():
+        _wakeup = asyncio.Event()
+        _worker_task = asyncio.create_task(_worker())
+
+def _build_message(reasons: list) -> str:
+    if len(reasons) == 1:
+        channel_name, reason = reasons[0]
+        return f"Olá! Sua postagem no canal #{channel_name} não pôde ser registrada. Motivo: {reason}"
+    lines = "\n".join(f"• #{channel_name}: {reason}" for channel_name, reason in reasons)
+    return f"Olá! Algumas postagens suas não puderam ser registradas:\n{lines}"
+
+async def _wait_global_slot():
+    """Limita o total de DMs por segundo, espaçando os envios."""
+    global _next_slot
+    now = time.monotonic()
+    slot = max(now, _next_slot)
+    _next_slot = slot + 1 / GLOBAL_RATE
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+async def _send(pending: _PendingDM):
+    await _wait_global_slot()
+    try:
+        await pending.user.send(_build_message(list(pending.reasons)))
+        _last_sent[pending.user.id] = time.monotonic()
+    except discord.Forbidden:
+        # DMs fechadas: não tenta novamente por um tempo
+        _closed_dms[pending.user.id] = time.monotonic()
+    except Exception as e:
+        logging.error(f"Falha ao enviar DM para o usuário {pending.user.id}: {e}")
+
+def _prune(now: float):
+    for key in [key for key, sent_at in _recent.items() if now - sent_at >= DEDUPE_WINDOW]:
+        del _recent[key]
+    for user_id in [user_id for user_id, sent_at in _last_sent.items() if now - sent_at >= USER_MIN_INTERVAL]:
+        del _last_sent[user_id]
+
+async def _worker():
+    while True:
+        if not _pending:
+            _prune(time.monotonic())
+            await _wakeup.wait()
+            _wakeup.clear()
+            continue
+
+        delay = min(pending.due for pending in _pending.values()) - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+                _wakeup.clear()
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        now = time.monotonic()
+        for user_id in [user_id for user_id, pending in _pending.items() if pending.due <= now]:
+            await _send(_pending.pop(user_id))
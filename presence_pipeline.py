@@ -0,0 +1,174 @@
+# presence_pipeline.py
+import asyncio
+import logging
+import time
+
+WORKER_COUNT = 4
+MAX_QUEUE_SIZE = 200            # Acima disso, quem envia aguarda (backpressure)
+DEPTH_WARNING_THRESHOLD = 50    # Profundidade da fila que gera aviso no log
+WARNING_INTERVAL = 60.0         # Intervalo mínimo entre avisos de fila cheia
+
+class PresencePipeline:
+    """
+    Pool limitado de workers para a etapa cara do registro de presença.
+    Cada chave (jogador, evento, canal) tem no máximo um job em andamento: quem chega depois
+    pode aguardar o resultado do primeiro com `wait_in_flight` antes de validar de novo.
+    """
+
+    def __init__(self, worker_count: int = WORKER_COUNT, max_queue_size: int = MAX_QUEUE_SIZE):
+        self.worker_count = worker_count
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+        self._in_flight = {}
+        self._workers = []
+        self.processed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.backpressure_waits = 0
+        self._last_warning = 0.0
+        self._stopped = False
+
+    def start(self):
+        self._stopped = False
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        """
+        Conclui os jobs já enfileirados e encerra os workers. Se o pipeline ainda não tinha sido
+        iniciado (ex.: desligamento durante a importação do armazenamento), os workers são iniciados
+        só para esvaziar a fila: quem enviou um job recebe o resultado em vez de esperar para sempre.
+        """
+        self._stopped = True
+        if not self._workers and not self._queue.empty():
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        if self._workers:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def wait_in_flight(self, key) -> bool:
+        """Se houver um job em andamento para a chave, aguarda-o terminar. Retorna True se aguardou."""
+        future = self._in_flight.get(key)
+        if future is None:
+            return False
+        await asyncio.wait([future])
+        return True
+
+    async def submit(self, key, job):
+        """
+        Reserva a chave e enfileira `job` (função assíncrona sem argumentos) para um worker.
+        Aguarda se a fila estiver cheia e retorna o resultado do job.
+        """
+        if self._stopped:
+            raise RuntimeError("Pipeline de presenças encerrado")
+        if key in self._in_flight:
+            raise RuntimeError(f"Já existe um job em andamento para a chave {key}")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if self._queue.full():
+                self.backpressure_waits += 1
+                self._warn_depth("Fila de presenças cheia; aguardando workers")
+            await self._queue.put((key, job, future))
+        except BaseException:
+            self._in_flight.pop(key, None)
+            raise
+
+        depth = self._queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        if depth >= DEPTH_WARNING_THRESHOLD:
+            self._warn_depth("Fila de presenças acumulando")
+        return await future
+
+    def _warn_depth(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_warning >= WARNING_INTERVAL:
+            self._last_warning = now
+            logging.warning(f"{reason}: {self.stats()}")
+
+    async def _worker(self):
+        while True:
+            key, job, future = await self._queue.get()
+            try:
+                result = await job()
+                self.processed += 1
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Erro ao processar presença {key}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._in_flight.pop(key, None)
+                self._queue.task_done()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "fila": self._queue.qsize(),
+            "em_andamento": len(self._in_flight),
+            "max_fila": self.max_depth,
+            "processados": self.processed,
+            "falhas": self.failed,
+            "esperas_backpressure": self.backpressure_waits,
+        }
+
+class GuildPipelines:
+    """
+    Um PresencePipeline por servidor, criado sob demanda: cada servidor tem sua própria fila e seus
+    workers, então a fila cheia de um servidor não segura os posts dos outros. O que vem depois dos
+    workers é compartilhado de propósito: as abas da planilha, o journal, o limite do batch_writer
+    e as threads do sheets_client (a cota da API é da planilha, não do servidor). Os jobs não
+    esperam pelo Sheets, então um Sheets lento atrasa a sincronização de todos, mas não o registro.
+    """
+
+    def __init__(self, worker_count: int = WORKER_COUNT, max_queue_size: int = MAX_QUEUE_SIZE):
+        self.worker_count = worker_count
+        self.max_queue_size = max_queue_size
+        self._pipelines = {}
+        self._started = False
+
+    def __len__(self) -> int:
+        return len(self._pipelines)
+
+    def get(self, guild_id: int) -> PresencePipeline:
+        pipeline = self._pipelines.get(guild_id)
+        if pipeline is None:
+            pipeline = self._pipelines[guild_id] = PresencePipeline(self.worker_count, self.max_queue_size)
+            # Antes do start (armazenamento ainda importando) os jobs só aguardam na fila
+            if self._started:
+                pipeline.start()
+        return pipeline
+
+    def start(self):
+        self._started = True
+        for pipeline in self._pipelines.values():
+            pipeline.start()
+
+    async def stop(self):
+        await asyncio.gather(*(pipeline.stop() for pipeline in self._pipelines.values()))
+        self._started = False
+
+    async def remove(self, guild_id: int):
+        """Servidor removido: termina os jobs já enfileirados e descarta o pipeline."""
+        pipeline = self._pipelines.pop(guild_id, None)
+        if pipeline:
+            await pipeline.stop()
+
+    def stats(self) -> dict:
+        """
+        Totais de todos os servidores (max_fila é o maior limite individual). maior_fila é a fila do
+        servidor mais atrasado, que a soma esconde quando um único servidor está congestionado.
+        """
+        totals = {"servidores": len(self._pipelines), "fila": 0, "em_andamento": 0, "max_fila": 0,
+                  "processados": 0, "falhas": 0, "esperas_backpressure": 0}
+        for pipeline in self._pipelines.values():
+            for name, value in pipeline.stats().items():
+                totals[name] = max(totals[name], value) if name == "max_fila" else totals[name] + value
+        totals["maior_fila"] = max((pipeline.queue_depth() for pipeline in self._pipelines.values()), default=0)
+        return totals
@@ -0,0 +1,103 @@
+# report_cache.py
+import time
+from collections import OrderedDict
+import batch_writer
+import metrics
+import worksheet_cache
+
+MAX_ENTRIES = 512
+MAX_AGE = 300.0     # Segundos; cobre edições feitas direto na planilha, que o bot não vê acontecer
+
+class ReportCache:
+    """
+    Resultados já calculados dos relatórios, com chave (comando, divisão, jogador, período).
+    O período faz parte da chave, então a virada da semana/mês gera chaves novas e as antigas
+    saem pelo limite de tamanho. Uma gravação na divisão descarta as entradas dela (e as gerais).
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        # Versão de cada divisão: um cálculo iniciado antes de uma gravação não é guardado
+        self._generations = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, division: str | None) -> tuple:
+        return (self._generations.get(division, 0), self._generations.get(None, 0))
+
+    def get(self, key: tuple):
+        """Retorna (True, valor) se houver resultado válido para a chave, senão (False, None)."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, key: tuple, value, generation: tuple):
+        if generation != self.generation(key[1]):
+            return
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: tuple, compute):
+        """Retorna o resultado em cache ou aguarda `compute()` (função assíncrona) e guarda o resultado."""
+        found, value = self.get(key)
+        if found:
+            return value
+        generation = self.generation(key[1])
+        value = await compute()
+        self.put(key, value, generation)
+        return value
+
+    def invalidate(self, division: str = None):
+        """Descarta os resultados da divisão e os que somam todas as divisões (division=None descarta tudo)."""
+        self.invalidations += 1
+        self._generations[division] = self._generations.get(division, 0) + 1
+        if division is not None:
+            self._generations[None] = self._generations.get(None, 0) + 1
+        self.discard(division)
+
+    def discard(self, division: str = None):
+        """Remove as entradas sem invalidar cálculos em andamento (que já enxergam os dados novos)."""
+        if division is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[1] in (division, None)]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+results = ReportCache()
+
+def _on_rows_committed(worksheet_name: str, rows: list, start_row, start_column):
+    # Com a planilha como armazenamento, as linhas só aparecem nos relatórios depois do commit
+    results.invalidate(worksheet_name)
+
+def _on_frame_rows(worksheet_name: str, df, reset: bool):
+    # Linhas novas lidas da planilha (inclusive as escritas por fora do bot). Este aviso chega durante
+    # o próprio cálculo de um relatório, que já as inclui: só os demais resultados da divisão saem.
+    if reset or not df.empty:
+        results.discard(worksheet_name)
+
+batch_writer.add_commit_listener(_on_rows_committed)
+worksheet_cache.add_frame_listener(_on_frame_rows)
+metrics.gauge("bot_report_cache", "Cache de resultados dos relatórios (hits, misses, invalidações)", results.stats)
@@ -0,0 +1,92 @@
+# report_engine.py
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from validators import CATEGORIES, event_categories
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+TOP_N = 10
+
+def _membership_table(event_names: pd.Index) -> np.ndarray:
+    """Matriz (evento × categoria) indicando a quais categorias cada nome de evento pertence."""
+    import numpy as np
+    table = np.zeros((len(event_names) + 1, len(CATEGORIES)), dtype=bool)
+    for code, name in enumerate(event_names):
+        for category in event_categories(name):
+            table[code, CATEGORIES.index(category)] = True
+    # Última linha: eventos ausentes (código -1) contam como "Eventos", como no filtro antigo
+    table[-1] = [category in event_categories("") for category in CATEGORIES]
+    return table
+
+def classify(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as linhas (EVENTO, NICK) em um frame longo e compacto com CATEGORIA e NICK categóricos.
+    Cada nome de evento distinto é classificado uma única vez; um evento de duas categorias
+    (ex.: 'WB 10:00 + Pico') gera uma linha para cada uma.
+    """
+    import numpy as np
+    import pandas as pd
+    events = df['EVENTO'].astype('category')
+    nicks = df['NICK'].astype('category')
+    member = _membership_table(events.cat.categories)[events.cat.codes.to_numpy()]
+    rows, categories = np.nonzero(member)
+    return pd.DataFrame({
+        "CATEGORIA": pd.Categorical.from_codes(categories, categories=CATEGORIES),
+        "NICK": pd.Categorical.from_codes(nicks.cat.codes.to_numpy()[rows], dtype=nicks.dtype),
+    })
+
+def category_counts(df: pd.DataFrame) -> pd.Series:
+    """Presenças por (CATEGORIA, NICK) em um único agrupamento vetorizado."""
+    import pandas as pd
+    if df.empty:
+        return pd.Series(dtype="int64", index=pd.MultiIndex.from_tuples([], names=["CATEGORIA", "NICK"]))
+    long = classify(df)
+    # Nicks vazios não entram nos rankings (mesmo comportamento do value_counts antigo)
+    long = long[long['NICK'].notna() & (long['NICK'] != "")]
+    return long.groupby(["CATEGORIA", "NICK"], observed=True).size()
+
+def category_totals(df: pd.DataFrame) -> dict:
+    """Total de presenças por categoria ({categoria: total})."""
+    totals = category_counts(df).groupby(level="CATEGORIA", observed=True).sum()
+    return {category: int(totals.get(category, 0)) for category in CATEGORIES}
+
+def top_from_counts(counts: pd.Series, limit: int = TOP_N) -> dict:
+    """{categoria: [(nick, presenças), ...]} com os `limit` maiores de cada categoria (empates por nick)."""
+    import numpy as np
+    rankings = {category: [] for category in CATEGORIES}
+    if counts.empty:
+        return rankings
+    categories = counts.index.get_level_values("CATEGORIA").codes
+    nicks = counts.index.get_level_values("NICK").astype(str).to_numpy()
+    totals = counts.to_numpy()
+    # Ordena por categoria, presenças (desc.) e nick; depois fica com as `limit` primeiras de cada categoria
+    order = np.lexsort((nicks, -totals, categories))
+    sorted_categories = categories[order]
+    group_start = np.searchsorted(sorted_categories, sorted_categories, side="left")
+    keep = order[np.arange(len(order)) - group_start < limit]
+    for code, nick, total in zip(categories[keep], nicks[keep], totals[keep]):
+        rankings[CATEGORIES[code]].append((nick, int(total)))
+    return rankings
+
+def top_rankings(df: pd.DataFrame, limit: int = TOP_N) -> dict:
+    """Todos os rankings (top-N por categoria) de uma divisão de uma só vez."""
+    return top_from_counts(category_counts(df), limit)
+
+def merge_rankings(partials: dict, limit: int = TOP_N) -> dict:
+    """
+    Junta rankings de várias divisões ({divisão: top_rankings(...)}) em um ranking geral,
+    com cada entrada identificada como (nick, divisão, presenças).
+    Basta o top-N de cada divisão: o top-N geral é sempre um subconjunto deles.
+    """
+    merged = {}
+    for category in CATEGORIES:
+        entries = [
+            (nick, division, total)
+            for division, rankings in partials.items()
+            for nick, total in rankings.get(category, [])
+        ]
+        entries.sort(key=lambda entry: (-entry[2], entry[0], entry[1]))
+        merged[category] = entries[:limit]
+    return merged
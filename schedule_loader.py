@@ -0,0 +1,198 @@
+# schedule_loader.py
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import time
+import validators
+
+SCHEDULE_FILE = "schedule.json"
+DIAS = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+# Assinatura (mtime, tamanho) do arquivo carregado por último; None = usando o config.py
+_signature = None
+
+class ScheduleError(ValueError):
+    """Arquivo de horários inválido; a lista `errors` traz todos os problemas encontrados."""
+
+    def __init__(self, errors: list):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+def _parse_time(value, where: str, errors: list) -> time | None:
+    try:
+        hour, minute = str(value).split(":")
+        return time(int(hour), int(minute))
+    except ValueError:
+        errors.append(f"{where}: horário inválido '{value}' (use HH:MM)")
+        return None
+
+def _parse_events(channel_name: str, raw_events, errors: list) -> list:
+    """Converte os eventos de um canal (JSON) para o formato do config.py, acumulando os erros."""
+    if not isinstance(raw_events, list):
+        errors.append(f"canal '{channel_name}': esperada uma lista de eventos")
+        return []
+    events = []
+    for position, raw in enumerate(raw_events, start=1):
+        where = f"canal '{channel_name}', evento {position}"
+        if not isinstance(raw, dict) or not isinstance(raw.get("name"), str) or not raw["name"].strip():
+            errors.append(f"{where}: 'name' ausente")
+            continue
+        where = f"canal '{channel_name}', evento '{raw['name']}'"
+        days = raw.get("days")
+        if not isinstance(days, list) or not days or not all(isinstance(day, int) and 0 <= day <= 6 for day in days):
+            errors.append(f"{where}: 'days' deve ser uma lista de dias entre 0 (Seg) e 6 (Dom)")
+            continue
+        slots = []
+        for slot in raw.get("slots") or []:
+            if not isinstance(slot, list) or len(slot) != 2:
+                errors.append(f"{where}: cada slot deve ser [\"HH:MM\", \"HH:MM\"]")
+                continue
+            start, end = (_parse_time(value, where, errors) for value in slot)
+            if start is None or end is None:
+                continue
+            if start == end:
+                errors.append(f"{where}: slot {slot[0]} - {slot[1]} tem duração zero")
+                continue
+            slots.append((start, end))
+        if not slots:
+            errors.append(f"{where}: nenhum slot válido")
+            continue
+        events.append({"name": raw["name"], "days": sorted(set(days)), "slots": slots})
+    return events
+
+def parse_schedule(data, base_config: dict) -> tuple:
+    """
+    Valida o conteúdo do arquivo e devolve (cópia do CONFIG com os eventos novos, índices compilados),
+    com os índices no formato de validators.install_schedules. Nada global é alterado.
+    O arquivo define os eventos por nome de canal ({"channels": {"wb": [...], ...}}); todos os
+    canais do CONFIG precisam estar presentes, e canais desconhecidos ou slots sobrepostos no mesmo
+    canal invalidam o arquivo inteiro (ScheduleError).
+    """
+    errors = []
+    channels = data.get("channels") if isinstance(data, dict) else None
+    if not isinstance(channels, dict):
+        raise ScheduleError(["o arquivo deve conter um objeto 'channels' ({canal: [eventos]})"])
+
+    known = {channel_name for category_config in base_config.values() for channel_name in category_config["channels"]}
+    for channel_name in sorted(set(channels) - known):
+        errors.append(f"canal desconhecido '{channel_name}'")
+    for channel_name in sorted(known - set(channels)):
+        errors.append(f"canal '{channel_name}' ausente")
+
+    schedules = {}
+    compiled = {}
+    for channel_name in sorted(known & set(channels)):
+        events = _parse_events(channel_name, channels[channel_name], errors)
+        schedule = validators.compile_schedule(events)
+        for day, winner, loser in schedule.overlaps:
+            errors.append(f"canal '{channel_name}' ({DIAS[day]}): '{winner}' e '{loser}' se sobrepõem")
+        schedules[channel_name] = events
+        compiled[id(events)] = (events, schedule)
+    if errors:
+        raise ScheduleError(errors)
+
+    # Uma lista por canal, compartilhada pelas categorias: cada horário é compilado uma única vez
+    config = {
+        category_name: {
+            **category_config,
+            "channels": {channel_name: schedules[channel_name] for channel_name in category_config["channels"]},
+        }
+        for category_name, category_config in base_config.items()
+    }
+    return config, compiled
+
+def export_schedule(config: dict) -> dict:
+    """Conteúdo de um schedule.json equivalente aos horários do CONFIG (inverso de parse_schedule)."""
+    channels = {}
+    for category_config in config.values():
+        for channel_name, events in category_config["channels"].items():
+            channels.setdefault(channel_name, [
+                {
+                    "name": event["name"],
+                    "days": list(event["days"]),
+                    "slots": [[start.strftime("%H:%M"), end.strftime("%H:%M")] for start, end in event["slots"]],
+                }
+                for event in events
+            ])
+    return {"channels": channels}
+
+def _file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _load(path: str, base_config: dict) -> tuple:
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ScheduleError([f"JSON inválido: {e}"])
+    # Valida e já compila os índices (fora do loop de eventos); a troca em si é feita por quem chamou
+    return parse_schedule(data, base_config)
+
+def load_initial(path: str, base_config: dict) -> dict:
+    """
+    Horários da inicialização: o arquivo, se existir e for válido; senão os do config.py.
+    Instala os índices compilados e retorna o CONFIG correspondente.
+    """
+    global _signature
+    signature = _file_signature(path)
+    loaded = None
+    if signature is None:
+        logging.info(f"Arquivo de horários '{path}' não encontrado. Usando os horários do config.py.")
+    else:
+        try:
+            loaded = _load(path, base_config)
+            logging.info(f"Horários carregados de '{path}'.")
+        except (OSError, ScheduleError) as e:
+            logging.error(f"Arquivo de horários '{path}' inválido ({e}). Usando os horários do config.py.")
+        _signature = signature
+    config, compiled = loaded or (base_config, validators.compile_config_schedules(base_config))
+    validators.install_schedules(compiled)
+    return config
+
+async def reload_if_changed(path: str, base_config: dict) -> tuple | None:
+    """
+    Relê o arquivo se ele mudou desde a última carga. Retorna (CONFIG novo, índices compilados) para
+    quem chamou instalar no loop de eventos, ou None se nada mudou ou se o arquivo é inválido (nesse
+    caso os horários atuais continuam valendo).
+    """
+    global _signature
+    signature = _file_signature(path)
+    if signature is None or signature == _signature:
+        return None
+    try:
+        loaded = await asyncio.to_thread(_load, path, base_config)
+    except (OSError, ScheduleError) as e:
+        logging.error(f"Arquivo de horários '{path}' rejeitado; os horários atuais continuam valendo. Erros: {e}")
+        loaded = None
+    # Um arquivo inválido só é relido quando mudar de novo
+    _signature = signature
+    return loaded
+
+def format_schedule(data: dict) -> str:
+    """JSON do arquivo de horários com um evento por bloco e dias/slots em uma linha (fácil de editar à mão)."""
+    def dump(value) -> str:
+        return json.dumps(value, ensure_ascii=False)
+
+    channels = []
+    for channel_name, events in data["channels"].items():
+        blocks = [
+            f'      {{\n        "name": {dump(event["name"])},\n        "days": {dump(event["days"])},\n'
+            f'        "slots": [\n' + ",\n".join(f"          {dump(slot)}" for slot in event["slots"]) + "\n        ]\n      }"
+            for event in events
+        ]
+        channels.append(f"    {dump(channel_name)}: [\n" + ",\n".join(blocks) + "\n    ]")
+    return '{\n  "channels": {\n' + ",\n".join(channels) + "\n  }\n}\n"
+
+if __name__ == "__main__":
+    # Gera o arquivo de horários a partir do config.py: python schedule_loader.py [arquivo]
+    from config import CONFIG
+    target = sys.argv[1] if len(sys.argv) > 1 else SCHEDULE_FILE
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(format_schedule(export_schedule(CONFIG)))
+    print(f"Horários do config.py gravados em '{target}'.")
@@ -1,10 +1,15 @@
+import asyncio
+import functools
 import gspread
 import logging
-from datetime import datetime
+import metrics
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIGURAÇÕES ---
 SERVICE_ACCOUNT_FILE = 'credentials/bot-integration-464319-78fb375d86ee.json'
 SPREADSHEET_NAME = 'CONTROLE PRESENÇA SA'
+MAX_WORKERS = 4  # Limite de chamadas simultâneas à API do Google
 
 # Mapeamento das seções → colunas na planilha
 SECTION_COLUMNS = {
@@ -15,36 +20,158 @@ SECTION_COLUMNS = {
     "torre": ("X", "Z")            # Colunas X:Z (nova seção Torre)
 }
 
-def record_presence(worksheet_name: str, dia: str, evento: str, hora: str, nick: str, section: str = None):
+# Mensagens da API quando o handle em cache aponta para uma aba que não existe mais
+MISSING_RANGE_MESSAGES = ("Unable to parse range", "No grid with id")
+
+# --- ESTADO DO CLIENTE (autenticado uma única vez) ---
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="sheets")
+_lock = threading.Lock()  # Protege _client, _spreadsheet e _worksheets (usados pelas threads do executor)
+_client = None
+_spreadsheet = None
+_worksheets = {}
+
+def _get_spreadsheet() -> gspread.Spreadsheet:
     """
-    Registra a presença na aba (worksheet) correta da planilha principal.
-    Usa append_row para evitar cálculos manuais de next_row.
+    Autentica e abre a planilha apenas na primeira chamada.
+    O cliente mantém a mesma sessão HTTP (com pool de conexões) para todas as requisições seguintes.
     """
-    try:
-        gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
-        sh = gc.open(SPREADSHEET_NAME)
-        worksheet = sh.worksheet(worksheet_name)
-    except gspread.exceptions.SpreadsheetNotFound:
-        logging.critical(f"PLANILHA NÃO ENCONTRADA: '{SPREADSHEET_NAME}'")
-        return False
-    except gspread.exceptions.WorksheetNotFound:
-        logging.critical(f"ABA NÃO ENCONTRADA: '{worksheet_name}'")
-        return False
-    except FileNotFoundError:
-        logging.critical(f"Arquivo de credenciais não encontrado: {SERVICE_ACCOUNT_FILE}")
-        return False
-    except Exception as e:
-        logging.error(f"Erro inesperado ao acessar planilha: {e}")
-        return False
+    global _client, _spreadsheet
+    with _lock:
+        if _spreadsheet is None:
+            _client = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
+            _spreadsheet = _client.open(SPREADSHEET_NAME)
+            logging.info(f"Conectado à planilha '{SPREADSHEET_NAME}'.")
+        return _spreadsheet
+
+def get_worksheet(worksheet_name: str, refresh: bool = False) -> gspread.Worksheet:
+    """Retorna o handle da aba a partir do cache, buscando-o na planilha se necessário."""
+    if not refresh:
+        with _lock:
+            worksheet = _worksheets.get(worksheet_name)
+        if worksheet is not None:
+            return worksheet
+
+    worksheet = _get_spreadsheet().worksheet(worksheet_name)
+    with _lock:
+        _worksheets[worksheet_name] = worksheet
+    return worksheet
+
+def status_code(error: gspread.exceptions.APIError) -> int | None:
+    """Extrai o código HTTP de um APIError do gspread."""
+    response = getattr(error, "response", None)
+    return response.status_code if response is not None else None
+
+def _is_missing_range_error(error: gspread.exceptions.APIError) -> bool:
+    """
+    Erro 400 de intervalo/aba inexistente: a aba referenciada pelo handle foi renomeada ou recriada.
+    Outros erros 400 (valores ou requisições inválidas) não têm relação com o handle.
+    """
+    message = str(getattr(error, "error", {}).get("message", ""))
+    return status_code(error) == 400 and message.startswith(MISSING_RANGE_MESSAGES)
 
+def with_worksheet(worksheet_name: str, operation):
+    """
+    Executa operation(worksheet) com o handle em cache.
+    Se a aba tiver sido removida ou renomeada, descarta o handle e tenta uma vez com um novo.
+    """
     try:
-        row_to_add = [dia, evento, hora, nick]
+        return operation(get_worksheet(worksheet_name))
+    except gspread.exceptions.APIError as e:
+        if not _is_missing_range_error(e):
+            raise
+        logging.warning(f"Handle da aba '{worksheet_name}' inválido. Recarregando metadados da planilha.")
+        with _lock:
+            _worksheets.pop(worksheet_name, None)
+        return operation(get_worksheet(worksheet_name, refresh=True))
+
+async def run_blocking(func, *args, **kwargs):
+    """Executa uma chamada bloqueante do gspread no executor limitado, sem travar o event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def _timed_call(operation: str, func, *args):
+    """Como run_blocking, registrando latência e falhas por tipo de operação."""
+    with metrics.SHEETS_LATENCY.time(operacao=operation):
+        try:
+            return await run_blocking(func, *args)
+        except Exception:
+            metrics.SHEETS_ERRORS.inc(operacao=operation)
+            raise
+
+def shutdown():
+    """Aguarda as chamadas pendentes e encerra o executor."""
+    _executor.shutdown(wait=True)
 
-        # Usa append_row que adiciona ao final da folha automaticamente
-        worksheet.append_row(row_to_add, value_input_option='USER_ENTERED')
+# --- OPERAÇÕES ---
+async def append_rows(worksheet_name: str, rows: list) -> dict:
+    """
+    Adiciona várias linhas ao final da aba em uma única chamada à API.
+    Retorna a resposta da API (com o intervalo atualizado); erros são propagados para quem chamou.
+    """
+    return await _timed_call(
+        "append", with_worksheet, worksheet_name,
+        lambda ws: ws.append_rows(rows, value_input_option='USER_ENTERED')
+    )
+
+async def get_range(worksheet_name: str, a1_range: str) -> list:
+    """Retorna os valores de um intervalo da aba (ex.: "A1:E")."""
+    return await _timed_call("leitura", with_worksheet, worksheet_name, lambda ws: [list(row) for row in ws.get(a1_range)])
+
+async def get_ranges(worksheet_name: str, a1_ranges: list) -> list:
+    """Busca vários intervalos da mesma aba em uma única requisição (batchGet)."""
+    return await _timed_call(
+        "leitura", with_worksheet, worksheet_name,
+        lambda ws: [[list(row) for row in value_range] for value_range in ws.batch_get(a1_ranges)]
+    )
+
+async def batch_get_column(worksheet_names: list, column: str, first_row: int = 2) -> dict:
+    """
+    Busca a mesma coluna de várias abas em uma única requisição (values.batchGet).
+    Retorna {nome_da_aba: [valores]}.
+    """
+    def _fetch():
+        ranges = [f"'{name.replace(chr(39), chr(39) * 2)}'!{column}{first_row}:{column}" for name in worksheet_names]
+        response = _get_spreadsheet().values_batch_get(ranges)
+        value_ranges = response.get("valueRanges", [])
+        return {
+            name: [row[0] for row in value_range.get("values", []) if row]
+            for name, value_range in zip(worksheet_names, value_ranges)
+        }
+    return await _timed_call("leitura", _fetch)
+
+async def update_ranges(worksheet_name: str, data: list) -> dict:
+    """
+    Sobrescreve vários intervalos da aba em uma única requisição (batchUpdate).
+    `data` é uma lista de {"range": "H1:J21", "values": [[...], ...]}.
+    """
+    return await _timed_call(
+        "escrita", with_worksheet, worksheet_name,
+        lambda ws: ws.batch_update(data, value_input_option='USER_ENTERED')
+    )
+
+async def delete_cells(worksheet_name: str, row_ranges: list, first_column: str, last_column: str):
+    """
+    Apaga as células das colunas first_column:last_column nos intervalos de linhas [(início, fim)]
+    (1-based, inclusivos), deslocando para cima apenas essas colunas. As demais colunas da aba
+    (ex.: as seções de resumo em SECTION_COLUMNS) não são tocadas. Tudo vai em uma única
+    requisição (batchUpdate), de baixo para cima para não deslocar os intervalos seguintes.
+    """
+    first_index = gspread.utils.column_letter_to_index(first_column) - 1
+    last_index = gspread.utils.column_letter_to_index(last_column)
 
-        logging.info(f"Presença para '{evento}' registrada com sucesso na aba '{worksheet_name}' para: {nick}")
-        return True
-    except Exception as e:
-        logging.error(f"Falha ao escrever na aba '{worksheet_name}' para o usuário {nick}: {e}")
-        return False
+    def _delete(ws):
+        requests = [
+            {"deleteRange": {
+                "range": {
+                    "sheetId": ws.id,
+                    "startRowIndex": start - 1,
+                    "endRowIndex": end,
+                    "startColumnIndex": first_index,
+                    "endColumnIndex": last_index,
+                },
+                "shiftDimension": "ROWS",
+            }}
+            for start, end in sorted(row_ranges, reverse=True)
+        ]
+        return ws.spreadsheet.batch_update({"requests": requests})
+    return await _timed_call("exclusao", with_worksheet, worksheet_name, _delete)
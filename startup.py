@@ -0,0 +1,80 @@
+# startup.py
+import hashlib
+import json
+import logging
+import os
+import time
+import metrics
+
+COMMANDS_HASH_FILE = "commands_hash.txt"
+
+class StartupTimer:
+    """Tempo de cada fase da inicialização, até a primeira presença processada."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = {}
+        self.ready_at = None
+        self.first_message_at = None
+
+    def mark(self, phase: str):
+        """Encerra a fase atual (o tempo desde a marca anterior) com o nome `phase`."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def ready(self):
+        """Bot pronto para processar mensagens: registra o total e loga o detalhamento."""
+        if self.ready_at is not None:
+            return
+        self.ready_at = time.perf_counter()
+        details = ", ".join(f"{phase}: {seconds:.2f}s" for phase, seconds in self.phases.items())
+        logging.info(f"Inicialização concluída em {self.ready_at - self.started:.2f}s ({details}).")
+
+    def message_processed(self):
+        if self.first_message_at is not None:
+            return
+        self.first_message_at = time.perf_counter()
+        logging.info(f"Primeira presença processada {self.first_message_at - self.started:.2f}s após o início do processo.")
+
+    def stats(self) -> dict:
+        values = {phase: round(seconds, 3) for phase, seconds in self.phases.items()}
+        if self.ready_at is not None:
+            values["total_ate_pronto"] = round(self.ready_at - self.started, 3)
+        if self.first_message_at is not None:
+            values["primeira_mensagem"] = round(self.first_message_at - self.started, 3)
+        return values
+
+timer = StartupTimer()
+metrics.gauge("bot_startup_seconds", "Duração das fases da inicialização (segundos)", timer.stats)
+
+# --- SINCRONIZAÇÃO DOS COMANDOS DE BARRA ---
+def commands_hash(tree, application_id: int) -> str:
+    """Hash das definições dos comandos de barra (nomes, descrições, opções) e da aplicação."""
+    definitions = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda item: item["name"])
+    payload = json.dumps({"aplicacao": application_id, "comandos": definitions}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _stored_hash(path: str) -> str | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+async def sync_commands(tree, application_id: int, path: str = COMMANDS_HASH_FILE, force: bool = False) -> bool:
+    """
+    Sincroniza os comandos com o Discord apenas se as definições mudaram desde a última
+    sincronização bem-sucedida (chamada global com rate limit). Retorna True se sincronizou.
+    """
+    current = commands_hash(tree, application_id)
+    if not force and _stored_hash(path) == current:
+        logging.info("Comandos de barra inalterados; sincronização ignorada.")
+        return False
+    synced = await tree.sync()
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(current)
+    os.replace(path + ".tmp", path)
+    logging.info(f"Sincronizados {len(synced)} comandos de barra.")
+    return True
@@ -0,0 +1,470 @@
+# storage.py
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import date, datetime
+import attendance_index
+import batch_writer
+import journal
+import report_engine
+import sheets_client
+import worksheet_cache
+from validators import CATEGORIES, CATEGORY_EVENTOS, CATEGORY_PRACA_PICO, CATEGORY_TORRE, CATEGORY_WB, TARGET_TZ, event_categories
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BACKEND_SHEETS = "sheets"
+BACKEND_SQLITE = "sqlite"
+
+STORE_FILE = "presence_store.db"
+NICK_COLUMN = "E"
+SUMMARY_INTERVAL = 120     # Segundos entre atualizações dos resumos (H:Z) das abas alteradas
+SUMMARY_ROWS = 20          # Jogadores por seção de resumo na planilha
+IMPORT_RETRY_DELAY = 60    # Segundos entre tentativas de importar uma aba cuja leitura falhou
+
+# Seções de resumo na planilha: chave de SECTION_COLUMNS → (título, categoria, período)
+SUMMARY_SECTIONS = {
+    "wb_semana": ("WB (Semana)", CATEGORY_WB, "semana"),
+    "wb_mes": ("WB (Mês)", CATEGORY_WB, "mes"),
+    "praca_pico": ("Praça/Pico (Semana)", CATEGORY_PRACA_PICO, "semana"),
+    "eventos": ("Eventos (Mês)", CATEGORY_EVENTOS, "mes"),
+    "torre": ("Torre (Mês)", CATEGORY_TORRE, "mes"),
+}
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+async def mirror_row(worksheet_name: str, row: list) -> bool:
+    """
+    Replica uma linha (DIA, EVENTO, HORA, NICK) para a aba: primeiro no journal local, com a
+    sincronização em segundo plano; se o journal falhar, grava direto pelo batch_writer.
+    """
+    try:
+        entry_id = await journal.append(worksheet_name, row)
+    except Exception as e:
+        logging.error(f"Falha ao gravar presença no journal local: {e}. Gravando direto na planilha.")
+        return await batch_writer.append(worksheet_name, row)
+    # Com o Sheets congestionado a entrada fica no journal e o replayer a envia depois
+    journal.sync(entry_id, worksheet_name, row)
+    return True
+
+class StorageBackend(ABC):
+    """Interface usada pelo registro de presenças e pelos relatórios."""
+    name = None
+
+    async def start(self, worksheet_names: list):
+        """Prepara o armazenamento antes do bot começar a processar mensagens."""
+
+    async def close(self):
+        """Libera os recursos no desligamento."""
+
+    @abstractmethod
+    async def record(self, worksheet_name: str, row: list) -> bool:
+        """Grava uma presença (DIA dd/mm/aaaa, EVENTO, HORA, NICK). Retorna True se ficou salva."""
+
+    @abstractmethod
+    async def get_frame(self, worksheet_name: str, since: date = None) -> pd.DataFrame:
+        """DataFrame (DIA, EVENTO, HORA, NICK) da divisão, opcionalmente só a partir de `since`."""
+
+    @abstractmethod
+    async def has_data(self, worksheet_name: str) -> bool:
+        """Indica se a divisão tem algum registro."""
+
+    @abstractmethod
+    async def player_summary(self, worksheet_name: str, nick: str, today: datetime) -> dict | None:
+        """Contagens do /presenca (ver attendance_index.player_summary), ou None se o jogador não tiver registros."""
+
+    @abstractmethod
+    async def list_nicks(self, worksheet_names: list) -> dict:
+        """Nicks registrados por divisão ({aba: [nicks]}), usados pelo autocomplete."""
+
+    @abstractmethod
+    async def period_rankings(self, worksheet_name: str, period: str, today: date) -> dict:
+        """Top-N por categoria ({categoria: [(nick, presenças)]}) da semana ("semana") ou do mês ("mes") atual."""
+
+# --- PLANILHA COMO ARMAZENAMENTO (comportamento original) ---
+class SheetsStorage(StorageBackend):
+    """Lê e grava direto na planilha, com o cache incremental das abas e o índice de presenças em memória."""
+    name = BACKEND_SHEETS
+
+    async def record(self, worksheet_name: str, row: list) -> bool:
+        return await mirror_row(worksheet_name, row)
+
+    async def get_frame(self, worksheet_name: str, since: date = None) -> pd.DataFrame:
+        import pandas as pd
+        df = await worksheet_cache.get_frame(worksheet_name)
+        if since is not None and not df.empty:
+            df = df[df['DIA'] >= pd.Timestamp(since)]
+        return df
+
+    async def has_data(self, worksheet_name: str) -> bool:
+        return not (await worksheet_cache.get_frame(worksheet_name)).empty
+
+    async def player_summary(self, worksheet_name: str, nick: str, today: datetime) -> dict | None:
+        # O índice é atualizado junto com o cache da aba; aqui é apenas uma consulta de dicionário
+        await worksheet_cache.get_frame(worksheet_name)
+        return attendance_index.player_summary(worksheet_name, nick, today)
+
+    async def list_nicks(self, worksheet_names: list) -> dict:
+        """Lê apenas a coluna NICK de todas as abas em uma requisição; se falhar, busca aba por aba."""
+        try:
+            return await sheets_client.batch_get_column(worksheet_names, NICK_COLUMN)
+        except Exception as e:
+            logging.warning(f"Falha na leitura em lote dos nicks ({e}). Buscando as abas individualmente.")
+
+        async def fetch(worksheet_name: str):
+            try:
+                rows = await sheets_client.get_range(worksheet_name, f"{NICK_COLUMN}2:{NICK_COLUMN}")
+                return worksheet_name, [row[0] for row in rows if row]
+            except Exception as e:
+                logging.error(f"Erro ao carregar nicks da aba '{worksheet_name}': {e}")
+                return worksheet_name, None
+
+        results = await asyncio.gather(*(fetch(name) for name in worksheet_names))
+        return {name: nicks for name, nicks in results if nicks is not None}
+
+    async def period_rankings(self, worksheet_name: str, period: str, today: date) -> dict:
+        key = attendance_index.week_key(today) if period == "semana" else attendance_index.month_key(today)
+        if worksheet_cache.is_cached(worksheet_name):
+            # Os contadores do índice já estão agregados por período: nenhum DataFrame é montado
+            await worksheet_cache.get_frame(worksheet_name)
+            return attendance_index.top_players(worksheet_name, key, report_engine.TOP_N)
+        # Aba fora do cache: agrega a leitura e a descarta, sem deixar o histórico inteiro em memória
+        values = await sheets_client.get_range(worksheet_name, f"A1:{worksheet_cache.LAST_COLUMN}")
+        return await asyncio.to_thread(attendance_index.rows_top_players, values[1:], key, report_engine.TOP_N)
+
+# --- SQLITE COMO ARMAZENAMENTO PRINCIPAL ---
+class SQLiteStorage(StorageBackend):
+    """
+    Guarda as presenças em SQLite, indexadas por (aba, nick, data, evento), e atende os relatórios
+    com consultas locais. A planilha vira um espelho: cada linha é replicada em B:E pelo journal e
+    os resumos das seções (SECTION_COLUMNS) são reescritos periodicamente.
+    Na inicialização, o histórico de cada aba ainda não importada é lido da planilha. Enquanto a
+    importação de uma aba não termina, as presenças dela só vão para o journal (que as leva à
+    planilha) e para uma fila em memória, incluídas na importação; os relatórios dela falham na hora.
+    As operações no SQLite rodam em threads, fora do loop de eventos.
+    """
+    name = BACKEND_SQLITE
+
+    def __init__(self, path: str = STORE_FILE):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS presences (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                worksheet TEXT NOT NULL,
+                nick_key TEXT NOT NULL,
+                dia TEXT NOT NULL,
+                evento TEXT NOT NULL,
+                hora TEXT NOT NULL,
+                nick TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_presences_player ON presences(worksheet, nick_key, dia, evento);
+            CREATE INDEX IF NOT EXISTS idx_presences_day ON presences(worksheet, dia);
+            CREATE TABLE IF NOT EXISTS imported_worksheets (worksheet TEXT PRIMARY KEY) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+        self._imported = {name for (name,) in self._conn.execute("SELECT worksheet FROM imported_worksheets")}
+        self._import_locks = {}
+        self._import_failed_at = {}     # aba → instante (monotonic) da última falha de importação
+        self._queued = {}               # aba → linhas aceitas antes da importação terminar
+        self._dirty = set()
+        self._summary_task = None
+        self._import_task = None
+
+    async def start(self, worksheet_names: list):
+        await asyncio.gather(*(self._try_import(name) for name in worksheet_names))
+        if self._summary_task is None or self._summary_task.done():
+            self._summary_task = asyncio.create_task(self._summary_loop())
+        missing = [name for name in worksheet_names if name not in self._imported]
+        if missing and (self._import_task is None or self._import_task.done()):
+            self._import_task = asyncio.create_task(self._import_loop(missing))
+
+    async def close(self):
+        for task in (self._summary_task, self._import_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._summary_task = self._import_task = None
+        # Grava os resumos pendentes antes de sair
+        await self.write_summaries()
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- IMPORTAÇÃO INICIAL ---
+    async def _ensure_imported(self, worksheet_name: str):
+        """
+        Garante que o histórico da aba está no SQLite antes de uma consulta. Se a última tentativa
+        falhou há menos de IMPORT_RETRY_DELAY, falha na hora em vez de esperar outra leitura.
+        """
+        lock = self._import_locks.setdefault(worksheet_name, asyncio.Lock())
+        if worksheet_name in self._imported and not lock.locked():
+            return
+        async with lock:
+            if worksheet_name in self._imported:
+                return
+            failed_at = self._import_failed_at.get(worksheet_name)
+            if failed_at is not None and time.monotonic() - failed_at < IMPORT_RETRY_DELAY:
+                raise RuntimeError(f"histórico da aba '{worksheet_name}' ainda não importado da planilha")
+            try:
+                await self._import(worksheet_name)
+            except Exception:
+                self._import_failed_at[worksheet_name] = time.monotonic()
+                raise
+
+    async def _try_import(self, worksheet_name: str):
+        try:
+            await self._ensure_imported(worksheet_name)
+        except Exception as e:
+            logging.error(f"Falha ao importar o histórico da aba '{worksheet_name}' para o armazenamento local: {e}")
+
+    async def _import_loop(self, worksheet_names: list):
+        """Tenta de novo, em segundo plano, as abas cuja importação falhou na inicialização."""
+        while any(name not in self._imported for name in worksheet_names):
+            await asyncio.sleep(IMPORT_RETRY_DELAY)
+            for name in worksheet_names:
+                if name not in self._imported:
+                    await self._try_import(name)
+
+    async def _import(self, worksheet_name: str):
+        # O journal é lido antes da planilha: uma linha sincronizada nesse meio-tempo já aparece na leitura
+        pending = [row for _, name, row in await journal.pending(limit=-1) if name == worksheet_name]
+        values = await sheets_client.get_range(worksheet_name, "A1:E")
+        # As presenças aceitas daqui em diante não estão na leitura acima: continuam na fila até o commit
+        queued = self._queued.pop(worksheet_name, [])
+        sheet_rows = [(list(row) + [""] * 5)[1:5] for row in values[1:]]
+        try:
+            imported = await asyncio.to_thread(self._import_rows, worksheet_name, sheet_rows, pending + queued)
+            # A aba só é marcada como importada depois que a fila esvazia (no commit que grava a marca)
+            while True:
+                late = self._queued.pop(worksheet_name, [])
+                await asyncio.to_thread(self._finish_import, worksheet_name, late)
+                queued += late
+                imported += len(late)
+                if not self._queued.get(worksheet_name):
+                    break
+        except Exception:
+            self._queued[worksheet_name] = queued + self._queued.get(worksheet_name, [])
+            raise
+        self._imported.add(worksheet_name)
+        self._import_failed_at.pop(worksheet_name, None)
+        logging.info(f"Histórico da aba '{worksheet_name}' importado para o armazenamento local ({imported} linhas).")
+
+    def _import_rows(self, worksheet_name: str, sheet_rows: list, accepted_rows: list) -> int:
+        """
+        Grava as linhas da planilha e as já aceitas pelo bot que talvez ainda não estejam nela
+        (journal pendente e fila da importação). Uma linha presente nas duas fontes conta uma vez,
+        e as que já estão no SQLite (importação interrompida antes de ser marcada) são puladas.
+        """
+        sheet = [record for record in (self._to_record(worksheet_name, row) for row in sheet_rows) if record]
+        accepted = [record for record in (self._to_record(worksheet_name, row) for row in accepted_rows) if record]
+        wanted = Counter(sheet)
+        for record, total in Counter(accepted).items():
+            wanted[record] = max(wanted[record], total)
+        with self._lock:
+            existing = Counter(self._conn.execute(
+                "SELECT worksheet, nick_key, dia, evento, hora, nick FROM presences WHERE worksheet = ?", (worksheet_name,)
+            ))
+            records = []
+            for record in sheet + accepted:
+                if existing[record] < wanted[record]:
+                    existing[record] += 1
+                    records.append(record)
+            self._conn.executemany(
+                "INSERT INTO presences (worksheet, nick_key, dia, evento, hora, nick) VALUES (?, ?, ?, ?, ?, ?)", records
+            )
+            self._conn.commit()
+        return len(records)
+
+    def _finish_import(self, worksheet_name: str, late_rows: list):
+        """Grava as presenças aceitas durante a importação (fora da leitura da planilha) e marca a aba."""
+        records = [record for record in (self._to_record(worksheet_name, row) for row in late_rows) if record]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO presences (worksheet, nick_key, dia, evento, hora, nick) VALUES (?, ?, ?, ?, ?, ?)", records
+            )
+            self._conn.execute("INSERT OR IGNORE INTO imported_worksheets VALUES (?)", (worksheet_name,))
+            self._conn.commit()
+
+    @staticmethod
+    def _to_record(worksheet_name: str, row: list) -> tuple | None:
+        dia, evento, hora, nick = row
+        try:
+            day = datetime.strptime(dia, '%d/%m/%Y').date()
+        except (TypeError, ValueError):
+            # Mesmo critério do DataFrame da planilha: linhas sem data válida são descartadas
+            return None
+        return (worksheet_name, attendance_index.normalize_nick(nick), day.isoformat(), evento, hora, nick)
+
+    # --- GRAVAÇÃO ---
+    async def record(self, worksheet_name: str, row: list) -> bool:
+        if worksheet_name not in self._imported:
+            # Sem esperar a planilha: a linha entra na importação quando ela conseguir ler a aba
+            self._queued.setdefault(worksheet_name, []).append(row)
+            return await mirror_row(worksheet_name, row)
+        try:
+            await asyncio.to_thread(self._insert, self._to_record(worksheet_name, row))
+        except sqlite3.Error as e:
+            logging.error(f"Falha ao gravar presença no armazenamento local da aba '{worksheet_name}': {e}")
+            return False
+        self._dirty.add(worksheet_name)
+        await mirror_row(worksheet_name, row)
+        return True
+
+    def _insert(self, record: tuple):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO presences (worksheet, nick_key, dia, evento, hora, nick) VALUES (?, ?, ?, ?, ?, ?)", record
+            )
+            self._conn.commit()
+
+    # --- CONSULTAS ---
+    async def get_frame(self, worksheet_name: str, since: date = None) -> pd.DataFrame:
+        await self._ensure_imported(worksheet_name)
+        return await asyncio.to_thread(self._load_frame, worksheet_name, since)
+
+    def _load_frame(self, worksheet_name: str, since: date | None) -> pd.DataFrame:
+        import pandas as pd
+        rows = self._query(
+            "SELECT dia, evento, hora, nick FROM presences WHERE worksheet = ? AND dia >= ? ORDER BY id",
+            (worksheet_name, (since or date.min).isoformat())
+        )
+        df = pd.DataFrame(rows, columns=worksheet_cache.HEADERS)
+        df['DIA'] = pd.to_datetime(df['DIA'], format='%Y-%m-%d')
+        # Poucos eventos e nicks distintos: categóricos ocupam menos memória e agrupam mais rápido
+        df['EVENTO'] = df['EVENTO'].astype('category')
+        df['NICK'] = df['NICK'].astype('category')
+        return df
+
+    async def has_data(self, worksheet_name: str) -> bool:
+        await self._ensure_imported(worksheet_name)
+        return bool(await asyncio.to_thread(self._query, "SELECT 1 FROM presences WHERE worksheet = ? LIMIT 1", (worksheet_name,)))
+
+    async def player_summary(self, worksheet_name: str, nick: str, today: datetime) -> dict | None:
+        await self._ensure_imported(worksheet_name)
+        return await asyncio.to_thread(self._player_summary, worksheet_name, nick, today)
+
+    def _player_summary(self, worksheet_name: str, nick: str, today: datetime) -> dict | None:
+        nick_key = attendance_index.normalize_nick(nick)
+        if not self._query("SELECT 1 FROM presences WHERE worksheet = ? AND nick_key = ? LIMIT 1", (worksheet_name, nick_key)):
+            return None
+
+        week = attendance_index.week_start(today.date())
+        month = month_start(today.date())
+        rows = self._query(
+            "SELECT dia, evento, COUNT(*) FROM presences WHERE worksheet = ? AND nick_key = ? AND dia >= ? GROUP BY dia, evento",
+            (worksheet_name, nick_key, min(week, month).isoformat())
+        )
+        weekly, monthly = {}, {}
+        for dia, evento, total in rows:
+            day = date.fromisoformat(dia)
+            for category in event_categories(evento):
+                if day >= week:
+                    weekly[category] = weekly.get(category, 0) + total
+                if day >= month:
+                    monthly[category] = monthly.get(category, 0) + total
+        return {
+            "wb_semanal": weekly.get(CATEGORY_WB, 0),
+            "pico_praca_semanal": weekly.get(CATEGORY_PRACA_PICO, 0),
+            "wb_mensal": monthly.get(CATEGORY_WB, 0),
+            "torre_mensal": monthly.get(CATEGORY_TORRE, 0),
+            "eventos_mensal": monthly.get(CATEGORY_EVENTOS, 0),
+        }
+
+    async def list_nicks(self, worksheet_names: list) -> dict:
+        nicks = {}
+        for worksheet_name in worksheet_names:
+            try:
+                await self._ensure_imported(worksheet_name)
+            except Exception as e:
+                logging.error(f"Erro ao carregar nicks da aba '{worksheet_name}': {e}")
+                continue
+            rows = await asyncio.to_thread(self._query, "SELECT DISTINCT nick FROM presences WHERE worksheet = ?", (worksheet_name,))
+            nicks[worksheet_name] = [nick for (nick,) in rows]
+        return nicks
+
+    async def period_rankings(self, worksheet_name: str, period: str, today: date) -> dict:
+        await self._ensure_imported(worksheet_name)
+        since = attendance_index.week_start(today) if period == "semana" else month_start(today)
+        return await asyncio.to_thread(self.top_players, worksheet_name, since, report_engine.TOP_N)
+
+    # --- RESUMOS NA PLANILHA ---
+    def top_players(self, worksheet_name: str, since: date, limit: int = SUMMARY_ROWS) -> dict:
+        """Rankings {categoria: [(nick, presenças)]} a partir de `since`, com uma única consulta agrupada."""
+        counts = {category: {} for category in CATEGORIES}
+        for nick, evento, total in self._query(
+            "SELECT nick, evento, COUNT(*) FROM presences WHERE worksheet = ? AND dia >= ? GROUP BY nick, evento",
+            (worksheet_name, since.isoformat())
+        ):
+            for category in event_categories(evento):
+                counts[category][nick] = counts[category].get(nick, 0) + total
+        return {
+            category: sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            for category, totals in counts.items()
+        }
+
+    def _summary_ranges(self, worksheet_name: str, today: date) -> list:
+        rankings = {
+            "semana": self.top_players(worksheet_name, attendance_index.week_start(today)),
+            "mes": self.top_players(worksheet_name, month_start(today)),
+        }
+        data = []
+        for section, (first_column, last_column) in sheets_client.SECTION_COLUMNS.items():
+            title, category, period = SUMMARY_SECTIONS[section]
+            ranking = rankings[period][category]
+            values = [[title, "NICK", "PRESENÇAS"]]
+            values += [[position, nick, total] for position, (nick, total) in enumerate(ranking, 1)]
+            # Completa com células vazias para apagar posições que saíram do ranking
+            values += [["", "", ""]] * (SUMMARY_ROWS + 1 - len(values))
+            data.append({"range": f"{first_column}1:{last_column}{SUMMARY_ROWS + 1}", "values": values})
+        return data
+
+    async def write_summaries(self):
+        """Reescreve as seções de resumo das abas que receberam presenças desde a última atualização."""
+        dirty, self._dirty = self._dirty, set()
+        today = datetime.now(TARGET_TZ).date()
+        for worksheet_name in dirty:
+            try:
+                data = await asyncio.to_thread(self._summary_ranges, worksheet_name, today)
+                await sheets_client.update_ranges(worksheet_name, data)
+            except Exception as e:
+                logging.error(f"Falha ao atualizar os resumos da aba '{worksheet_name}': {e}")
+                self._dirty.add(worksheet_name)
+
+    async def _summary_loop(self):
+        while True:
+            await asyncio.sleep(SUMMARY_INTERVAL)
+            await self.write_summaries()
+
+# --- BACKEND ATIVO ---
+_backend = None
+
+def configure(name: str) -> StorageBackend:
+    """Escolhe o armazenamento ("sheets" ou "sqlite"). Nomes desconhecidos usam a planilha."""
+    global _backend
+    if name == BACKEND_SQLITE:
+        _backend = SQLiteStorage()
+    else:
+        if name != BACKEND_SHEETS:
+            logging.error(f"Armazenamento '{name}' desconhecido. Usando '{BACKEND_SHEETS}'.")
+        _backend = SheetsStorage()
+    logging.info(f"Armazenamento de presenças: '{_backend.name}'.")
+    return _backend
+
+def get_backend() -> StorageBackend:
+    if _backend is None:
+        return configure(BACKEND_SHEETS)
+    return _backend
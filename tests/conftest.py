@@ -0,0 +1,49 @@
+# tests/conftest.py
+import asyncio
+import os
+import sys
+import pytest
+
+# Os testes de ponta a ponta usam as mesmas planilha e mensagens falsas dos benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+@pytest.fixture(scope="session", autouse=True)
+def workdir(tmp_path_factory):
+    """Journal, cache de presenças e checkpoints vão para o diretório atual: isola a sessão em uma pasta temporária."""
+    previous = os.getcwd()
+    path = tmp_path_factory.mktemp("workdir")
+    os.chdir(path)
+    yield path
+    os.chdir(previous)
+
+@pytest.fixture(scope="session")
+def spreadsheet():
+    """Planilha falsa sem latência nem cota, com uma aba por divisão do config.py."""
+    import fake_sheets
+    from config import CONFIG
+    sheet = fake_sheets.FakeSpreadsheet(fake_sheets.FaultProfile(latency=0, jitter=0, quota_per_minute=0))
+    for category_config in CONFIG.values():
+        sheet.add_worksheet(category_config["worksheet_name"])
+    fake_sheets.install(sheet)
+    return sheet
+
+@pytest.fixture(scope="session")
+def _main_module(workdir, spreadsheet):
+    import main
+    main.setup()
+    yield main
+    main.posted_today_cache.close()
+    main.channel_checkpoints.close()
+
+@pytest.fixture
+def bot_main(_main_module, monkeypatch):
+    """
+    O main.py já inicializado, usando a planilha falsa. Cada teste roda no seu próprio loop
+    (asyncio.run): os semáforos e travas criados em outro loop são trocados por novos.
+    """
+    import batch_writer
+    monkeypatch.setattr(_main_module, "catch_up_reads", asyncio.Semaphore(_main_module.CATCH_UP_CHANNEL_CONCURRENCY))
+    monkeypatch.setattr(_main_module, "catch_up_writes", asyncio.Semaphore(_main_module.CATCH_UP_JOB_CONCURRENCY))
+    monkeypatch.setattr(batch_writer, "_locks", {})
+    monkeypatch.setattr(batch_writer, "FLUSH_DELAY", 0.01)
+    return _main_module
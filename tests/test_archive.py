@@ -0,0 +1,23 @@
+# tests/test_archive.py
+from datetime import date
+from archive import _row_ranges, add_months, archive_cutoff
+
+def test_row_ranges_groups_contiguous_rows():
+    assert _row_ranges([2, 3, 4, 7, 8, 10]) == [(2, 4), (7, 8), (10, 10)]
+
+def test_row_ranges_sorts_its_input():
+    assert _row_ranges([9, 2, 8, 3]) == [(2, 3), (8, 9)]
+
+def test_row_ranges_empty_and_single():
+    assert _row_ranges([]) == []
+    assert _row_ranges([5]) == [(5, 5)]
+
+def test_archive_cutoff_keeps_the_month_of_the_current_week():
+    # Quarta, 21/10/2026: a semana começa em 18/10, então só meses anteriores a outubro saem
+    assert archive_cutoff(date(2026, 10, 21)) == date(2026, 10, 1)
+    # Sábado, 03/10/2026: a semana começou em 27/09, então setembro ainda fica na aba
+    assert archive_cutoff(date(2026, 10, 3)) == date(2026, 9, 1)
+
+def test_add_months_crosses_years():
+    assert add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
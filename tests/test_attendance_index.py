@@ -0,0 +1,86 @@
+# tests/test_attendance_index.py
+from datetime import date, datetime
+import pandas as pd
+import pytest
+import attendance_index
+from validators import CATEGORY_EVENTOS, CATEGORY_PRACA_PICO, CATEGORY_TORRE, CATEGORY_WB
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=["DIA", "EVENTO", "HORA", "NICK"])
+    df["DIA"] = pd.to_datetime(df["DIA"])
+    return df
+
+@pytest.fixture
+def worksheet():
+    name = "TESTE"
+    yield name
+    attendance_index._counts.pop(name, None)
+    attendance_index._display_nicks.pop(name, None)
+
+# 2026-10-18 é um domingo: a semana dos relatórios começa nele
+TODAY = datetime(2026, 10, 21, 12, 0)
+
+def test_week_start_is_sunday():
+    assert attendance_index.week_start(date(2026, 10, 21)) == date(2026, 10, 18)
+    assert attendance_index.week_start(date(2026, 10, 18)) == date(2026, 10, 18)
+    assert attendance_index.week_start(date(2026, 10, 17)) == date(2026, 10, 11)
+
+def test_counters_by_week_and_month(worksheet):
+    attendance_index._on_frame_rows(worksheet, frame([
+        ("2026-10-20", "WB 10:00 + Pico", "10:00:00", "Ana"),
+        ("2026-10-21", "WB 20:00", "20:00:00", "ana"),
+        ("2026-10-17", "WB 20:00", "20:00:00", "Ana"),      # semana anterior, mesmo mês
+        ("2026-09-30", "Torre 11:00", "11:00:00", "Ana"),   # mês anterior
+        ("2026-10-05", "Krukan", "22:00:00", "Bia"),
+    ]), reset=True)
+
+    summary = attendance_index.player_summary(worksheet, "ANA", TODAY)
+    assert summary == {
+        "wb_semanal": 2,
+        "pico_praca_semanal": 1,
+        "wb_mensal": 3,
+        "torre_mensal": 0,
+        "eventos_mensal": 0,
+    }
+    assert attendance_index.get_count(worksheet, "Bia", CATEGORY_EVENTOS, attendance_index.month_key(TODAY.date())) == 1
+    assert attendance_index.get_count(worksheet, "Ana", CATEGORY_TORRE, ("M", 2026, 9)) == 1
+    assert attendance_index.player_summary(worksheet, "Cid", TODAY) is None
+
+def test_incremental_rows_add_and_reset_rebuilds(worksheet):
+    week = attendance_index.week_key(TODAY.date())
+    attendance_index._on_frame_rows(worksheet, frame([("2026-10-20", "WB 20:00", "20:00:00", "Ana")]), reset=True)
+    attendance_index._on_frame_rows(worksheet, frame([("2026-10-21", "WB 20:00", "20:00:00", "Ana")]), reset=False)
+    assert attendance_index.get_count(worksheet, "Ana", CATEGORY_WB, week) == 2
+
+    attendance_index._on_frame_rows(worksheet, frame([("2026-10-21", "Pico", "08:00:00", "Bia")]), reset=True)
+    assert attendance_index.get_count(worksheet, "Ana", CATEGORY_WB, week) == 0
+    assert not attendance_index.has_player(worksheet, "Ana")
+    assert attendance_index.get_count(worksheet, "Bia", CATEGORY_PRACA_PICO, week) == 1
+
+def test_top_players_uses_the_latest_display_nick(worksheet):
+    attendance_index._on_frame_rows(worksheet, frame([
+        ("2026-10-19", "WB 20:00", "20:00:00", "ana"),
+        ("2026-10-20", "WB 20:00", "20:00:00", "Ana"),
+        ("2026-10-20", "WB 22:00 + Pico", "22:00:00", "Bia"),
+        ("2026-10-20", "WB 10:00 + Pico", "10:00:00", ""),
+    ]), reset=True)
+    rankings = attendance_index.top_players(worksheet, attendance_index.week_key(TODAY.date()), limit=10)
+    assert rankings[CATEGORY_WB] == [("Ana", 2), ("Bia", 1)]
+    assert rankings[CATEGORY_PRACA_PICO] == [("Bia", 1)]
+    assert rankings[CATEGORY_TORRE] == []
+
+def test_rows_top_players_matches_the_index_without_keeping_counters(worksheet):
+    rows = [
+        ["", "20/10/2026", "WB 20:00", "20:00:00", "ana"],
+        ["", "21/10/2026", "WB 22:00 + Pico", "22:00:00", "Ana"],
+        ["", "17/10/2026", "WB 20:00", "20:00:00", "Bia"],    # semana anterior
+        ["", "21/10/2026", "Torre 11:00", "11:00:00", "Cid"],
+        ["", "data inválida", "WB 20:00", "20:00:00", "Duda"],
+    ]
+    week = attendance_index.week_key(TODAY.date())
+    rankings = attendance_index.rows_top_players(rows, week, limit=10)
+    assert rankings[CATEGORY_WB] == [("Ana", 2)]
+    assert rankings[CATEGORY_PRACA_PICO] == [("Ana", 1)]
+    assert rankings[CATEGORY_TORRE] == [("Cid", 1)]
+    assert attendance_index.rows_top_players(rows, attendance_index.month_key(TODAY.date()), limit=10)[CATEGORY_WB] == [("Ana", 2), ("Bia", 1)]
+    assert worksheet not in attendance_index._counts
@@ -0,0 +1,85 @@
+# tests/test_batch_writer.py
+import asyncio
+import pytest
+import batch_writer
+from fake_sheets import _api_error
+
+ROW = ["21/10/2026", "WB 20:00", "20:00:00", "Ana"]
+
+@pytest.fixture
+def writer(monkeypatch):
+    """batch_writer com buffers e travas novos para o loop do teste e sem esperas de backoff."""
+    for name, value in (("_buffers", {}), ("_timers", {}), ("_locks", {}), ("_flush_tasks", set()), ("_commit_listeners", [])):
+        monkeypatch.setattr(batch_writer, name, value)
+    monkeypatch.setattr(batch_writer, "BASE_BACKOFF", 0.001)
+    return batch_writer
+
+def fake_append(monkeypatch, *errors):
+    """append_rows falso: levanta os erros na ordem dada e depois grava, anotando cada chamada."""
+    calls = []
+    pending = list(errors)
+
+    async def append_rows(worksheet_name, rows):
+        calls.append(len(rows))
+        if pending:
+            raise pending.pop(0)
+        return {"updates": {"updatedRange": f"'{worksheet_name}'!B10:E{9 + len(rows)}"}}
+
+    monkeypatch.setattr(batch_writer.sheets_client, "append_rows", append_rows)
+    return calls
+
+def test_a_full_buffer_is_written_at_once_and_reported_to_listeners(writer, monkeypatch):
+    monkeypatch.setattr(writer, "BATCH_SIZE", 3)
+    monkeypatch.setattr(writer, "FLUSH_DELAY", 60)
+    calls = fake_append(monkeypatch)
+    committed = []
+    writer.add_commit_listener(lambda *args: committed.append(args))
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(writer.append("ABA", ROW) for _ in range(3))), timeout=5)
+
+    assert asyncio.run(scenario()) == [True] * 3
+    assert calls == [3]
+    assert committed == [("ABA", [ROW] * 3, 10, "B")]
+
+def test_a_partial_buffer_waits_for_the_flush_delay(writer, monkeypatch):
+    monkeypatch.setattr(writer, "FLUSH_DELAY", 0.05)
+    calls = fake_append(monkeypatch)
+
+    async def scenario():
+        futures = [writer.enqueue("ABA", ROW) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        written_early = list(calls)
+        return written_early, await asyncio.gather(*futures), writer.backlog_count()
+
+    assert asyncio.run(scenario()) == ([], [True, True], 0)
+    assert calls == [2]
+
+def test_retryable_errors_are_retried_with_backoff(writer, monkeypatch):
+    monkeypatch.setattr(writer, "FLUSH_DELAY", 0.01)
+    calls = fake_append(monkeypatch, _api_error(429, "cota"), _api_error(503, "fora do ar"))
+    assert asyncio.run(writer.append("ABA", ROW)) is True
+    assert calls == [1, 1, 1]
+
+def test_other_errors_and_exhausted_retries_fail_the_batch(writer, monkeypatch):
+    monkeypatch.setattr(writer, "FLUSH_DELAY", 0.01)
+    monkeypatch.setattr(writer, "MAX_RETRIES", 2)
+    calls = fake_append(monkeypatch, _api_error(400, "valor inválido"))
+    assert asyncio.run(writer.append("ABA", ROW)) is False
+    assert calls == [1]
+
+    calls = fake_append(monkeypatch, *(_api_error(503, "fora do ar") for _ in range(3)))
+    assert asyncio.run(writer.append("ABA", ROW)) is False
+    assert calls == [1, 1, 1]
+
+def test_drain_writes_what_is_still_buffered(writer, monkeypatch):
+    monkeypatch.setattr(writer, "FLUSH_DELAY", 60)
+    calls = fake_append(monkeypatch)
+
+    async def scenario():
+        futures = [writer.enqueue(name, ROW) for name in ("ABA 1", "ABA 2")]
+        await asyncio.wait_for(writer.drain(), timeout=5)
+        return [future.result() for future in futures], writer.pending_count()
+
+    assert asyncio.run(scenario()) == ([True, True], 0)
+    assert calls == [1, 1]
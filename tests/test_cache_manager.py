@@ -0,0 +1,65 @@
+# tests/test_cache_manager.py
+import asyncio
+import json
+from datetime import date
+import cache_manager
+from cache_manager import ChannelCheckpoints, PresenceCache
+
+DAY = date(2026, 10, 19)
+
+def key(day: date, user_id: int = 1) -> tuple:
+    return (day, user_id, "WB 20:00", 100)
+
+def test_keys_are_committed_together_and_survive_a_restart(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    cache = PresenceCache(path)
+    commits = []
+    insert = cache._insert
+    monkeypatch.setattr(cache, "_insert", lambda keys: (commits.append(len(keys)), insert(keys)))
+
+    async def scenario():
+        return await asyncio.gather(*(cache.add(key(DAY, user_id)) for user_id in range(3)))
+
+    assert asyncio.run(scenario()) == [True] * 3
+    assert commits == [3] and key(DAY, 2) in cache
+    cache.close()
+    assert len(PresenceCache(path)) == 3
+
+def test_a_key_that_fails_to_persist_stays_out_of_memory(tmp_path):
+    cache = PresenceCache(str(tmp_path / "cache.db"))
+    cache.close()
+    assert asyncio.run(cache.add(key(DAY))) is False
+    assert key(DAY) not in cache and len(cache) == 0
+
+def test_evict_before_drops_old_partitions_from_memory_and_disk(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PresenceCache(path)
+
+    async def scenario():
+        for day in (date(2026, 10, 17), date(2026, 10, 18), DAY):
+            await cache.add(key(day))
+        return await cache.evict_before(date(2026, 10, 18))
+
+    assert asyncio.run(scenario()) == 1
+    assert key(date(2026, 10, 17)) not in cache and key(date(2026, 10, 18)) in cache
+    cache.close()
+    assert len(PresenceCache(path)) == 2
+
+def test_legacy_json_is_imported_as_today(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(cache_manager.LEGACY_CACHE_FILE, "w") as f:
+        json.dump([[1, "WB 20:00", 100], [2, "Torre 11:00", 100]], f)
+    cache = cache_manager.load_cache(DAY)
+    assert key(DAY, 1) in cache and (DAY, 2, "Torre 11:00", 100) in cache
+    assert (tmp_path / (cache_manager.LEGACY_CACHE_FILE + ".migrated")).exists()
+    cache.close()
+
+def test_checkpoints_only_move_forward_and_are_flushed(tmp_path):
+    path = str(tmp_path / "cache.db")
+    checkpoints = ChannelCheckpoints(path)
+    checkpoints.advance(100, 50)
+    checkpoints.advance(100, 40)
+    assert checkpoints.get(100) == 50
+    assert checkpoints.flush() == 1 and checkpoints.flush() == 0
+    checkpoints.close()
+    assert ChannelCheckpoints(path).get(100) == 50
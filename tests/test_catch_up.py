@@ -0,0 +1,58 @@
+# tests/test_catch_up.py
+import asyncio
+import datetime
+import batch_writer
+import journal
+import message_cache
+from config import CONFIG
+from fake_discord import FakeAttachment, FakeMessage, FakeUser, build_guild, wb_window_start
+
+def history(channel, count: int) -> list:
+    """Posts válidos (um jogador diferente por post) feitos com o bot "fora do ar"."""
+    poster = FakeUser(channel.id + 1, "Lider")
+    # Ontem: a rodada completa lê o histórico até o instante atual
+    start = wb_window_start(datetime.date.today() - datetime.timedelta(days=1))
+    messages = [
+        FakeMessage(channel, poster, start + datetime.timedelta(seconds=index), [FakeUser(channel.id + 10 + index, f"Jogador{index}")], [FakeAttachment()])
+        for index in range(count)
+    ]
+    channel.messages.extend(messages)
+    return messages
+
+def test_channel_is_not_caught_up_until_its_history_is_exhausted(bot_main, monkeypatch):
+    monkeypatch.setattr(bot_main, "CATCH_UP_MAX_MESSAGES", 3)
+
+    async def scenario():
+        guild = build_guild(CONFIG, "wb")
+        bot_main.map_guild(guild)
+        bot_main.pipelines.start()
+        channel = guild.text_channels[0]
+        messages = history(channel, 7)
+        bot_main.channel_checkpoints.advance(channel.id, messages[0].id - 1)
+        until = messages[-1].created_at + datetime.timedelta(seconds=1)
+
+        outcomes, done = await bot_main.catch_up_channel(channel, bot_main.channel_config_map[channel.id], until)
+        first_pass = (dict(outcomes), done, bot_main.channel_checkpoints.get(channel.id))
+
+        # Post ao vivo antes da recuperação terminar: o checkpoint não pode saltar o histórico pendente
+        live = FakeMessage(channel, messages[0].author, until, [FakeUser(channel.id + 99, "Ao vivo")], [FakeAttachment()])
+        await bot_main.message_listener(live)
+        after_live = bot_main.channel_checkpoints.get(channel.id)
+
+        monkeypatch.setattr(bot_main.bot, "get_channel", guild.get_channel)
+        bot_main.caught_up_channels.difference_update(channel.id for channel in guild.text_channels)
+        for other in guild.text_channels[1:]:
+            bot_main.caught_up_channels.add(other.id)
+        await bot_main.catch_up_missed_posts()
+
+        await bot_main.pipelines.remove(guild.id)
+        await batch_writer.drain()
+        await journal.flush()
+        return messages, first_pass, after_live, channel
+
+    messages, first_pass, after_live, channel = asyncio.run(scenario())
+    assert first_pass == ({message_cache.OUTCOME_ACCEPTED: 3}, False, messages[2].id)
+    assert after_live == messages[2].id
+    assert channel.id in bot_main.caught_up_channels
+    assert all(bot_main.processed_messages.get(message.id)[0] == message_cache.OUTCOME_ACCEPTED for message in messages)
+    assert bot_main.channel_checkpoints.get(channel.id) == messages[-1].id
@@ -0,0 +1,72 @@
+# tests/test_channel_map.py
+from datetime import time
+from channel_map import ChannelMap
+from config import CONFIG
+from fake_discord import FakeCategory, FakeChannel, build_guild
+
+WORKSHEET = next(iter(CONFIG.values()))["worksheet_name"]
+
+def test_each_guild_maps_its_channels_to_the_shared_tabs():
+    channels = ChannelMap(CONFIG)
+    first, second = build_guild(CONFIG, "wb"), build_guild(CONFIG, "wb")
+    assert channels.build_guild(first) == len(CONFIG)
+    assert channels.build_guild(second) == len(CONFIG)
+    assert {entry["guild_id"] for entry in channels.guild_channels(first.id)} == {first.id}
+    # As divisões são as mesmas abas em qualquer servidor
+    assert channels[first.text_channels[0].id]["worksheet_name"] == channels[second.text_channels[0].id]["worksheet_name"] == WORKSHEET
+
+    channels.remove_guild(first.id)
+    assert not channels.has_guild(first.id) and len(channels) == len(CONFIG)
+
+def test_unknown_channels_and_categories_are_not_monitored():
+    channels = ChannelMap(CONFIG)
+    guild = build_guild(CONFIG, "wb")
+    guild.text_channels.append(FakeChannel(1, "geral", guild, guild.text_channels[0].category))
+    guild.text_channels.append(FakeChannel(2, "wb", guild, FakeCategory(guild, "OUTRO JOGO")))
+    guild.text_channels.append(FakeChannel(3, "wb", guild, None))
+    assert channels.build_guild(guild) == len(CONFIG)
+    assert 1 not in channels and 2 not in channels and 3 not in channels
+
+def test_renamed_and_moved_channels_follow_the_config():
+    channels = ChannelMap(CONFIG)
+    guild = build_guild(CONFIG, "wb")
+    channels.build_guild(guild)
+    channel = guild.text_channels[0]
+
+    channel.name = "conversa"
+    channels.update_channel(channel)
+    assert channel.id not in channels and len(channels.guild_channels(guild.id)) == len(CONFIG) - 1
+
+    channel.name = "torre"
+    channels.update_channel(channel)
+    assert channels[channel.id]["events"] == CONFIG[channel.category.name]["channels"]["torre"]
+
+    channel.category = guild.text_channels[1].category
+    channels.update_channel(channel)
+    assert channels[channel.id]["worksheet_name"] == guild.text_channels[1].category.name
+
+def test_deleted_category_stops_its_channels():
+    channels = ChannelMap(CONFIG)
+    guild = build_guild(CONFIG, "wb")
+    channels.build_guild(guild)
+    channel = guild.text_channels[0]
+    category, channel.category = channel.category, None
+    channels.remove_category(category)
+    assert channel.id not in channels and len(channels) == len(CONFIG) - 1
+
+def test_apply_config_swaps_schedules_and_drops_removed_channels():
+    channels = ChannelMap(CONFIG)
+    guild = build_guild(CONFIG, "wb")
+    channels.build_guild(guild)
+    first, second = guild.text_channels[:2]
+    previous = channels[first.id]
+
+    config = {name: {**category, "channels": dict(category["channels"])} for name, category in CONFIG.items()}
+    config[first.category.name]["channels"]["wb"] = [{"name": "WB 20:00", "days": [0], "slots": [(time(19, 55), time(20, 35))]}]
+    del config[second.category.name]["channels"]["wb"]
+    channels.apply_config(config)
+
+    assert channels[first.id]["events"][0]["name"] == "WB 20:00" and channels[first.id]["guild_id"] == guild.id
+    assert previous["events"] is CONFIG[first.category.name]["channels"]["wb"]
+    assert second.id not in channels and second.id not in channels.channel_ids()
+    assert len(channels.guild_channels(guild.id)) == len(CONFIG) - 1
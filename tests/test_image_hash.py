@@ -0,0 +1,54 @@
+# tests/test_image_hash.py
+import os
+import subprocess
+import sys
+from datetime import date
+import image_hash
+from image_hash import HashIndex, ReuseChecker
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAY = date(2026, 10, 19)
+
+def test_find_returns_the_closest_hash_of_the_same_day():
+    index = HashIndex()
+    index.add(DAY, 0b1111, {"nick": "Ana"})
+    index.add(DAY, 0b0111, {"nick": "Bia"})
+    assert index.find(DAY, 0b0110) == (1, {"nick": "Bia"})
+    assert index.find(DAY, 0b0110, max_distance=0) is None
+    assert index.find(date(2026, 10, 20), 0b0111) is None
+
+def test_days_are_capped_and_evicted():
+    index = HashIndex(max_per_day=2)
+    for value in (1, 2, 3):
+        index.add(DAY, value, {})
+    index.add(date(2026, 10, 20), 4, {})
+    assert len(index) == 3
+    assert index.find(DAY, 1, max_distance=0) is None
+    assert index.evict_before(date(2026, 10, 20)) == 2
+    assert len(index) == 1
+
+def test_disabled_checker_schedules_nothing():
+    checker = ReuseChecker(enabled=False)
+    checker.submit(DAY, object(), {"nick": "Ana"}, on_match=None)
+    assert checker.pending == 0 and checker.skipped == 0
+    assert checker.stats()["ativo"] == 0
+
+def test_set_enabled_switches_the_stage(monkeypatch):
+    started = []
+    monkeypatch.setattr(image_hash, "start", lambda: started.append(True))
+    checker = ReuseChecker(enabled=False)
+    checker.set_enabled(True)
+    assert checker.enabled and started == [True]
+    checker.set_enabled(False)
+    assert not checker.enabled and started == [True]
+
+def test_spawned_workers_do_not_run_the_bot_setup(tmp_path):
+    # Os processos "spawn" do pool executam o main.py como __mp_main__: nada de caches, pools ou arquivos
+    script = (
+        "import runpy, sys\n"
+        f"sys.path.insert(0, {REPO_ROOT!r})\n"
+        f"namespace = runpy.run_path({os.path.join(REPO_ROOT, 'main.py')!r}, run_name='__mp_main__')\n"
+        "assert namespace['posted_today_cache'] is None and namespace['backend'] is None\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, check=True, timeout=120)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,59 @@
+# tests/test_journal.py
+import asyncio
+import pytest
+import batch_writer
+import journal
+
+ROW = ["21/10/2026", "WB 20:00", "20:00:00", "Ana"]
+
+@pytest.fixture
+def fresh_journal(tmp_path, monkeypatch):
+    """Journal em um arquivo próprio; o do restante da sessão é reaberto depois."""
+    journal.close()
+    monkeypatch.setattr(journal, "JOURNAL_FILE", str(tmp_path / "journal.db"))
+    monkeypatch.setattr(journal, "_in_flight", set())
+    yield journal
+    journal.close()
+
+def test_appends_are_grouped_and_counted_without_queries(fresh_journal, monkeypatch):
+    commits = []
+    insert = journal._insert
+    monkeypatch.setattr(journal, "_insert", lambda entries: (commits.append(len(entries)), insert(entries))[1])
+
+    async def scenario():
+        ids = await asyncio.gather(*(journal.append("ABA", ROW) for _ in range(3)))
+        return ids, journal.pending_count(), await journal.pending()
+
+    ids, count, entries = asyncio.run(scenario())
+    assert commits == [3] and count == 3
+    assert entries == [(entry_id, "ABA", ROW) for entry_id in ids]
+
+    journal.mark_synced(ids[:2])
+    journal.mark_synced(ids[:2])    # Marcar de novo não desconta duas vezes
+    assert journal.pending_count() == 1
+    assert [entry_id for entry_id, _, _ in asyncio.run(journal.pending())] == ids[2:]
+
+def test_pending_count_is_restored_when_the_journal_is_reopened(fresh_journal):
+    asyncio.run(journal.append("ABA", ROW))
+    journal.close()
+    assert journal.pending_count() == 0
+    assert len(asyncio.run(journal.pending())) == 1 and journal.pending_count() == 1
+
+def test_replay_sends_pending_entries_once_and_marks_them_synced(fresh_journal, spreadsheet, monkeypatch):
+    name = "JOURNAL REPLAY"
+    spreadsheet.add_worksheet(name)
+    monkeypatch.setattr(batch_writer, "_locks", {})
+    monkeypatch.setattr(batch_writer, "FLUSH_DELAY", 0.01)
+
+    async def scenario():
+        for _ in range(2):
+            await journal.append(name, ROW)
+        # O segundo reenvio não repete as entradas que ainda estão a caminho da planilha
+        sent = [await journal.replay_pending(), await journal.replay_pending()]
+        await batch_writer.drain()
+        await journal.flush()
+        return sent
+
+    assert asyncio.run(scenario()) == [2, 0]
+    assert spreadsheet.rows_written(name) == 2
+    assert journal.pending_count() == 0 and not journal._in_flight
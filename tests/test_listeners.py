@@ -0,0 +1,91 @@
+# tests/test_listeners.py
+import asyncio
+import copy
+import datetime
+import batch_writer
+import journal
+import message_cache
+import notifier
+from config import CONFIG
+from fake_discord import FakeAttachment, FakeMessage, FakeUser, build_guild, wb_window_start
+
+def post(channel, mentions=True, image=True, seconds=60):
+    poster = FakeUser(channel.id + 1, "Lider")
+    player = FakeUser(channel.id + 2, "Jogador")
+    created_at = wb_window_start(datetime.date.today()) + datetime.timedelta(seconds=seconds)
+    return FakeMessage(channel, poster, created_at, [player] if mentions else [], [FakeAttachment()] if image else [])
+
+async def start_guild(main):
+    guild = build_guild(CONFIG, "wb")
+    main.map_guild(guild)
+    main.pipelines.start()
+    return guild
+
+async def stop_guild(main, guild):
+    await main.pipelines.remove(guild.id)
+    await batch_writer.drain()
+    await journal.flush()
+
+def test_edit_during_processing_waits_for_the_post(bot_main, monkeypatch, caplog):
+    async def scenario():
+        # Gravação lenta (Sheets/journal): a presença fica no pipeline até `release`
+        release = asyncio.Event()
+        record = bot_main.backend.record
+
+        async def slow_record(*args):
+            await release.wait()
+            return await record(*args)
+
+        monkeypatch.setattr(bot_main.backend, "record", slow_record)
+        guild = await start_guild(bot_main)
+        message = post(guild.text_channels[0])
+        pipeline = bot_main.pipelines.get(guild.id)
+        listener = asyncio.create_task(bot_main.message_listener(message))
+        for _ in range(100):
+            if pipeline.stats()["em_andamento"]:
+                break
+            await asyncio.sleep(0)
+        assert pipeline.stats()["em_andamento"] == 1
+        # Preview de link chegando enquanto a presença ainda está no pipeline
+        edit = asyncio.create_task(bot_main.edit_listener(message, copy.copy(message)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(listener, edit)
+        await stop_guild(bot_main, guild)
+        return message
+
+    message = asyncio.run(scenario())
+    assert bot_main.processed_messages.get(message.id)[0] == message_cache.OUTCOME_ACCEPTED
+    assert message.reactions == ["✅"]
+    assert message.author.id not in notifier._pending
+    assert "Duplicado" not in caplog.text
+
+def test_edit_adding_the_image_registers_a_rejected_post(bot_main):
+    async def scenario():
+        guild = await start_guild(bot_main)
+        message = post(guild.text_channels[1], image=False)
+        await bot_main.message_listener(message)
+        rejected = bot_main.processed_messages.get(message.id)[0]
+        edited = copy.copy(message)
+        edited.attachments = [FakeAttachment()]
+        await bot_main.edit_listener(message, edited)
+        await stop_guild(bot_main, guild)
+        return rejected, message, edited
+
+    rejected, message, edited = asyncio.run(scenario())
+    assert rejected == message_cache.OUTCOME_NO_IMAGE
+    assert bot_main.processed_messages.get(message.id)[0] == message_cache.OUTCOME_ACCEPTED
+    assert edited.reactions == ["✅"]
+
+def test_repost_of_a_registered_presence_is_a_duplicate(bot_main):
+    async def scenario():
+        guild = await start_guild(bot_main)
+        first = post(guild.text_channels[2])
+        second = FakeMessage(first.channel, first.author, first.created_at, first.mentions, [FakeAttachment()])
+        await asyncio.gather(bot_main.message_listener(first), bot_main.message_listener(second))
+        await stop_guild(bot_main, guild)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    outcomes = sorted(bot_main.processed_messages.get(message.id)[0] for message in (first, second))
+    assert outcomes == sorted([message_cache.OUTCOME_ACCEPTED, message_cache.OUTCOME_DUPLICATE])
@@ -0,0 +1,83 @@
+# tests/test_message_cache.py
+import asyncio
+from types import SimpleNamespace
+import message_cache
+from message_cache import (
+    OUTCOME_ACCEPTED, OUTCOME_DUPLICATE, OUTCOME_IGNORED, OUTCOME_NO_IMAGE, MessageOutcomeCache, fingerprint
+)
+
+def message(message_id, attachments=(), mentions=()):
+    return SimpleNamespace(
+        id=message_id,
+        attachments=[SimpleNamespace(id=attachment_id) for attachment_id in attachments],
+        mentions=[SimpleNamespace(id=user_id) for user_id in mentions],
+    )
+
+def test_unknown_message_is_processed():
+    assert MessageOutcomeCache().should_reprocess(message(1))
+
+def test_accepted_and_ignored_messages_are_never_reprocessed():
+    cache = MessageOutcomeCache()
+    for message_id, outcome in ((1, OUTCOME_ACCEPTED), (2, OUTCOME_IGNORED)):
+        original = message(message_id, attachments=[10], mentions=[20])
+        cache.record(message_id, outcome, fingerprint(original))
+        assert not cache.should_reprocess(message(message_id, attachments=[11], mentions=[21]))
+    assert cache.skipped == 2
+
+def test_rejected_message_is_reprocessed_only_when_attachments_or_mentions_change():
+    cache = MessageOutcomeCache()
+    cache.record(1, OUTCOME_NO_IMAGE, fingerprint(message(1, mentions=[20])))
+    # Edição só do texto: mesmo fingerprint
+    assert not cache.should_reprocess(message(1, mentions=[20]))
+    assert cache.should_reprocess(message(1, attachments=[10], mentions=[20]))
+
+    cache.record(2, OUTCOME_DUPLICATE, fingerprint(message(2, attachments=[10], mentions=[20])))
+    assert cache.should_reprocess(message(2, attachments=[10], mentions=[21]))
+
+def test_expired_entries_are_reprocessed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(message_cache.time, "monotonic", lambda: now[0])
+    cache = MessageOutcomeCache(ttl=60)
+    cache.record(1, OUTCOME_ACCEPTED, fingerprint(message(1)))
+    now[0] += 61
+    assert cache.should_reprocess(message(1))
+    assert len(cache) == 0
+
+def test_least_recently_used_entries_are_evicted():
+    cache = MessageOutcomeCache(max_size=2)
+    cache.record(1, OUTCOME_ACCEPTED, ())
+    cache.record(2, OUTCOME_ACCEPTED, ())
+    cache.get(1)
+    cache.record(3, OUTCOME_ACCEPTED, ())
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+def test_accepted_is_never_downgraded():
+    cache = MessageOutcomeCache()
+    cache.record(1, OUTCOME_ACCEPTED, fingerprint(message(1, attachments=[10], mentions=[20])))
+    cache.record(1, OUTCOME_DUPLICATE, fingerprint(message(1, attachments=[11], mentions=[20])))
+    assert cache.get(1) == (OUTCOME_ACCEPTED, ((10,), (20,)))
+    assert not cache.should_reprocess(message(1, attachments=[12], mentions=[21]))
+
+def test_messages_in_processing_are_awaited():
+    async def scenario():
+        cache = MessageOutcomeCache()
+        assert cache.begin(1)
+        assert not cache.begin(1)
+        waiter = asyncio.create_task(cache.wait_processing(1))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        cache.finish(1, OUTCOME_ACCEPTED, ())
+        assert await waiter
+        assert not cache.is_processing(1)
+        assert not await cache.wait_processing(1)
+        assert cache.get(1) == (OUTCOME_ACCEPTED, ())
+
+    asyncio.run(scenario())
+
+def test_failed_processing_releases_the_message_without_a_result():
+    cache = MessageOutcomeCache()
+    cache.begin(1)
+    cache.finish(1, None)
+    assert not cache.is_processing(1)
+    assert cache.should_reprocess(message(1))
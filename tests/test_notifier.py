@@ -0,0 +1,68 @@
+# tests/test_notifier.py
+import asyncio
+import types
+import discord
+import pytest
+import notifier
+from fake_discord import FakeUser
+
+@pytest.fixture
+def dms(monkeypatch):
+    """Estado do notifier zerado e janelas curtas, para os testes não esperarem minutos."""
+    for name, value in (("_pending", {}), ("_recent", {}), ("_last_sent", {}), ("_closed_dms", {}),
+                        ("_next_slot", 0.0), ("_wakeup", None), ("_worker_task", None)):
+        monkeypatch.setattr(notifier, name, value)
+    monkeypatch.setattr(notifier, "COALESCE_WINDOW", 0.05)
+    monkeypatch.setattr(notifier, "USER_MIN_INTERVAL", 0.3)
+    monkeypatch.setattr(notifier, "GLOBAL_RATE", 1000)
+    return notifier
+
+def test_reasons_of_the_same_user_go_in_one_dm_and_repeats_are_dropped(dms):
+    ana, bia = FakeUser(1, "Ana"), FakeUser(2, "Bia")
+
+    async def scenario():
+        dms.notify_rejection(ana, "wb", "Sem imagem.")
+        dms.notify_rejection(ana, "wb", "Sem imagem.")
+        dms.notify_rejection(ana, "torre", "Sem menção.")
+        dms.notify_rejection(bia, "wb", "Duplicado.")
+        assert ana.dms == [] and dms.pending_count() == 2
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    assert ana.dms == ["Olá! Algumas postagens suas não puderam ser registradas:\n• #wb: Sem imagem.\n• #torre: Sem menção."]
+    assert bia.dms == ["Olá! Sua postagem no canal #wb não pôde ser registrada. Motivo: Duplicado."]
+    assert dms.pending_count() == 0
+
+def test_a_user_waits_the_minimum_interval_between_dms(dms):
+    ana = FakeUser(1, "Ana")
+
+    async def scenario():
+        dms.notify_rejection(ana, "wb", "Sem imagem.")
+        await asyncio.sleep(0.15)
+        dms.notify_rejection(ana, "wb", "Sem menção.")
+        await asyncio.sleep(0.1)
+        early = len(ana.dms)
+        await asyncio.sleep(0.3)
+        return early
+
+    assert asyncio.run(scenario()) == 1
+    assert len(ana.dms) == 2
+
+def test_closed_dms_are_not_retried(dms):
+    calls = []
+
+    class ClosedUser(FakeUser):
+        async def send(self, content: str = None, **kwargs):
+            calls.append(content)
+            raise discord.Forbidden(types.SimpleNamespace(status=403, reason="Forbidden"), "Cannot send messages to this user")
+
+    user = ClosedUser(1, "Ana")
+
+    async def scenario():
+        dms.notify_rejection(user, "wb", "Sem imagem.")
+        await asyncio.sleep(0.15)
+        dms.notify_rejection(user, "wb", "Sem menção.")
+        await asyncio.sleep(0.15)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1 and user.id in dms._closed_dms and dms.pending_count() == 0
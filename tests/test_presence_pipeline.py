@@ -0,0 +1,121 @@
+# tests/test_presence_pipeline.py
+import asyncio
+import pytest
+from presence_pipeline import GuildPipelines, PresencePipeline
+
+def test_a_key_has_at_most_one_job_and_can_be_awaited():
+    async def scenario():
+        pipeline = PresencePipeline(worker_count=2)
+        pipeline.start()
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+            return "registrado"
+
+        first = asyncio.create_task(pipeline.submit("chave", job))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await pipeline.submit("chave", job)
+        waiter = asyncio.create_task(pipeline.wait_in_flight("chave"))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        release.set()
+        assert await first == "registrado"
+        assert await waiter is True
+        assert await pipeline.wait_in_flight("chave") is False
+        await pipeline.stop()
+        return pipeline.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["processados"] == 1 and stats["em_andamento"] == 0
+
+def test_full_queue_makes_submitters_wait():
+    async def scenario():
+        pipeline = PresencePipeline(worker_count=1, max_queue_size=1)
+        pipeline.start()
+        release = asyncio.Event()
+        order = []
+
+        async def job(name):
+            await release.wait()
+            order.append(name)
+            return name
+
+        # Um job no worker, um na fila e o terceiro aguardando espaço (backpressure)
+        tasks = []
+        for name in ("a", "b", "c"):
+            tasks.append(asyncio.create_task(pipeline.submit(name, lambda name=name: job(name))))
+            for _ in range(3):
+                await asyncio.sleep(0)
+        assert pipeline.backpressure_waits == 1
+        assert not any(task.done() for task in tasks)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        await pipeline.stop()
+        return results, order, pipeline.stats()
+
+    results, order, stats = asyncio.run(scenario())
+    assert results == ["a", "b", "c"] and order == ["a", "b", "c"]
+    assert stats["max_fila"] == 1
+
+def test_job_errors_reach_the_submitter_and_free_the_key():
+    async def scenario():
+        pipeline = PresencePipeline(worker_count=1)
+        pipeline.start()
+
+        async def failing():
+            raise ValueError("planilha fora do ar")
+
+        with pytest.raises(ValueError):
+            await pipeline.submit("chave", failing)
+        assert await pipeline.wait_in_flight("chave") is False
+        await pipeline.stop()
+        return pipeline.stats()
+
+    assert asyncio.run(scenario())["falhas"] == 1
+
+def test_stop_runs_jobs_queued_before_the_workers_started():
+    async def scenario():
+        pipelines = GuildPipelines(worker_count=2)
+        pipeline = pipelines.get(1)
+
+        async def job():
+            return "registrado"
+
+        # Pipelines ainda não iniciados (armazenamento importando): os jobs só aguardam na fila
+        submitted = [asyncio.create_task(pipeline.submit(key, job)) for key in range(3)]
+        await asyncio.sleep(0)
+        assert pipeline.queue_depth() == 3
+        await asyncio.wait_for(pipelines.stop(), timeout=5)
+        results = await asyncio.wait_for(asyncio.gather(*submitted), timeout=5)
+        with pytest.raises(RuntimeError):
+            await pipeline.submit("depois", job)
+        return results
+
+    assert asyncio.run(scenario()) == ["registrado"] * 3
+
+def test_guild_pipelines_are_independent():
+    async def scenario():
+        pipelines = GuildPipelines(worker_count=1, max_queue_size=1)
+        pipelines.start()
+        blocked = asyncio.Event()
+
+        async def slow():
+            await blocked.wait()
+
+        async def fast():
+            return "ok"
+
+        stuck = [asyncio.create_task(pipelines.get(1).submit(key, slow)) for key in range(3)]
+        await asyncio.sleep(0)
+        # O servidor 1 está com a fila cheia; o servidor 2 continua andando
+        assert await asyncio.wait_for(pipelines.get(2).submit("x", fast), timeout=1) == "ok"
+        stats = pipelines.stats()
+        blocked.set()
+        await asyncio.gather(*stuck)
+        await pipelines.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["servidores"] == 2 and stats["maior_fila"] == 1
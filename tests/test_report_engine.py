@@ -0,0 +1,40 @@
+# tests/test_report_engine.py
+import pandas as pd
+from report_engine import category_totals, merge_rankings, top_rankings
+from validators import CATEGORY_EVENTOS, CATEGORY_PRACA_PICO, CATEGORY_TORRE, CATEGORY_WB
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["EVENTO", "NICK"])
+
+def test_event_in_two_categories_counts_in_both():
+    rankings = top_rankings(frame([("WB 10:00 + Pico", "Ana"), ("WB 20:00", "Ana"), ("Pico", "Bia")]))
+    assert rankings[CATEGORY_WB] == [("Ana", 2)]
+    assert rankings[CATEGORY_PRACA_PICO] == [("Ana", 1), ("Bia", 1)]
+    assert rankings[CATEGORY_TORRE] == []
+    assert rankings[CATEGORY_EVENTOS] == []
+
+def test_rankings_order_by_total_then_nick_and_respect_the_limit():
+    rows = [("Torre 11:00", nick) for nick, total in (("Cid", 3), ("Ana", 2), ("Bia", 2), ("Duda", 1)) for _ in range(total)]
+    rankings = top_rankings(frame(rows), limit=3)
+    assert rankings[CATEGORY_TORRE] == [("Cid", 3), ("Ana", 2), ("Bia", 2)]
+
+def test_empty_nicks_and_unknown_events():
+    rankings = top_rankings(frame([("Krukan", ""), ("Krukan", "Ana"), ("Guerra de Vale", "Ana")]))
+    assert rankings[CATEGORY_EVENTOS] == [("Ana", 2)]
+
+def test_empty_frame():
+    rankings = top_rankings(frame([]))
+    assert all(ranking == [] for ranking in rankings.values())
+
+def test_category_totals():
+    totals = category_totals(frame([("WB 10:00 + Pico", "Ana"), ("Torre 17:00", "Bia"), ("Krukan", "Cid")]))
+    assert totals == {CATEGORY_WB: 1, CATEGORY_PRACA_PICO: 1, CATEGORY_TORRE: 1, CATEGORY_EVENTOS: 1}
+
+def test_merge_rankings_keeps_the_division_and_the_global_top():
+    partials = {
+        "SA 11": {CATEGORY_WB: [("Ana", 5), ("Bia", 2)]},
+        "SA 12": {CATEGORY_WB: [("Ana", 3), ("Cid", 4)]},
+    }
+    merged = merge_rankings(partials, limit=3)
+    assert merged[CATEGORY_WB] == [("Ana", "SA 11", 5), ("Cid", "SA 12", 4), ("Ana", "SA 12", 3)]
+    assert merged[CATEGORY_TORRE] == []
@@ -0,0 +1,91 @@
+# tests/test_schedule.py
+from datetime import datetime, time, timezone
+import pytest
+import validators
+from validators import TARGET_TZ, compile_config_schedules, compile_schedule, find_active_slot
+
+ALL_DAYS = [0, 1, 2, 3, 4, 5, 6]
+WB_10 = {"name": "WB 10:00 + Pico", "days": ALL_DAYS, "slots": [(time(9, 55), time(10, 35))]}
+WB_00 = {"name": "WB 00:00 + Praça", "days": ALL_DAYS, "slots": [(time(23, 55), time(0, 35))]}
+KRUKAN = {"name": "Krukan", "days": [1], "slots": [(time(21, 45), time(22, 35))]}
+
+def local(year, month, day, hour, minute, second=0):
+    return datetime(year, month, day, hour, minute, second, tzinfo=TARGET_TZ)
+
+# 2026-10-19 é uma segunda-feira
+MONDAY = (2026, 10, 19)
+
+def test_lookup_inside_and_outside_slot():
+    schedule = compile_schedule([WB_10, KRUKAN])
+    assert schedule.lookup(local(*MONDAY, 9, 55)) is WB_10
+    assert schedule.lookup(local(*MONDAY, 10, 34, 59)) is WB_10
+    assert schedule.lookup(local(*MONDAY, 9, 54, 59)) is None
+    # Krukan só às terças
+    assert schedule.lookup(local(*MONDAY, 22, 0)) is None
+    assert schedule.lookup(local(2026, 10, 20, 22, 0)) is KRUKAN
+
+def test_slot_end_is_inclusive_only_on_the_exact_minute():
+    schedule = compile_schedule([WB_10])
+    assert schedule.lookup(local(*MONDAY, 10, 35)) is WB_10
+    assert schedule.lookup(local(*MONDAY, 10, 35, 1)) is None
+
+def test_midnight_crossing_slot_belongs_to_the_day_it_started():
+    schedule = compile_schedule([WB_00])
+    event, event_date = schedule.lookup_slot(local(2026, 10, 20, 0, 10))
+    assert event is WB_00
+    assert event_date == datetime(*MONDAY).date()
+    # Fechamento no minuto exato do dia seguinte
+    assert schedule.lookup_slot(local(2026, 10, 20, 0, 35))[1] == datetime(*MONDAY).date()
+    assert schedule.lookup(local(2026, 10, 20, 0, 36)) is None
+
+def test_midnight_crossing_wraps_from_sunday_to_monday():
+    sunday_only = {"name": "WB 00:00 + Praça", "days": [6], "slots": [(time(23, 55), time(0, 35))]}
+    schedule = compile_schedule([sunday_only])
+    event, event_date = schedule.lookup_slot(local(*MONDAY, 0, 20))
+    assert event is sunday_only
+    assert event_date == datetime(2026, 10, 18).date()
+    assert schedule.lookup(local(2026, 10, 20, 0, 20)) is None
+
+def test_overlap_resolution_does_not_depend_on_order():
+    long_event = {"name": "Longo", "days": [0], "slots": [(time(9, 0), time(11, 0))]}
+    short_event = {"name": "Curto", "days": [0], "slots": [(time(10, 0), time(10, 30))]}
+    for events in ([long_event, short_event], [short_event, long_event]):
+        schedule = compile_schedule(events)
+        assert schedule.lookup(local(*MONDAY, 10, 15)) is short_event
+        assert schedule.lookup(local(*MONDAY, 9, 30)) is long_event
+        assert schedule.overlaps == [(0, "Curto", "Longo")]
+
+def test_find_active_slot_converts_to_the_target_timezone():
+    schedule = compile_schedule([WB_10])
+    # 12:56 UTC = 09:56 em São Paulo (UTC-3)
+    event, event_date = find_active_slot(datetime(*MONDAY, 12, 56, tzinfo=timezone.utc), schedule)
+    assert event is WB_10
+    assert event_date == datetime(*MONDAY).date()
+    assert find_active_slot(datetime(*MONDAY, 9, 56, tzinfo=timezone.utc), schedule) == (None, None)
+
+@pytest.fixture
+def restore_compiled_schedules():
+    saved = validators._compiled_schedules
+    yield
+    validators.install_schedules(saved)
+
+def test_compile_config_schedules_compiles_shared_lists_once(restore_compiled_schedules):
+    wb, eventos = [WB_10, WB_00], [KRUKAN]
+    config = {
+        "A": {"worksheet_name": "A", "channels": {"wb": wb, "eventos": eventos}},
+        "B": {"worksheet_name": "B", "channels": {"wb": wb, "eventos": eventos}},
+    }
+    before = dict(validators._compiled_schedules)
+    compiled = compile_config_schedules(config)
+    assert set(compiled) == {id(wb), id(eventos)}
+    assert compiled[id(wb)][0] is wb
+    # Compilar não altera o cache global; só install_schedules troca os índices
+    assert validators._compiled_schedules == before
+    validators.install_schedules(compiled)
+    assert validators.get_schedule(wb) is compiled[id(wb)][1]
+
+def test_compile_config_schedules_reports_overlaps(caplog, restore_compiled_schedules):
+    overlapping = [WB_10, {"name": "Praça", "days": [0], "slots": [(time(9, 55), time(10, 35))]}]
+    compiled = compile_config_schedules({"A": {"worksheet_name": "A", "channels": {"praca_pico": overlapping}}})
+    assert compiled[id(overlapping)][1].overlaps
+    assert "Horários sobrepostos no canal 'praca_pico'" in caplog.text
@@ -0,0 +1,96 @@
+# tests/test_schedule_loader.py
+import asyncio
+import json
+import os
+import pytest
+import schedule_loader
+import validators
+from config import CONFIG
+from schedule_loader import ScheduleError, export_schedule, format_schedule, parse_schedule
+
+@pytest.fixture(autouse=True)
+def restore_state(monkeypatch):
+    """load_initial e reload_if_changed alteram os índices instalados e a assinatura do arquivo."""
+    saved = validators._compiled_schedules
+    monkeypatch.setattr(schedule_loader, "_signature", None)
+    yield
+    validators.install_schedules(saved)
+
+def exported() -> dict:
+    return json.loads(format_schedule(export_schedule(CONFIG)))
+
+def write(path, data):
+    path.write_text(json.dumps(data) if isinstance(data, dict) else data, encoding="utf-8")
+    return str(path)
+
+def test_the_exported_file_parses_back_to_the_config_schedules():
+    config, compiled = parse_schedule(exported(), CONFIG)
+    for category_name, category_config in CONFIG.items():
+        assert config[category_name]["worksheet_name"] == category_config["worksheet_name"]
+        assert config[category_name]["channels"] == category_config["channels"]
+    # Uma lista (e um índice) por canal, compartilhada pelas categorias
+    first, second = list(config.values())[:2]
+    assert first["channels"]["wb"] is second["channels"]["wb"]
+    assert len(compiled) == len(first["channels"])
+
+def test_every_problem_in_the_file_is_reported():
+    data = exported()
+    data["channels"]["canal_novo"] = []
+    del data["channels"]["torre"]
+    data["channels"]["wb"] = [
+        {"name": "WB 10:00", "days": [0], "slots": [["25:00", "10:35"]]},
+        {"name": "WB 12:00", "days": [7], "slots": [["11:55", "12:35"]]},
+        {"name": "WB 20:00", "days": [0], "slots": [["20:00", "20:00"]]},
+        {"days": [0], "slots": [["09:00", "09:30"]]},
+    ]
+    data["channels"]["eventos"] = [
+        {"name": "Krukan", "days": [1], "slots": [["21:45", "22:35"]]},
+        {"name": "Guerra", "days": [1], "slots": [["22:00", "22:30"]]},
+    ]
+    with pytest.raises(ScheduleError) as error:
+        parse_schedule(data, CONFIG)
+    messages = "\n".join(error.value.errors)
+    for expected in (
+        "canal desconhecido 'canal_novo'",
+        "canal 'torre' ausente",
+        "horário inválido '25:00'",
+        "'days' deve ser uma lista",
+        "tem duração zero",
+        "evento 4: 'name' ausente",
+        "(Ter): 'Guerra' e 'Krukan' se sobrepõem",
+    ):
+        assert expected in messages
+
+def test_a_bad_file_at_startup_falls_back_to_config(tmp_path):
+    assert schedule_loader.load_initial(str(tmp_path / "ausente.json"), CONFIG) is CONFIG
+    assert schedule_loader.load_initial(write(tmp_path / "quebrado.json", "{ não é json"), CONFIG) is CONFIG
+    wb = next(iter(CONFIG.values()))["channels"]["wb"]
+    assert validators.get_schedule(wb) is validators._compiled_schedules[id(wb)][1]
+
+def test_a_valid_file_at_startup_installs_its_schedules(tmp_path):
+    data = exported()
+    data["channels"]["wb"] = [{"name": "WB 20:00", "days": [0], "slots": [["19:55", "20:35"]]}]
+    config = schedule_loader.load_initial(write(tmp_path / "schedule.json", data), CONFIG)
+    wb = next(iter(config.values()))["channels"]["wb"]
+    assert [event["name"] for event in wb] == ["WB 20:00"]
+    assert id(wb) in validators._compiled_schedules
+
+def test_reload_only_reads_changed_files_and_keeps_schedules_on_errors(tmp_path):
+    path = write(tmp_path / "schedule.json", exported())
+    schedule_loader.load_initial(path, CONFIG)
+
+    async def reload():
+        return await schedule_loader.reload_if_changed(path, CONFIG)
+
+    assert asyncio.run(reload()) is None
+    write(tmp_path / "schedule.json", "[]")
+    os.utime(path, ns=(1, 1))
+    assert asyncio.run(reload()) is None        # Inválido: os horários atuais continuam
+    assert asyncio.run(reload()) is None        # ... e ele só é relido quando mudar de novo
+
+    data = exported()
+    data["channels"]["wb"] = [{"name": "WB 22:00", "days": [0], "slots": [["21:55", "22:35"]]}]
+    write(tmp_path / "schedule.json", data)
+    config, compiled = asyncio.run(reload())
+    assert next(iter(config.values()))["channels"]["wb"][0]["name"] == "WB 22:00"
+    assert len(compiled) == len(next(iter(CONFIG.values()))["channels"])
@@ -0,0 +1,116 @@
+# tests/test_storage.py
+import asyncio
+import threading
+from datetime import date
+import pytest
+import attendance_index
+import journal
+import storage
+import worksheet_cache
+from storage import SheetsStorage, SQLiteStorage
+from validators import CATEGORY_WB
+
+DAY = date(2026, 10, 21)
+HEADER = ["", "DIA", "EVENTO", "HORA", "NICK"]
+
+def presence(nick: str, hora: str = "20:00:00") -> list:
+    return ["21/10/2026", "WB 20:00", hora, nick]
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """SQLite em um arquivo próprio, sem replicar nada para a planilha nem para o journal."""
+    async def mirror(worksheet_name, row):
+        return True
+
+    async def no_pending(limit=journal.REPLAY_BATCH_LIMIT):
+        return []
+
+    monkeypatch.setattr(storage, "mirror_row", mirror)
+    monkeypatch.setattr(journal, "pending", no_pending)
+    store = SQLiteStorage(str(tmp_path / "store.db"))
+    yield store
+    store._conn.close()
+
+def stored(store: SQLiteStorage, worksheet_name: str) -> list:
+    return sorted(store._query("SELECT hora, nick FROM presences WHERE worksheet = ?", (worksheet_name,)))
+
+def test_sheets_rankings_do_not_leave_the_tab_in_memory(spreadsheet):
+    name = "RANKING SEM CACHE"
+    spreadsheet.add_worksheet(name, [
+        ["", "DIA", "EVENTO", "HORA", "NICK"],
+        ["", "20/10/2026", "WB 20:00", "20:00:00", "Ana"],
+        ["", "21/10/2026", "WB 20:00", "20:00:00", "Ana"],
+        ["", "21/10/2026", "WB 22:00", "22:00:00", "Bia"],
+    ])
+    rankings = asyncio.run(SheetsStorage().period_rankings(name, "semana", DAY))
+    assert rankings[CATEGORY_WB] == [("Ana", 2), ("Bia", 1)]
+    assert not worksheet_cache.is_cached(name) and name not in attendance_index._counts
+
+def test_sheets_rankings_reuse_a_cached_tab(spreadsheet):
+    name = "RANKING EM CACHE"
+    spreadsheet.add_worksheet(name, [["", "DIA", "EVENTO", "HORA", "NICK"], ["", "21/10/2026", "WB 20:00", "20:00:00", "Ana"]])
+
+    async def scenario():
+        await worksheet_cache.get_frame(name)
+        return await SheetsStorage().period_rankings(name, "mes", DAY)
+
+    try:
+        assert asyncio.run(scenario())[CATEGORY_WB] == [("Ana", 1)]
+        assert worksheet_cache.is_cached(name)
+    finally:
+        worksheet_cache.invalidate(name)
+        attendance_index._counts.pop(name, None)
+        attendance_index._display_nicks.pop(name, None)
+
+def test_import_counts_rows_found_in_the_sheet_and_the_journal_once(local_store, spreadsheet, monkeypatch):
+    name = "IMPORTACAO MESCLADA"
+    spreadsheet.add_worksheet(name, [HEADER, [""] + presence("Ana"), [""] + presence("Bia")])
+
+    async def journal_rows(limit=journal.REPLAY_BATCH_LIMIT):
+        # Bia já chegou à planilha; Cid ainda não foi sincronizado
+        return [(1, name, presence("Bia")), (2, name, presence("Cid")), (3, "OUTRA ABA", presence("Duda"))]
+
+    monkeypatch.setattr(journal, "pending", journal_rows)
+    local_store._queued[name] = [presence("Eva")]
+    asyncio.run(local_store._import(name))
+    assert stored(local_store, name) == [("20:00:00", nick) for nick in ("Ana", "Bia", "Cid", "Eva")]
+    assert name in local_store._imported and name not in local_store._queued
+
+def test_rows_recorded_while_the_import_commits_are_kept(local_store, spreadsheet, monkeypatch):
+    name = "IMPORTACAO CONCORRENTE"
+    spreadsheet.add_worksheet(name, [HEADER, [""] + presence("Ana")])
+    committing, release = threading.Event(), threading.Event()
+    import_rows = local_store._import_rows
+
+    def slow_import_rows(*args):
+        committing.set()
+        release.wait(5)
+        return import_rows(*args)
+
+    monkeypatch.setattr(local_store, "_import_rows", slow_import_rows)
+
+    async def scenario():
+        task = asyncio.create_task(local_store._import(name))
+        await asyncio.to_thread(committing.wait, 5)
+        # Mesma linha que já está na planilha: é outro post, não pode ser descartado como repetido
+        recorded = await local_store.record(name, presence("Ana"))
+        imported_early = name in local_store._imported
+        release.set()
+        await task
+        return recorded, imported_early
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert stored(local_store, name) == [("20:00:00", "Ana"), ("20:00:00", "Ana")]
+    assert name in local_store._imported
+
+def test_a_failed_import_keeps_the_queue_for_the_next_attempt(local_store, spreadsheet):
+    name = "IMPORTACAO ATRASADA"
+
+    async def scenario():
+        await local_store._try_import(name)     # A aba ainda não existe na planilha
+        await local_store.record(name, presence("Ana"))
+        spreadsheet.add_worksheet(name, [HEADER, [""] + presence("Bia", "22:00:00")])
+        await local_store._import(name)
+
+    asyncio.run(scenario())
+    assert stored(local_store, name) == [("20:00:00", "Ana"), ("22:00:00", "Bia")]
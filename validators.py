@@ -1,35 +1,160 @@
 # validators.py
+import functools
 import logging
-from datetime import datetime, time
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import metrics
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
 
 TIMEZONE_STR = 'America/Sao_Paulo'
+TARGET_TZ = ZoneInfo(TIMEZONE_STR)
 
-def find_active_event(message_time: datetime, event_list: list) -> dict | None:
+# Categorias usadas nos relatórios
+CATEGORY_WB = "WB"
+CATEGORY_PRACA_PICO = "Praça/Pico"
+CATEGORY_TORRE = "Torre"
+CATEGORY_EVENTOS = "Eventos"
+CATEGORIES = (CATEGORY_WB, CATEGORY_PRACA_PICO, CATEGORY_TORRE, CATEGORY_EVENTOS)
+
+@functools.lru_cache(maxsize=1024)
+def event_categories(event_name: str) -> tuple:
+    """
+    Retorna as categorias de relatório de um evento pelo nome.
+    Um mesmo evento pode pertencer a mais de uma (ex.: 'WB 10:00 + Pico' conta como WB e como Praça/Pico);
+    o que não é WB, Praça/Pico nem Torre é contado como Eventos.
+    """
+    categories = []
+    if "WB" in event_name:
+        categories.append(CATEGORY_WB)
+    if "Pico" in event_name or "Praça" in event_name:
+        categories.append(CATEGORY_PRACA_PICO)
+    if "Torre" in event_name:
+        categories.append(CATEGORY_TORRE)
+    return tuple(categories) or (CATEGORY_EVENTOS,)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
+
+def is_image_attachment(attachment) -> bool:
+    """Anexo é imagem pelo content_type; sem ele (alguns clientes não o enviam), pela extensão do arquivo."""
+    if attachment.content_type:
+        return attachment.content_type.startswith('image/')
+    return (attachment.filename or "").lower().endswith(IMAGE_EXTENSIONS)
+
+# --- ÍNDICE DE HORÁRIOS POR MINUTO DA SEMANA ---
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+class ScheduleIndex:
+    """
+    Tabela com os 10.080 minutos da semana apontando para o evento ativo em cada um
+    (junto com o dia da semana em que o slot começou).
+    O fim de cada slot é inclusivo apenas no minuto exato (ex.: 10:35:00), como na regra original.
+    """
+
+    def __init__(self, by_minute: list, closing: dict, overlaps: list):
+        self.by_minute = by_minute
+        self.closing = closing
+        self.overlaps = overlaps
+
+    def lookup_slot(self, local_time: datetime) -> tuple | None:
+        """Retorna (evento, data em que o slot começou) ou None."""
+        minute = local_time.weekday() * MINUTES_PER_DAY + local_time.hour * 60 + local_time.minute
+        entry = self.by_minute[minute]
+        if entry is None and local_time.second == 0 and local_time.microsecond == 0:
+            entry = self.closing.get(minute)
+        if entry is None:
+            return None
+        event, start_day = entry
+        # Slots que viram a noite pertencem à data em que começaram
+        return event, local_time.date() - timedelta(days=(local_time.weekday() - start_day) % 7)
+
+    def lookup(self, local_time: datetime) -> dict | None:
+        slot = self.lookup_slot(local_time)
+        return slot[0] if slot else None
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+def compile_schedule(event_list: list) -> ScheduleIndex:
+    """
+    Compila uma lista de eventos (formato do config.py) em um ScheduleIndex.
+    Slots que viram a noite (ex.: 23:55 - 00:35) continuam no dia seguinte ao dia configurado.
+    Em caso de sobreposição vence o slot mais curto (depois o que começa antes, depois o nome),
+    de modo que o resultado não depende da ordem da lista; as sobreposições ficam em `overlaps`.
+    """
+    intervals = []
+    for event in event_list:
+        for start_time, end_time in event["slots"]:
+            start, end = _minute_of_day(start_time), _minute_of_day(end_time)
+            length = end - start if start <= end else MINUTES_PER_DAY - start + end
+            for day in event["days"]:
+                intervals.append((length, day * MINUTES_PER_DAY + start, event["name"], event))
+    intervals.sort(key=lambda item: item[:3])
+
+    by_minute = [None] * MINUTES_PER_WEEK
+    closing = {}
+    overlaps = set()
+    for length, absolute_start, name, event in intervals:
+        for offset in range(length):
+            minute = (absolute_start + offset) % MINUTES_PER_WEEK
+            current = by_minute[minute]
+            if current is None:
+                by_minute[minute] = (event, absolute_start // MINUTES_PER_DAY)
+            elif current[0] is not event:
+                overlaps.add((minute // MINUTES_PER_DAY, current[0]["name"], name))
+        closing.setdefault((absolute_start + length) % MINUTES_PER_WEEK, (event, absolute_start // MINUTES_PER_DAY))
+
+    return ScheduleIndex(by_minute, closing, sorted(overlaps))
+
+_compiled_schedules = {}
+
+def get_schedule(event_list: list) -> ScheduleIndex:
+    """Retorna o índice compilado de uma lista de eventos, compilando-o apenas na primeira vez."""
+    cached = _compiled_schedules.get(id(event_list))
+    if cached is not None and cached[0] is event_list:
+        return cached[1]
+
+    schedule = compile_schedule(event_list)
+    _compiled_schedules[id(event_list)] = (event_list, schedule)
+    return schedule
+
+def install_schedules(compiled: dict):
+    """
+    Troca todos os índices compilados de uma vez (uma única atribuição, feita no loop de eventos).
+    Os índices de listas que saíram do CONFIG são descartados junto com o dicionário antigo.
+    """
+    global _compiled_schedules
+    _compiled_schedules = compiled
+
+def compile_config_schedules(config: dict) -> dict:
+    """
+    Compila os horários de todos os canais configurados e avisa sobre slots sobrepostos.
+    Não altera o cache global (pode rodar fora do loop de eventos): retorna os índices no formato
+    de install_schedules, {id(lista): (lista, índice)}, com cada lista compartilhada compilada uma vez.
+    """
+    dias = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+    compiled = {}
+    for category_config in config.values():
+        for channel_name, events in category_config["channels"].items():
+            if id(events) in compiled:
+                continue
+            schedule = compile_schedule(events)
+            compiled[id(events)] = (events, schedule)
+            for day, winner, loser in schedule.overlaps:
+                logging.warning(f"Horários sobrepostos no canal '{channel_name}' ({dias[day]}): '{winner}' tem prioridade sobre '{loser}'.")
+    return compiled
+
+def find_active_slot(message_time: datetime, schedule: ScheduleIndex | list) -> tuple:
     """
-    Verifica a hora da mensagem contra uma lista de eventos fornecida.
-    Retorna o dicionário do evento ativo, ou None se nenhum for encontrado.
+    Verifica a hora da mensagem contra os horários fornecidos (índice compilado ou lista de eventos).
+    Retorna (evento ativo, data do evento); (None, None) se nenhum for encontrado.
+    A data do evento é a do início do slot (ex.: um post às 00:10 no 'WB 00:00 + Praça' pertence ao dia anterior).
     """
     try:
-        target_tz = ZoneInfo(TIMEZONE_STR)
-        local_time = message_time.astimezone(target_tz)
-        current_weekday = local_time.weekday()
-        current_time_obj = local_time.time()
-
-        for event in event_list:
-            if current_weekday in event["days"]:
-                for start_time, end_time in event["slots"]:
-                    # Lógica para eventos que viram a noite (ex: 23:00 - 01:00)
-                    if start_time > end_time:
-                        if current_time_obj >= start_time or current_time_obj <= end_time:
-                            return event
-                    # Lógica para eventos no mesmo dia
-                    else:
-                        if start_time <= current_time_obj <= end_time:
-                            return event
-        
-        return None # Nenhum evento ativo encontrado
+        if not isinstance(schedule, ScheduleIndex):
+            schedule = get_schedule(schedule)
+        with metrics.FIND_EVENT_LATENCY.time():
+            return schedule.lookup_slot(message_time.astimezone(TARGET_TZ)) or (None, None)
 
     except Exception as e:
         logging.error(f"Erro inesperado na validação de tempo: {e}")
-        return None
\ No newline at end of file
+        return None, None
@@ -0,0 +1,174 @@
+# worksheet_cache.py
+from __future__ import annotations
+from typing import TYPE_CHECKING
+import asyncio
+import logging
+import time
+import batch_writer
+import metrics
+import sheets_client
+
+# pandas fica fora da inicialização: só é importado na primeira leitura de aba
+if TYPE_CHECKING:
+    import pandas as pd
+
+HEADERS = ['DIA', 'EVENTO', 'HORA', 'NICK']
+LAST_COLUMN = "E"          # Os dados ficam em B:E; a coluna A é lida só para manter o alinhamento
+ROW_WIDTH = 5
+REFRESH_INTERVAL = 30      # Segundos entre verificações remotas da mesma aba
+
+class _CachedSheet:
+    """Estado em memória de uma aba: cabeçalho, quantas linhas já foram lidas e o DataFrame acumulado."""
+
+    def __init__(self):
+        import pandas as pd
+        self.header = None
+        self.row_count = 0          # Linhas da planilha já ingeridas (incluindo o cabeçalho)
+        self.last_signature = None  # Assinatura da última linha ingerida, usada para detectar remoções
+        self.frame = pd.DataFrame()
+        self.pending_rows = []      # Linhas (B:E) ainda não concatenadas ao DataFrame
+        self.last_refresh = 0.0
+        self.refreshing = False
+        self.stale = False          # Há escritas do bot que não puderam ser aplicadas localmente
+        self.lock = asyncio.Lock()
+
+_sheets = {}
+_frame_listeners = []
+
+def add_frame_listener(callback):
+    """
+    Registra uma função chamada sempre que linhas entram no DataFrame de uma aba.
+    Assinatura: callback(worksheet_name, new_rows_df, reset), com reset=True quando a aba foi recarregada
+    por completo (new_rows_df contém então todas as linhas).
+    """
+    _frame_listeners.append(callback)
+
+def _notify(worksheet_name: str, frame: pd.DataFrame, reset: bool):
+    for callback in _frame_listeners:
+        try:
+            callback(worksheet_name, frame, reset)
+        except Exception as e:
+            logging.error(f"Erro em listener do cache da aba '{worksheet_name}': {e}")
+
+def _pad(row: list) -> list:
+    """A API omite células vazias no fim da linha; normaliza para A:E."""
+    return (list(row) + [""] * ROW_WIDTH)[:ROW_WIDTH]
+
+def _signature(row: list) -> tuple:
+    # EVENTO e NICK não sofrem formatação da planilha (ao contrário de DIA/HORA)
+    row = _pad(row)
+    return (row[2], row[4])
+
+def rows_to_dataframe(rows: list) -> pd.DataFrame:
+    """Converte linhas de dados (sem cabeçalho, colunas A:E) em um DataFrame com DIA, EVENTO, HORA e NICK."""
+    import pandas as pd
+    if not rows:
+        return pd.DataFrame(columns=HEADERS)
+
+    with metrics.DATAFRAME_BUILD_LATENCY.time():
+        return _build_dataframe(rows)
+
+def _build_dataframe(rows: list) -> pd.DataFrame:
+    # A planilha armazena os dados em B:E — portanto pegamos colunas 1..4 (índices 1 a 4)
+    import pandas as pd
+    data = [_pad(row)[1:5] for row in rows]
+    df = pd.DataFrame(data, columns=HEADERS)
+
+    df['DIA'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y', errors='coerce')
+    df.dropna(subset=['DIA'], inplace=True)
+    return df
+
+async def _full_reload(worksheet_name: str, sheet: _CachedSheet):
+    values = await sheets_client.get_range(worksheet_name, f"A1:{LAST_COLUMN}")
+    sheet.header = _pad(values[0]) if values else None
+    sheet.row_count = len(values)
+    sheet.last_signature = _signature(values[-1]) if values else None
+    sheet.pending_rows = []
+    sheet.frame = await asyncio.to_thread(rows_to_dataframe, values[1:])
+    _notify(worksheet_name, sheet.frame, reset=True)
+    logging.info(f"Cache da aba '{worksheet_name}' recarregado por completo ({max(len(values) - 1, 0)} linhas).")
+
+async def _incremental_refresh(worksheet_name: str, sheet: _CachedSheet):
+    """Busca o cabeçalho e as linhas a partir da última já lida, em uma única requisição."""
+    header_range, tail = await sheets_client.get_ranges(
+        worksheet_name, [f"A1:{LAST_COLUMN}1", f"A{sheet.row_count}:{LAST_COLUMN}"]
+    )
+    header = _pad(header_range[0]) if header_range else None
+
+    # Cabeçalho alterado ou última linha conhecida diferente → a aba encolheu ou foi reorganizada
+    if header != sheet.header or not tail or _signature(tail[0]) != sheet.last_signature:
+        logging.info(f"Aba '{worksheet_name}' foi alterada fora do bot. Recarregando por completo.")
+        await _full_reload(worksheet_name, sheet)
+        return
+
+    new_rows = tail[1:]
+    if new_rows:
+        sheet.pending_rows.extend(new_rows)
+        sheet.row_count += len(new_rows)
+        sheet.last_signature = _signature(new_rows[-1])
+
+async def get_frame(worksheet_name: str) -> pd.DataFrame:
+    """
+    Retorna o DataFrame da aba, lendo da planilha apenas as linhas novas desde a última consulta.
+    O DataFrame retornado é compartilhado: quem chamar não deve modificá-lo.
+    """
+    import pandas as pd
+    sheet = _sheets.setdefault(worksheet_name, _CachedSheet())
+    async with sheet.lock:
+        sheet.refreshing = True
+        try:
+            if sheet.header is None:
+                sheet.stale = False
+                await _full_reload(worksheet_name, sheet)
+            elif sheet.stale or time.monotonic() - sheet.last_refresh >= REFRESH_INTERVAL:
+                sheet.stale = False
+                await _incremental_refresh(worksheet_name, sheet)
+            sheet.last_refresh = time.monotonic()
+        finally:
+            sheet.refreshing = False
+
+        if sheet.pending_rows:
+            # Linhas gravadas durante a conversão ficam para a próxima consulta
+            rows, sheet.pending_rows = sheet.pending_rows, []
+            new_frame = await asyncio.to_thread(rows_to_dataframe, rows)
+            sheet.frame = pd.concat([sheet.frame, new_frame], ignore_index=True)
+            _notify(worksheet_name, new_frame, reset=False)
+        return sheet.frame
+
+def is_cached(worksheet_name: str) -> bool:
+    """Indica se a aba já está em memória (lida ao menos uma vez desde a última invalidação)."""
+    sheet = _sheets.get(worksheet_name)
+    return sheet is not None and sheet.header is not None
+
+def invalidate(worksheet_name: str = None):
+    """Descarta o cache de uma aba (ou de todas), forçando recarga completa na próxima consulta."""
+    if worksheet_name is None:
+        _sheets.clear()
+    else:
+        _sheets.pop(worksheet_name, None)
+
+def _on_rows_committed(worksheet_name: str, rows: list, start_row: int | None, start_column: str | None):
+    """
+    Linhas gravadas pelo próprio bot entram no cache sem nenhuma leitura,
+    desde que tenham sido gravadas exatamente após a última linha conhecida.
+    Caso contrário, a próxima atualização incremental as buscará.
+    """
+    sheet = _sheets.get(worksheet_name)
+    if sheet is None or sheet.header is None:
+        return
+    if sheet.refreshing or start_row != sheet.row_count + 1 or start_column is None or len(start_column) != 1:
+        # Leitura em andamento ou outra escrita no meio: força a verificação remota na próxima consulta
+        sheet.stale = True
+        return
+
+    offset = ord(start_column) - ord("A")
+    raw_rows = [[""] * offset + list(row) for row in rows]
+    sheet.pending_rows.extend(raw_rows)
+    sheet.row_count += len(raw_rows)
+    sheet.last_signature = _signature(raw_rows[-1])
+
+batch_writer.add_commit_listener(_on_rows_committed)
+metrics.gauge(
+    "bot_worksheet_cache_rows", "Linhas em memória por aba",
+    lambda: {name: len(sheet.frame) + len(sheet.pending_rows) for name, sheet in _sheets.items()}
+)